@@ -1,19 +1,29 @@
 # Disable tokenizers parallelism before any Hugging Face imports to avoid fork deadlocks
 import os
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
+import time
+import json
 
-from fastapi import FastAPI, BackgroundTasks, File, UploadFile
+from fastapi import FastAPI, BackgroundTasks, File, UploadFile, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from semantic_search import search_frames
 from intent_search import intent_search
 from process_video import process_video_logic
-from process_clips import process_clips_logic
+from process_clips import process_clips_logic, INCOMING_DIR
+from thumbnails import get_sprite_for_frame
+from source_registry import list_sources, resolve_source_ids
+from executors import compute_pool, executor_metrics, PoolSaturated
+from llm_cache import cache_stats
+from llm_client import llm_metrics
 from pydantic import BaseModel
 
 # RAG imports
 try:
-    from rag_search import rag_search
+    from rag_search import rag_retrieve, build_rag_response
+    from rag_generator import generate_explanation_async, stream_explanation_async
     from vector_store import load_captions_to_vector_db, ensure_vector_db_loaded, search_vector_db
     from rag_generator import generate_suggestions_from_vector_db
     RAG_AVAILABLE = True
@@ -26,12 +36,12 @@ except ImportError as e:
 
 # Production Planner imports
 try:
-    from production_planner import generate_production_plan, extract_actor_names_from_script
+    from production_planner import generate_production_plan_async, extract_actor_names_from_script_async, stream_production_plan
     PRODUCTION_PLANNER_AVAILABLE = True
 except ImportError as e:
     print(f"⚠️ Production planner not available: {e}")
     PRODUCTION_PLANNER_AVAILABLE = False
-    extract_actor_names_from_script = None
+    extract_actor_names_from_script_async = None
 
 class VideoRequest(BaseModel):
     url: str
@@ -72,12 +82,20 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    """Backpressure: a full compute/ffmpeg/LLM queue rejects the request instead of queueing it."""
+    return JSONResponse(status_code=429, content={"error": str(exc), "pool": exc.pool}, headers={"Retry-After": "1"})
+
+
 @app.on_event("startup")
 def startup():
     """Keep RAG ready: if vector DB is empty but captions exist, load them."""
     os.makedirs("source_clips", exist_ok=True)
     os.makedirs("clips", exist_ok=True)
     os.makedirs("frames", exist_ok=True)
+    os.makedirs("thumbnails", exist_ok=True)
+    os.makedirs("sprites", exist_ok=True)
     if RAG_AVAILABLE and ensure_vector_db_loaded:
         ensure_vector_db_loaded()
         # Also load audio transcriptions if available
@@ -86,6 +104,10 @@ def startup():
             load_transcriptions_to_vector_db(append_only=True)
         except Exception as e:
             print(f"⚠️ Could not load audio transcriptions: {e}")
+        # Build the BM25 index up front so the first hybrid search doesn't pay for it
+        from lexical_index import refresh_index
+        refresh_index("captions")
+        refresh_index("audio")
 
 
 from semantic_search import search_frames, load_data
@@ -111,6 +133,10 @@ def update_status(msg, append_vector_db=True):
                 # Also load audio transcriptions
                 from vector_store import load_transcriptions_to_vector_db
                 load_transcriptions_to_vector_db(append_only=True)
+                # Tokenize only the newly appended captions/transcriptions for BM25
+                from lexical_index import refresh_index
+                refresh_index("captions")
+                refresh_index("audio")
             except Exception as e:
                 print(f"⚠️ Vector DB load failed: {e}")
         processing_status = {"state": "completed", "message": "Done! Search now."}
@@ -129,6 +155,41 @@ def process_video_endpoint(req: VideoRequest, background_tasks: BackgroundTasks)
     return {"status": "started"}
 
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+
+def _write_chunk(out, digest, chunk):
+    digest.update(chunk)
+    out.write(chunk)
+
+
+async def _stream_upload_to_disk(upload: UploadFile, dest_path: str) -> str:
+    """
+    Copy an upload to dest_path chunk by chunk, hashing on the fly. Returns sha256 hex digest.
+    Hashing and disk writes run in the threadpool so large uploads never block the event loop;
+    on any error (client disconnect, read or write failure) the partial file is removed.
+    """
+    import hashlib
+    digest = hashlib.sha256()
+    try:
+        out = await run_in_threadpool(open, dest_path, "wb")
+        try:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                await run_in_threadpool(_write_chunk, out, digest, chunk)
+        finally:
+            await run_in_threadpool(out.close)
+    except BaseException:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+    finally:
+        await upload.close()
+    return digest.hexdigest()
+
+
 @app.post("/process-clips")
 async def process_clips_endpoint(
     background_tasks: BackgroundTasks,
@@ -138,23 +199,34 @@ async def process_clips_endpoint(
     global processing_status
     if not files:
         return {"error": "No files uploaded"}
-    # Validate and read file contents (must do before bg task - request body closes)
+    # Stream each file to source_clips/.incoming (must do before bg task - request body closes).
+    # Memory stays flat regardless of upload size; the background job only gets paths.
+    import uuid
     allowed = {".mp4", ".mov", ".webm", ".avi", ".mkv"}
-    file_data = []  # [(filename, bytes), ...]
-    for f in files:
-        ext = os.path.splitext(f.filename or "")[1].lower()
-        if ext in allowed:
-            content = await f.read()
-            file_data.append((f.filename or "video.mp4", content))
-        else:
-            print(f"Skipping {f.filename}: unsupported format")
-    if not file_data:
+    os.makedirs(INCOMING_DIR, exist_ok=True)
+    uploads = []  # [(filename, staged_path, sha256), ...]
+    try:
+        for f in files:
+            ext = os.path.splitext(f.filename or "")[1].lower()
+            if ext in allowed:
+                staged_path = os.path.join(INCOMING_DIR, f"{uuid.uuid4().hex}{ext}.part")
+                content_hash = await _stream_upload_to_disk(f, staged_path)
+                uploads.append((f.filename or "video.mp4", staged_path, content_hash))
+            else:
+                print(f"Skipping {f.filename}: unsupported format")
+    except BaseException:
+        # A later file failed: the job never starts, so drop the files already staged
+        for _, staged_path, _ in uploads:
+            if os.path.exists(staged_path):
+                os.remove(staged_path)
+        raise
+    if not uploads:
         return {"error": "No valid video files (supported: mp4, mov, webm, avi, mkv)"}
-    processing_status = {"state": "starting", "message": f"Processing {len(file_data)} clip(s)..."}
+    processing_status = {"state": "starting", "message": f"Processing {len(uploads)} clip(s)..."}
     def update_status_clips(msg):
         update_status(msg, append_vector_db=(msg == "COMPLETED"))
-    background_tasks.add_task(process_clips_logic, file_data, update_status_clips)
-    return {"status": "started", "file_count": len(file_data)}
+    background_tasks.add_task(process_clips_logic, uploads, update_status_clips)
+    return {"status": "started", "file_count": len(uploads)}
 
 @app.get("/process-status")
 def get_status():
@@ -176,17 +248,9 @@ def list_source_clips():
 
 @app.get("/video-history")
 def get_video_history():
-    """Return history of all processed videos (YouTube and uploaded clips)."""
-    import json
-    history_file = "video_history.json"
-    if not os.path.exists(history_file):
-        return {"videos": [], "total": 0}
-    try:
-        with open(history_file, "r") as f:
-            history = json.load(f)
-        return {"videos": history.get("videos", []), "total": len(history.get("videos", []))}
-    except Exception as e:
-        return {"videos": [], "total": 0, "error": str(e)}
+    """Return catalog of all processed videos (YouTube and uploaded clips) with per-source metadata."""
+    videos = list_sources()
+    return {"videos": videos, "total": len(videos)}
 
 @app.get("/captions-stats")
 def get_captions_stats():
@@ -220,52 +284,158 @@ def get_captions_stats():
 os.makedirs("source_clips", exist_ok=True)
 os.makedirs("clips", exist_ok=True)
 os.makedirs("frames", exist_ok=True)
+os.makedirs("thumbnails", exist_ok=True)
+os.makedirs("sprites", exist_ok=True)
 
 # Mount current directory to serve video.mp4 (simple approach for dev)
 app.mount("/videos", StaticFiles(directory="."), name="videos")
 app.mount("/clips", StaticFiles(directory="clips"), name="clips")
 app.mount("/frames", StaticFiles(directory="frames"), name="frames")
 app.mount("/source_clips", StaticFiles(directory="source_clips"), name="source_clips")
+app.mount("/thumbnails", StaticFiles(directory="thumbnails"), name="thumbnails")
+app.mount("/sprites", StaticFiles(directory="sprites"), name="sprites")
+
+@app.get("/sprite/{frame}")
+def get_sprite(frame: str):
+    """Sprite sheet URL and tile offset for a result frame (e.g. youtube_001_frame_0042.jpg)."""
+    sprite = get_sprite_for_frame(frame)
+    if not sprite:
+        return {"error": f"No sprite for {frame}"}
+    return sprite
 
+def _search_filters(sources: str | None, source_type: str | None, start: float | None, end: float | None):
+    """Search scope from query params (sources=youtube_001,clip_002&source_type=clip&start=30&end=90)."""
+    if not sources and not source_type and start is None and end is None:
+        return None
+    return {"source_ids": resolve_source_ids(sources, source_type), "start": start, "end": end}
+
+@app.get("/metrics/executors")
+def get_executor_metrics():
+    """Queue depth / in-flight / rejected counters for the compute, ffmpeg and LLM pools."""
+    return executor_metrics()
+
+@app.get("/metrics/llm-cache")
+def get_llm_cache_metrics():
+    """LLM response cache entries and hit rate (this worker and all workers sharing the cache file)."""
+    return cache_stats()
+
+@app.get("/metrics/llm")
+def get_llm_metrics():
+    """Per-provider LLM calls, retries, errors, token usage and latency percentiles."""
+    return llm_metrics()
+
+def _sse(event: str, data) -> str:
+    """One server-sent event (streamed /rag-search, /audio-search and /production-plan/stream)."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# Search handlers are async: embedding and search run on the compute pool, clip cuts on the
+# ffmpeg process pool and LLM calls on async HTTP clients, so the event loop never blocks.
 @app.post("/search")
-def search(query: str):
-    return search_frames(query)
+async def search(query: str, sources: str | None = None, source_type: str | None = None,
+                 start: float | None = None, end: float | None = None):
+    return await compute_pool.run(search_frames, query, filters=_search_filters(sources, source_type, start, end))
 
 @app.post("/intent-search")
-def intent(query: str):
-    return intent_search(query)
+async def intent(query: str):
+    return await compute_pool.run(intent_search, query)
 
 # RAG endpoints
 if RAG_AVAILABLE:
+    async def _rag_search_async(query: str, audio_only: bool, filters):
+        retrieved = await compute_pool.run(rag_retrieve, query, audio_only, filters)
+        t0 = time.perf_counter()
+        explanation = await generate_explanation_async(query, retrieved["search_results"])
+        return build_rag_response(query, retrieved, explanation, round((time.perf_counter() - t0) * 1000, 1))
+
+    async def _rag_search_events(query: str, audio_only: bool, filters):
+        """
+        Server-sent events for a streamed RAG search. The LLM explanation is off the critical path:
+        - results: the full response without the explanation, as soon as retrieval and clips are ready
+        - explanation: {"delta": text} chunks as the LLM generates them
+        - fallback: {"explanation": template} replacing any partial text (LLM error or RAG_EXPLANATION_TIMEOUT)
+        - done: {"explanation": final text, "debug": {"timings": ...}}
+        """
+        retrieved = await compute_pool.run(rag_retrieve, query, audio_only, filters)
+        response = build_rag_response(query, retrieved, "", 0.0)
+        del response["explanation"]
+        yield _sse("results", response)
+
+        t0 = time.perf_counter()
+        explanation = ""
+        async for kind, text in stream_explanation_async(query, retrieved["search_results"]):
+            if kind == "fallback":
+                explanation = text
+                yield _sse("fallback", {"explanation": text})
+            else:
+                explanation += text
+                yield _sse("explanation", {"delta": text})
+        final = build_rag_response(query, retrieved, explanation, round((time.perf_counter() - t0) * 1000, 1))
+        yield _sse("done", {"explanation": explanation, "debug": final["debug"]})
+
+    async def _rag_search_response(query: str, audio_only: bool, filters, stream: bool):
+        if not stream:
+            return await _rag_search_async(query, audio_only, filters)
+        # Pull the first event (retrieval) before answering so PoolSaturated still maps to 429
+        events = _rag_search_events(query, audio_only, filters)
+        first = await events.__anext__()
+
+        async def body():
+            yield first
+            async for event in events:
+                yield event
+
+        return StreamingResponse(body(), media_type="text/event-stream", headers=SSE_HEADERS)
+
     @app.post("/rag-search")
-    def rag_search_endpoint(query: str):
-        """RAG-enhanced search with explanations (run after user picks a suggestion)."""
-        return rag_search(query)
+    async def rag_search_endpoint(query: str, sources: str | None = None, source_type: str | None = None,
+                                  start: float | None = None, end: float | None = None, stream: bool = False):
+        """
+        RAG-enhanced search with explanations (run after user picks a suggestion). Optional source/time scope.
+        stream=true answers with server-sent events: results first, then the explanation as it is generated.
+        """
+        return await _rag_search_response(query, False, _search_filters(sources, source_type, start, end), stream)
 
     @app.post("/audio-search")
-    def audio_search_endpoint(query: str):
-        """Audio-focused search: prioritizes dialog matches, generates clips for matched speech."""
-        return rag_search(query, audio_only=True)
+    async def audio_search_endpoint(query: str, sources: str | None = None, source_type: str | None = None,
+                                    start: float | None = None, end: float | None = None, stream: bool = False):
+        """Audio-focused search: prioritizes dialog matches, generates clips for matched speech. Supports stream=true."""
+        return await _rag_search_response(query, True, _search_filters(sources, source_type, start, end), stream)
 
 # Production Planner endpoints
 if PRODUCTION_PLANNER_AVAILABLE:
     @app.post("/production-plan/extract-actors")
-    def extract_actors_endpoint(req: ExtractActorsRequest):
+    async def extract_actors_endpoint(req: ExtractActorsRequest):
         """Extract actor/character names from script. Body: { script }. Returns { actor_names: [...] }."""
-        return extract_actor_names_from_script(req.script)
+        return await extract_actor_names_from_script_async(req.script)
+
+    def _actors_list(req: ProductionPlanRequest):
+        if not req.actors:
+            return None
+        return [
+            {
+                "name": a.name,
+                "daily_rate": a.daily_rate,
+                "available_days": a.available_days,
+                "scene_numbers": a.scene_numbers or [],
+            }
+            for a in req.actors
+        ]
 
     @app.post("/production-plan")
-    def production_plan_endpoint(req: ProductionPlanRequest):
+    async def production_plan_endpoint(req: ProductionPlanRequest):
         """Generate production breakdown from script, budget, optional number_of_scenes, and actors (with scene_numbers) for scheduling."""
-        actors_list = None
-        if req.actors:
-            actors_list = [
-                {
-                    "name": a.name,
-                    "daily_rate": a.daily_rate,
-                    "available_days": a.available_days,
-                    "scene_numbers": a.scene_numbers or [],
-                }
-                for a in req.actors
-            ]
-        return generate_production_plan(req.script, req.budget, actors_list, req.number_of_scenes)
+        return await generate_production_plan_async(req.script, req.budget, _actors_list(req), req.number_of_scenes)
+
+    @app.post("/production-plan/stream")
+    async def production_plan_stream_endpoint(req: ProductionPlanRequest):
+        """
+        Same as /production-plan as server-sent events: a 'scene' event per scene as soon as the model
+        has written it, then 'plan' (full result with schedule) or 'error'.
+        """
+        async def body():
+            async for event, data in stream_production_plan(req.script, req.budget, _actors_list(req), req.number_of_scenes):
+                yield _sse(event, data)
+
+        return StreamingResponse(body(), media_type="text/event-stream", headers=SSE_HEADERS)
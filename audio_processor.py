@@ -5,142 +5,436 @@ import os
 import subprocess
 import json
 import re
+import time
+import queue
+from contextlib import contextmanager
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 # Use same base dir as vector_store so transcriptions are always found
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 AUDIO_DIR = os.path.join(BASE_DIR, "audio_extracts")
 TRANSCRIPTIONS_FILE = os.path.join(BASE_DIR, "audio_transcriptions.txt")
+PROGRESS_FILE = os.path.join(BASE_DIR, "audio_transcriptions.progress.json")  # per-source resume points
+# Held while appending transcriptions or rewriting the progress file (ingest workers run in parallel processes)
+LOCK_FILE = os.path.join(BASE_DIR, "audio_transcriptions.lock")
+# Audio is piped from ffmpeg straight into memory; set KEEP_AUDIO_WAV=1 to also write
+# audio_extracts/<prefix>.wav for debugging
+KEEP_AUDIO_WAV = os.getenv("KEEP_AUDIO_WAV", "").lower() in ("1", "true", "yes")
+SAMPLE_RATE = 16000  # Whisper's native rate; ffmpeg resamples to this
 
 def default_logger(msg):
     print(msg)
 
-def extract_audio_from_video(video_path: str, output_audio_path: str, update_status=default_logger):
+WHISPER_MODEL = "base"  # Options: tiny, base, small, medium, large
+
+# Voice-activity gating: cheap frame-energy pass so silence never reaches Whisper
+VAD_FRAME_SECONDS = 0.03
+VAD_MARGIN_DB = 12.0      # speech = this far above the noise floor (10th percentile energy)
+VAD_MIN_DB = -50.0        # ...and never quieter than this
+VAD_PAD_SECONDS = 0.3     # keep a little context around each speech region
+VAD_MIN_SPEECH_SECONDS = 0.25
+VAD_JOIN_GAP_SECONDS = 2.0  # short pauses stay inside one chunk
+
+# Chunking: Whisper works on 30 s windows; long speech is split with overlap and stitched back
+CHUNK_SECONDS = 30.0
+CHUNK_OVERLAP_SECONDS = 2.0
+# Per-word timings feed the dialog index (exact phrase search); WHISPER_WORD_TIMESTAMPS=0 disables
+WORD_TIMESTAMPS = os.getenv("WHISPER_WORD_TIMESTAMPS", "1").lower() not in ("0", "false", "no")
+
+# Idle Whisper models for this process. transcribe() installs per-call hooks on the model,
+# so concurrent chunks each need their own instance; they are reused across chunks and jobs.
+_idle_models = queue.Queue()
+
+def _acquire_whisper_model(update_status=default_logger):
+    try:
+        return _idle_models.get_nowait()
+    except queue.Empty:
+        import whisper
+        update_status("🤖 Loading Whisper model...")
+        # Use base model for balance of speed and accuracy
+        return whisper.load_model(WHISPER_MODEL)
+
+def _release_whisper_model(model):
+    _idle_models.put(model)
+
+def get_transcription_workers(chunk_count: int) -> int:
+    """Parallel chunk transcriptions: WHISPER_WORKERS env, else half the cores (capped by chunk count)."""
+    try:
+        configured = int(os.getenv("WHISPER_WORKERS", "0"))
+    except ValueError:
+        configured = 0
+    workers = configured if configured > 0 else max(1, (os.cpu_count() or 1) // 2)
+    return max(1, min(workers, chunk_count))
+
+def detect_speech_regions(audio, sample_rate: int = SAMPLE_RATE):
+    """
+    Energy-based voice activity detection on a float32 mono buffer.
+    Returns [(start_sec, end_sec), ...] of padded, merged speech regions.
     """
-    Extract audio from video file using ffmpeg.
-    Returns path to extracted audio file.
+    import numpy as np
+
+    frame = int(sample_rate * VAD_FRAME_SECONDS)
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return []
+    frames = audio[:n_frames * frame].reshape(n_frames, frame)
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    threshold = max(float(np.percentile(energy_db, 10)) + VAD_MARGIN_DB, VAD_MIN_DB)
+    voiced = (energy_db > threshold).astype(np.int8)
+
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced, [0]))))
+    duration = len(audio) / sample_rate
+    regions = []
+    for start_f, end_f in zip(edges[0::2], edges[1::2]):
+        start = max(0.0, float(start_f) * VAD_FRAME_SECONDS - VAD_PAD_SECONDS)
+        end = min(duration, float(end_f) * VAD_FRAME_SECONDS + VAD_PAD_SECONDS)
+        if regions and start - regions[-1][1] <= VAD_JOIN_GAP_SECONDS and end - regions[-1][0] <= CHUNK_SECONDS:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return [(s, e) for s, e in regions if e - s >= VAD_MIN_SPEECH_SECONDS]
+
+def plan_chunks(regions):
     """
+    Split speech regions into <= CHUNK_SECONDS windows, overlapping by CHUNK_OVERLAP_SECONDS.
+    Each chunk also gets the span it "owns" (overlaps split at their midpoint) so stitched
+    segments are neither lost nor duplicated: [(start, end, own_start, own_end), ...]
+    """
+    chunks = []
+    for region_start, region_end in regions:
+        t = region_start
+        while True:
+            end = min(t + CHUNK_SECONDS, region_end)
+            own_start = t
+            if chunks and chunks[-1][1] > t:  # overlaps previous chunk of the same region
+                own_start = (t + chunks[-1][1]) / 2
+                prev = chunks[-1]
+                chunks[-1] = (prev[0], prev[1], prev[2], own_start)
+            chunks.append((t, end, own_start, end))
+            if end >= region_end:
+                break
+            t = end - CHUNK_OVERLAP_SECONDS
+    return chunks
+
+def _transcribe_chunk(audio, chunk, language, update_status=default_logger):
+    """Transcribe one chunk; returns (segments with absolute timestamps inside the owned span, language)."""
+    start, end, own_start, own_end = chunk
+    model = _acquire_whisper_model(update_status)
     try:
-        os.makedirs(os.path.dirname(output_audio_path), exist_ok=True)
-        update_status(f"🎵 Extracting audio from {os.path.basename(video_path)}...")
-        
-        cmd = [
-            "ffmpeg",
-            "-i", video_path,
-            "-vn",  # No video
-            "-acodec", "pcm_s16le",  # PCM 16-bit
-            "-ar", "16000",  # 16kHz sample rate (good for Whisper)
-            "-ac", "1",  # Mono
-            "-y",  # Overwrite
-            output_audio_path
-        ]
-        
-        subprocess.run(
-            cmd,
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
+        result = model.transcribe(
+            audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)],
+            language=language,  # None on the first chunk = auto-detect
+            task="transcribe",
+            condition_on_previous_text=False,
+            word_timestamps=WORD_TIMESTAMPS,
+            verbose=None
         )
-        
-        update_status(f"✅ Audio extracted: {os.path.basename(output_audio_path)}")
-        return output_audio_path
+    finally:
+        _release_whisper_model(model)
+
+    segments = []
+    for segment in result.get("segments", []):
+        seg_start = start + float(segment["start"])
+        seg_end = min(start + float(segment["end"]), end)
+        text = segment["text"].strip()
+        if text and own_start <= (seg_start + seg_end) / 2 < own_end:
+            words = [
+                {"word": w["word"], "start": round(start + float(w["start"]), 2), "end": round(start + float(w["end"]), 2)}
+                for w in segment.get("words") or []
+            ]
+            segments.append({"start": round(seg_start, 2), "end": round(seg_end, 2), "text": text, "words": words})
+    return segments, result.get("language")
+
+def transcribe_audio_array(audio, label: str, update_status=default_logger, start_offset: float = 0.0, on_segments=None):
+    """
+    VAD-gated, chunked, parallel transcription of a 16 kHz float32 mono buffer.
+    start_offset: skip audio before this time (resuming a partially transcribed source).
+    on_segments: called with each chunk's segments, in time order, as soon as they are
+    final - lets the caller persist progress chunk by chunk.
+    Returns segments [{"start", "end", "text"}] with absolute timestamps, sorted by start.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    job_start = time.time()
+    audio_seconds = len(audio) / SAMPLE_RATE
+    regions = [(max(s, start_offset), e) for s, e in detect_speech_regions(audio) if e > start_offset]
+    speech_seconds = sum(e - s for s, e in regions)
+    chunks = plan_chunks(regions)
+    if not chunks:
+        update_status(f"🔇 No speech detected in {label}")
+        return []
+
+    update_status(
+        f"🎤 Transcribing {label}: {speech_seconds:.0f}s of speech in {audio_seconds:.0f}s audio, {len(chunks)} chunk(s)..."
+    )
+    # First chunk alone to detect the language once; the rest reuse it and run in parallel
+    segments, language = _transcribe_chunk(audio, chunks[0], None, update_status)
+    if on_segments:
+        on_segments(segments)
+    rest = chunks[1:]
+    if rest:
+        workers = get_transcription_workers(len(rest))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # map() yields in chunk order, so on_segments always sees time-ordered progress
+            for chunk_segments, _ in pool.map(lambda c: _transcribe_chunk(audio, c, language, update_status), rest):
+                segments.extend(chunk_segments)
+                if on_segments:
+                    on_segments(chunk_segments)
+    segments.sort(key=lambda s: s["start"])
+
+    elapsed = time.time() - job_start
+    audio_seconds -= start_offset
+    rtf = elapsed / audio_seconds
+    update_status(
+        f"⏱️ Transcribed {audio_seconds:.1f}s of audio in {elapsed:.1f}s "
+        f"(real-time factor {rtf:.2f}, {speech_seconds / audio_seconds:.0%} speech)"
+    )
+    return segments
+
+def has_audio_stream(video_path: str):
+    """True/False from ffprobe; None when the probe itself fails (decode and let real errors surface)."""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "a",
+        "-show_entries", "stream=index",
+        "-of", "csv=p=0",
+        video_path
+    ]
+    try:
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return bool(out.strip())
+
+def load_audio_from_video(video_path: str, video_prefix: str = None, update_status=default_logger):
+    """
+    Decode a video's audio track straight into a 16 kHz mono float32 NumPy buffer.
+    ffmpeg writes raw PCM to a pipe, so nothing touches audio_extracts/ unless
+    KEEP_AUDIO_WAV is set (then the same samples are also saved as a WAV for debugging).
+    """
+    import numpy as np
+
+    update_status(f"🎵 Extracting audio from {os.path.basename(video_path)}...")
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-i", video_path,
+        "-vn",  # No video
+        "-f", "s16le",  # Raw PCM 16-bit to stdout
+        "-acodec", "pcm_s16le",
+        "-ar", str(SAMPLE_RATE),  # 16kHz sample rate (good for Whisper)
+        "-ac", "1",  # Mono
+        "-"
+    ]
+    try:
+        proc = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
     except subprocess.CalledProcessError as e:
         update_status(f"⚠️ Error extracting audio: {e}")
         raise
+    pcm = np.frombuffer(proc.stdout, dtype=np.int16)
+
+    if KEEP_AUDIO_WAV and video_prefix:
+        _save_debug_wav(pcm, os.path.join(AUDIO_DIR, f"{video_prefix}.wav"), update_status)
+    return pcm.astype(np.float32) / 32768.0
+
+def _save_debug_wav(pcm, audio_path: str, update_status=default_logger):
+    """Persist already-decoded PCM as a WAV (debug only - no second ffmpeg pass)."""
+    import wave
+    os.makedirs(os.path.dirname(audio_path), exist_ok=True)
+    with wave.open(audio_path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(pcm.tobytes())
+    update_status(f"💾 Debug WAV saved: {os.path.basename(audio_path)}")
+
+def _load_progress():
+    if not os.path.exists(PROGRESS_FILE):
+        return {}
+    try:
+        with open(PROGRESS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
     except Exception as e:
-        update_status(f"⚠️ Unexpected error in audio extraction: {e}")
-        raise
+        print(f"⚠️ Could not read {PROGRESS_FILE}: {e}")
+        return {}
 
-def transcribe_audio_with_whisper(audio_path: str, video_prefix: str, update_status=default_logger):
+@contextmanager
+def _transcriptions_lock():
+    """Exclusive cross-process lock (flock / msvcrt) on LOCK_FILE; not reentrant."""
+    fd = os.open(LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        yield
+    finally:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)
+
+def _write_progress(video_prefix: str, **fields):
+    # Caller holds _transcriptions_lock
+    progress = _load_progress()
+    progress.setdefault(video_prefix, {}).update(fields)
+    tmp_path = f"{PROGRESS_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(progress, f, indent=4)
+    os.replace(tmp_path, PROGRESS_FILE)
+
+def _update_progress(video_prefix: str, **fields):
+    """Atomic read-modify-write of the per-source transcription progress file."""
+    with _transcriptions_lock():
+        _write_progress(video_prefix, **fields)
+
+def get_transcription_state(video_prefix: str):
     """
-    Transcribe audio using Whisper and return segments with timestamps.
-    Returns list of dicts: [{"start": float, "end": float, "text": str}, ...]
+    {"complete": bool, "last_end": float} for a source.
+    Sources with lines in audio_transcriptions.txt but no progress entry were written by
+    the old all-at-once pipeline, which only saved finished jobs - they count as complete.
     """
+    state = _load_progress().get(video_prefix)
+    if state:
+        return {"complete": bool(state.get("complete")), "last_end": float(state.get("last_end", 0.0))}
+    if any(tid.startswith(f"{video_prefix}_audio_") for tid in get_existing_transcriptions()):
+        return {"complete": True, "last_end": 0.0}
+    return {"complete": False, "last_end": 0.0}
+
+def _repair_torn_tail():
+    """Drop a partial last line left by a crash mid-write, so appends always start on a fresh line."""
+    if not os.path.exists(TRANSCRIPTIONS_FILE) or os.path.getsize(TRANSCRIPTIONS_FILE) == 0:
+        return
+    with open(TRANSCRIPTIONS_FILE, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b"\n":
+            return
+        pos = f.seek(0, os.SEEK_END)
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            idx = f.read(step).rfind(b"\n")
+            if idx != -1:
+                f.truncate(pos + idx + 1)
+                return
+        f.truncate(0)
+
+def _append_lines_atomically(lines):
+    """One O_APPEND write + fsync per batch: a batch of lines lands whole or (after repair) not at all."""
+    data = "".join(lines).encode("utf-8")
+    fd = os.open(TRANSCRIPTIONS_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
     try:
-        import whisper
-        
-        update_status("🤖 Loading Whisper model...")
-        # Use base model for balance of speed and accuracy
-        # Options: tiny, base, small, medium, large
-        model = whisper.load_model("base")
-        
-        update_status(f"🎤 Transcribing audio: {os.path.basename(audio_path)}...")
-        result = model.transcribe(
-            audio_path,
-            language=None,  # Auto-detect language
-            task="transcribe",
-            verbose=False
-        )
-        
-        segments = []
-        for segment in result.get("segments", []):
-            segments.append({
-                "start": segment["start"],
-                "end": segment["end"],
-                "text": segment["text"].strip()
-            })
-        
-        update_status(f"✅ Transcribed {len(segments)} audio segments")
-        return segments
-        
-    except ImportError:
-        update_status("⚠️ Whisper not installed. Install with: pip install openai-whisper")
-        return []
-    except Exception as e:
-        update_status(f"⚠️ Error transcribing audio: {e}")
-        return []
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _transcription_id(video_prefix: str, segment):
+    # Format: youtube_001_audio_123.45 or clip_001_audio_123.45
+    return f"{video_prefix}_audio_{segment['start']:.2f}"
 
-def save_transcriptions_to_file(segments: list, video_prefix: str, video_path: str, update_status=default_logger):
+def append_transcription_segments(segments: list, video_prefix: str, existing_ids: set):
     """
-    Save transcriptions to audio_transcriptions.txt with format:
-    video_prefix_timestamp: transcription_text
+    Idempotently append segments (skipping ids already saved) and advance the source's
+    resume point. existing_ids is updated in place.
     """
+    lines = []
+    new_segments, new_ids = [], []
+    for segment in segments:
+        timestamp_id = _transcription_id(video_prefix, segment)
+        if timestamp_id in existing_ids:
+            continue
+        existing_ids.add(timestamp_id)
+        lines.append(f"{timestamp_id}: {segment['text']}\n")
+        new_segments.append(segment)
+        new_ids.append(timestamp_id)
     if not segments:
-        return
-    
-    os.makedirs(os.path.dirname(TRANSCRIPTIONS_FILE) if os.path.dirname(TRANSCRIPTIONS_FILE) else ".", exist_ok=True)
-    
-    update_status(f"💾 Saving {len(segments)} transcriptions...")
-    
-    with open(TRANSCRIPTIONS_FILE, "a", encoding="utf-8") as f:
-        for segment in segments:
-            # Create a unique ID based on video prefix and timestamp
-            # Format: youtube_001_audio_123.45 or clip_001_audio_123.45
-            timestamp_id = f"{video_prefix}_audio_{segment['start']:.2f}"
-            transcription = segment["text"]
-            
-            # Write: timestamp_id: transcription_text
-            f.write(f"{timestamp_id}: {transcription}\n")
-    
-    update_status(f"✅ Saved transcriptions to {TRANSCRIPTIONS_FILE}")
+        return 0
+    with _transcriptions_lock():
+        if lines:
+            _append_lines_atomically(lines)
+            # End times + word timings for exact dialog lookup
+            from dialog_index import add_segments
+            add_segments(video_prefix, new_segments, new_ids)
+        last_end = max(seg["end"] for seg in segments)
+        previous = float(_load_progress().get(video_prefix, {}).get("last_end", 0.0))
+        _write_progress(video_prefix, complete=False, last_end=max(last_end, previous))
+    return len(lines)
+
+def mark_transcription_complete(video_prefix: str):
+    _update_progress(video_prefix, complete=True)
+
+def load_saved_segments(video_prefix: str):
+    """Segments already in audio_transcriptions.txt for a source (only start times are stored)."""
+    if not os.path.exists(TRANSCRIPTIONS_FILE):
+        return []
+    segments = []
+    with open(TRANSCRIPTIONS_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith(f"{video_prefix}_audio_") and ": " in line:
+                trans_id, text = line.rstrip("\n").split(": ", 1)
+                match = re.search(r"_audio_([\d.]+)$", trans_id)
+                if match:
+                    start = float(match.group(1))
+                    segments.append({"start": start, "end": start, "text": text})
+    return segments
 
 def process_audio_for_video(video_path: str, video_prefix: str, update_status=default_logger):
     """
-    Complete audio processing pipeline:
-    1. Extract audio from video
-    2. Transcribe with Whisper
-    3. Save transcriptions to file
+    Complete audio processing pipeline (idempotent and resumable):
+    1. Skip sources whose transcription is already complete
+    2. Decode audio from video into memory
+    3. Transcribe with Whisper, resuming after the last saved segment
+    4. Append each chunk's segments to file as soon as they are final
     
     Returns list of transcription segments.
     """
     try:
-        # 1. Extract audio
-        os.makedirs(AUDIO_DIR, exist_ok=True)
-        audio_filename = f"{video_prefix}.wav"
-        audio_path = os.path.join(AUDIO_DIR, audio_filename)
-        
-        extract_audio_from_video(video_path, audio_path, update_status)
-        
-        # 2. Transcribe
-        segments = transcribe_audio_with_whisper(audio_path, video_prefix, update_status)
-        
+        state = get_transcription_state(video_prefix)
+        if state["complete"]:
+            update_status(f"⏭️ Audio for {video_prefix} already transcribed, skipping")
+            return load_saved_segments(video_prefix)
+
+        resume_from = state["last_end"]
+        if resume_from > 0:
+            update_status(f"↩️ Resuming {video_prefix} transcription from {resume_from:.1f}s")
+
+        if has_audio_stream(video_path) is False:
+            # Nothing to transcribe: done, so the source can still complete ingest and be deduplicated
+            update_status(f"🔇 {os.path.basename(video_path)} has no audio stream, skipping transcription")
+            mark_transcription_complete(video_prefix)
+            return []
+
+        with _transcriptions_lock():
+            _repair_torn_tail()
+        existing_ids = get_existing_transcriptions()
+        # Decode + transcribe (no WAV on disk unless KEEP_AUDIO_WAV is set).
+        # Errors propagate here so a failed job is never marked complete.
+        audio = load_audio_from_video(video_path, video_prefix, update_status)
+        segments = transcribe_audio_array(
+            audio, os.path.basename(video_path), update_status,
+            start_offset=resume_from,
+            on_segments=lambda chunk: append_transcription_segments(chunk, video_prefix, existing_ids)
+        )
+        mark_transcription_complete(video_prefix)
+
+        segments = load_saved_segments(video_prefix) if resume_from > 0 else segments
         if not segments:
             update_status("⚠️ No audio transcriptions generated")
             return []
-        
-        # 3. Save to file
-        save_transcriptions_to_file(segments, video_prefix, video_path, update_status)
-        
+        update_status(f"✅ Saved transcriptions to {TRANSCRIPTIONS_FILE}")
         return segments
         
     except Exception as e:
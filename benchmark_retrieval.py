@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark vector retrieval backends (retrieval_backends.BACKENDS) on the local collections:
+per-query latency (p50/p95) and overlap of each backend's top-k with exact search.
+With --sources/--start/--end, also reports latency of the same queries with the filter
+applied as a pre-filter (shard selection / where / masked matmul).
+Usage: python benchmark_retrieval.py [--k 50] [--repeat 20] [--sources youtube_001,clip_002] [--start 0 --end 60] ["query" ...]
+"""
+import argparse
+import time
+import numpy as np
+
+DEFAULT_QUERIES = [
+    "a man walking down the street",
+    "two people talking in a room",
+    "a car driving on the road",
+    "a crowd at night",
+    "someone holding a phone",
+]
+
+def _percentile(values, p):
+    return float(np.percentile(values, p)) * 1000 if values else 0.0
+
+def benchmark_collection(label, make_backend, embeddings, k, repeat, backend_names, exact_name="numpy", query_kwargs=None):
+    """
+    make_backend(name) -> backend instance over the collection(s) being measured.
+    query_kwargs: filter arguments passed to every query (where / source_ids).
+    """
+    query_kwargs = query_kwargs or {}
+    backends = {name: make_backend(name) for name in backend_names}
+    exact = make_backend(exact_name)
+    print(f"\n📊 {label}: {exact.count()} rows, top-{k}, {repeat} runs/query")
+    exact_top = [{r[0] for r in exact.query(e, k, **query_kwargs)} for e in embeddings]
+    for name, backend in backends.items():
+        backend.count()  # warm up (numpy copies the collection into memory here)
+        latencies = []
+        overlap = []
+        for e, truth in zip(embeddings, exact_top):
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                results = backend.query(e, k, **query_kwargs)
+                latencies.append(time.perf_counter() - t0)
+            if truth:
+                overlap.append(len({r[0] for r in results} & truth) / len(truth))
+        print(f"  {name:<8} p50 {_percentile(latencies, 50):7.2f} ms   p95 {_percentile(latencies, 95):7.2f} ms   "
+              f"overlap with exact {np.mean(overlap) if overlap else 0.0:.3f}")
+
+def main():
+    from retrieval_backends import BACKENDS, ShardedBackend, get_backend
+    from source_registry import resolve_source_ids
+    from vector_store import (embedding_model, audio_collection, get_caption_shard_collections, caption_shard_for_row,
+                              caption_query_filters, audio_query_filters)
+
+    parser = argparse.ArgumentParser(description="Benchmark vector retrieval backends")
+    parser.add_argument("queries", nargs="*", default=DEFAULT_QUERIES)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    parser.add_argument("--sources", help="comma-separated source ids to scope the filtered run")
+    parser.add_argument("--source-type", choices=["youtube", "clip"])
+    parser.add_argument("--start", type=float)
+    parser.add_argument("--end", type=float)
+    args = parser.parse_args()
+    filters = None
+    if args.sources or args.source_type or args.start is not None or args.end is not None:
+        filters = {"source_ids": resolve_source_ids(args.sources, args.source_type), "start": args.start, "end": args.end}
+
+    embeddings = list(embedding_model.encode(args.queries))
+    shards = get_caption_shard_collections()
+
+    def make_caption_backend(name):
+        # Same layout search_vector_db uses: one backend per source shard, fanned out
+        backend = ShardedBackend(caption_shard_for_row)
+        for shard, coll in shards.items():
+            backend.set_shard(shard, get_backend(coll, name))
+        return backend
+
+    benchmark_collection(f"Captions ({len(shards)} shards)", make_caption_backend, embeddings, args.k, args.repeat, args.backends)
+    if filters:
+        where, _, source_ids = caption_query_filters(filters)
+        benchmark_collection(f"Captions filtered {filters}", make_caption_backend, embeddings, args.k, args.repeat,
+                             args.backends, query_kwargs={"where": where, "source_ids": source_ids})
+    if audio_collection.count():
+        benchmark_collection("Audio transcriptions", lambda name: get_backend(audio_collection, name),
+                             embeddings, args.k, args.repeat, args.backends)
+        if filters:
+            where, _ = audio_query_filters(filters)
+            benchmark_collection(f"Audio transcriptions filtered {filters}", lambda name: get_backend(audio_collection, name),
+                                 embeddings, args.k, args.repeat, args.backends, query_kwargs={"where": where})
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark the shooting schedulers (scheduler.greedy_schedule vs scheduler.optimize_schedule) on
+synthetic production plans: scenes spread over sets and day/night, casts drawn with a few leads in
+most scenes, and actor availability either generous (every scene fits) or tight (leads short).
+Scenes either come from a parsed screenplay (page lengths, short scenes can share a day) or from
+an LLM plan (whole estimated days only).
+Usage: python benchmark_scheduler.py [--scenes 300] [--actors 40] [--sets 30] [--seeds 3] [--budget 1.0]
+"""
+import math
+import time
+import random
+import argparse
+
+from scheduler import greedy_schedule, optimize_schedule, schedule_summary
+
+COLUMNS = ("scheduled_scenes", "blocked_days", "shooting_days", "actor_work_days", "actor_hold_days",
+           "actor_cost", "company_moves", "ms")
+
+
+def synthetic_plan(rng, n_scenes, n_actors, n_sets, parsed=True, tight=False, pages_per_day=4.0):
+    """(scenes, actor_model) shaped like production_planner's normalized plan and _actor_model."""
+    names = [f"Actor {i + 1}" for i in range(n_actors)]
+    leads = max(1, n_actors // 8)
+    weights = [1.0 / (i + 1) for i in range(n_actors)]
+    set_weights = [1.0 / math.sqrt(i + 1) for i in range(n_sets)]
+    # Supporting characters mostly appear at "their" sets (home, office, ...)
+    residents = {s: rng.sample(names[leads:], min(3, n_actors - leads)) for s in range(1, n_sets + 1)}
+    scenes = []
+    for n in range(1, n_scenes + 1):
+        place = rng.choices(range(1, n_sets + 1), set_weights)[0]
+        cast = set()
+        while len(cast) < rng.choice((1, 1, 2, 2, 3, 4)):
+            pool = residents[place] if residents[place] and rng.random() < 0.6 else names
+            cast.add(rng.choices(pool, weights[:len(pool)] if pool is names else None)[0])
+        scene = {
+            "scene_number": n,
+            "set": f"SET {place}",
+            "time_of_day": "night" if rng.random() < 0.3 else "day",
+            "required_actors": sorted(cast, key=names.index),
+        }
+        if parsed:
+            scene["page_eighths"] = rng.choice((1, 2, 3, 4, 6, 8, 10, 12, 16, 24, 40))
+            scene["estimated_days"] = max(1, math.ceil(scene["page_eighths"] / (8 * pages_per_day)))
+        else:
+            scene["estimated_days"] = rng.choice((1, 1, 1, 2, 2, 3))
+        scenes.append(scene)
+    demand = {a: sum(s["estimated_days"] for s in scenes if a in s["required_actors"]) for a in names}
+    actor_model = {}
+    for i, a in enumerate(names):
+        days = demand[a]
+        if tight and i < leads:
+            days = int(days * rng.uniform(0.6, 0.9))
+        rate = rng.randrange(50000, 150001, 5000) if i < leads else rng.randrange(5000, 30001, 1000)
+        actor_model[a] = {"daily_rate": float(rate), "available_days": days, "remaining_days": days}
+    return scenes, actor_model
+
+
+def _row(scenes, calendar, blocked, actor_model, ms):
+    days = {s["scene_number"]: s["estimated_days"] for s in scenes}
+    row = schedule_summary(calendar, actor_model)
+    row["blocked_days"] = sum(days[b["scene_number"]] for b in blocked)
+    row["ms"] = ms
+    return row
+
+
+def run(label, args, parsed, tight):
+    totals = {"greedy": [], "optimized": []}
+    for seed in range(args.seeds):
+        rng = random.Random(seed)
+        scenes, actor_model = synthetic_plan(rng, args.scenes, args.actors, args.sets, parsed, tight, args.pages_per_day)
+        t0 = time.perf_counter()
+        calendar, blocked = greedy_schedule(scenes, actor_model)
+        totals["greedy"].append(_row(scenes, calendar, blocked, actor_model, (time.perf_counter() - t0) * 1000))
+        t0 = time.perf_counter()
+        calendar, blocked, _ = optimize_schedule(scenes, actor_model, args.pages_per_day, args.budget, seed)
+        totals["optimized"].append(_row(scenes, calendar, blocked, actor_model, (time.perf_counter() - t0) * 1000))
+
+    print(f"\n📊 {label}: {args.scenes} scenes, {args.actors} actors, {args.sets} sets, mean of {args.seeds} plans")
+    print("  " + f"{'engine':<10}" + "".join(f"{c:>17}" for c in COLUMNS))
+    for engine, rows in totals.items():
+        means = [sum(r[c] for r in rows) / len(rows) for c in COLUMNS]
+        print("  " + f"{engine:<10}" + "".join(f"{m:>17,.1f}" for m in means))
+    greedy, optimized = totals["greedy"], totals["optimized"]
+    for column in ("shooting_days", "actor_cost", "company_moves"):
+        before = sum(r[column] for r in greedy)
+        after = sum(r[column] for r in optimized)
+        if before:
+            print(f"  {column}: {100 * (after - before) / before:+.1f}% vs greedy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark greedy vs optimized shooting schedules")
+    parser.add_argument("--scenes", type=int, default=300)
+    parser.add_argument("--actors", type=int, default=40)
+    parser.add_argument("--sets", type=int, default=30)
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=1.0, help="optimizer time budget per plan (seconds)")
+    parser.add_argument("--pages-per-day", type=float, default=4.0)
+    args = parser.parse_args()
+    run("Parsed screenplay, generous availability", args, parsed=True, tight=False)
+    run("Parsed screenplay, leads short of days", args, parsed=True, tight=True)
+    run("LLM plan (whole days), generous availability", args, parsed=False, tight=False)
+    run("LLM plan (whole days), leads short of days", args, parsed=False, tight=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Word-level dialog index: segment end times and per-word timestamps from Whisper,
+plus an in-memory inverted index (token -> positions) for exact word/phrase lookup.
+Quoted dialog queries are answered from here with tight time ranges, without a
+vector query.
+"""
+import os
+import json
+import re
+import threading
+
+# Same base dir as audio_processor / vector_store
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WORD_INDEX_FILE = os.path.join(BASE_DIR, "audio_word_index.jsonl")
+
+_lock = threading.Lock()
+_offset = 0         # bytes of WORD_INDEX_FILE consumed; ingest workers append from other processes
+_segment_ids = set()
+_segment_ends = {}  # transcription id -> segment end time
+_words = {}         # source prefix -> [(token, start, end, transcription_id), ...] in time order
+_postings = {}      # token -> [(source prefix, position in _words[prefix]), ...]
+
+def tokenize(text: str):
+    """Lowercase word tokens with punctuation stripped ("Don't," -> "don't")."""
+    return re.findall(r"[a-z0-9']+", (text or "").lower())
+
+def extract_quoted_phrase(query: str):
+    """'when he says "we did it"' -> 'we did it'; None if the query has no quoted text."""
+    m = re.search(r"[\"“”]([^\"“”]{2,})[\"“”]", query or "")
+    return m.group(1).strip() if m else None
+
+def _segment_record(video_prefix: str, transcription_id: str, segment):
+    words = []
+    for w in segment.get("words") or []:
+        if w.get("word", "").strip():
+            words.append([w["word"].strip(), round(float(w["start"]), 2), round(float(w["end"]), 2)])
+    return {
+        "id": transcription_id,
+        "source": video_prefix,
+        "start": round(float(segment["start"]), 2),
+        "end": round(float(segment["end"]), 2),
+        "words": words,
+    }
+
+def _index_record(record):
+    """Add one segment record to the in-memory structures (caller holds _lock)."""
+    if record["id"] in _segment_ids:
+        return
+    _segment_ids.add(record["id"])
+    _segment_ends[record["id"]] = record["end"]
+    stream = _words.setdefault(record["source"], [])
+    words = record["words"]
+    if not words:
+        # No word timings (e.g. word_timestamps disabled): spread tokens over the segment
+        tokens = tokenize(record.get("text", ""))
+        span = (record["end"] - record["start"]) / max(1, len(tokens))
+        words = [[t, round(record["start"] + i * span, 2), round(record["start"] + (i + 1) * span, 2)] for i, t in enumerate(tokens)]
+    # Chunks arrive in time order, so appending keeps each stream sorted
+    for word, start, end in words:
+        for token in tokenize(word):
+            _postings.setdefault(token, []).append((record["source"], len(stream)))
+            stream.append((token, start, end, record["id"]))
+
+def _refresh_locked():
+    """Index records appended to WORD_INDEX_FILE since the last refresh (caller holds _lock)."""
+    global _offset
+    try:
+        size = os.path.getsize(WORD_INDEX_FILE)
+    except OSError:
+        return
+    if size < _offset:
+        # File was rewritten (not appended): start over
+        _offset = 0
+        _segment_ids.clear()
+        _segment_ends.clear()
+        _words.clear()
+        _postings.clear()
+    if size == _offset:
+        return
+    with open(WORD_INDEX_FILE, "rb") as f:
+        f.seek(_offset)
+        data = f.read(size - _offset)
+    # Only consume complete lines; a half-written last line is picked up next time
+    end = data.rfind(b"\n") + 1
+    _offset += end
+    for line in data[:end].decode("utf-8", errors="replace").splitlines():
+        try:
+            _index_record(json.loads(line))
+        except (json.JSONDecodeError, KeyError):
+            continue  # torn line after a crash
+
+def _refresh():
+    """Pick up segments other processes (parallel ingest workers) appended; cheap no-op if unchanged."""
+    with _lock:
+        _refresh_locked()
+
+def add_segments(video_prefix: str, segments: list, transcription_ids: list):
+    """Persist segments (end times + word timings) and index them. Already-indexed ids are skipped."""
+    with _lock:
+        _refresh_locked()
+        records = []
+        for tid, segment in zip(transcription_ids, segments):
+            if tid in _segment_ids:
+                continue
+            record = _segment_record(video_prefix, tid, segment)
+            if not record["words"]:
+                record["text"] = segment.get("text", "")
+            records.append(record)
+        if not records:
+            return
+        data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records).encode("utf-8")
+        fd = os.open(WORD_INDEX_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+        # Read back through the file so _offset stays in step with appends from other processes
+        _refresh_locked()
+
+def get_segment_end(transcription_id: str):
+    """End time of a transcribed segment, or None if it predates the word index."""
+    _refresh()
+    return _segment_ends.get(transcription_id)
+
+def find_phrase(phrase: str, source_ids=None, limit: int = 15):
+    """
+    Exact word/phrase lookup. Returns hits shaped like search_audio_vector_db results:
+    [{"start", "end", "score", "caption", "clip_id", "source": "audio", "match": "exact"}]
+    with start/end spanning exactly the matched words.
+    """
+    _refresh()
+    tokens = tokenize(phrase)
+    # source_ids=[] is a filter that matches nothing (e.g. a source_type with no sources), not "all"
+    if not tokens or source_ids is not None and not source_ids:
+        return []
+    allowed = set(source_ids) if source_ids is not None else None
+    # Walk the rarest token's postings and verify the phrase around it
+    anchor = min(range(len(tokens)), key=lambda i: len(_postings.get(tokens[i], [])))
+    hits = []
+    for prefix, pos in _postings.get(tokens[anchor], []):
+        if allowed is not None and prefix not in allowed:
+            continue
+        stream = _words[prefix]
+        first = pos - anchor
+        if first < 0 or first + len(tokens) > len(stream):
+            continue
+        if any(stream[first + i][0] != tokens[i] for i in range(len(tokens))):
+            continue
+        matched = stream[first:first + len(tokens)]
+        hits.append({
+            "start": matched[0][1],
+            "end": matched[-1][2],
+            "score": 1.0,
+            "caption": " ".join(w[0] for w in matched),
+            "best_frame": "",
+            "frame_count": 1,
+            "clip_id": prefix,
+            "transcription_id": matched[0][3],
+            "source": "audio",
+            "match": "exact",
+        })
+        if len(hits) >= limit:
+            break
+    hits.sort(key=lambda h: (h["clip_id"], h["start"]))
+    return hits
@@ -0,0 +1,160 @@
+"""
+Dedicated executors for the async API layer, with queue-depth metrics and backpressure.
+- compute: embedding / vector search / frame search (threads; torch, numpy and Chroma release the GIL)
+- retrieval: audio search run beside video search inside a compute task (separate from compute,
+  so a compute thread never waits on work queued behind itself)
+- ffmpeg: clip cutting in a process pool, so encodes never occupy API or compute threads
+- llm: async concurrency limit for LLM HTTP calls
+When a pool's queue is full, submissions raise PoolSaturated and app.py answers HTTP 429.
+Sizes via COMPUTE_WORKERS / COMPUTE_MAX_QUEUE, RETRIEVAL_WORKERS / RETRIEVAL_MAX_QUEUE,
+FFMPEG_WORKERS / FFMPEG_MAX_QUEUE, LLM_MAX_CONCURRENCY / LLM_MAX_QUEUE.
+"""
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+CPU_COUNT = os.cpu_count() or 1
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", str(min(4, CPU_COUNT))))
+COMPUTE_MAX_QUEUE = int(os.getenv("COMPUTE_MAX_QUEUE", "32"))
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", str(COMPUTE_WORKERS)))
+RETRIEVAL_MAX_QUEUE = int(os.getenv("RETRIEVAL_MAX_QUEUE", "32"))
+FFMPEG_WORKERS = int(os.getenv("FFMPEG_WORKERS", str(max(1, min(4, CPU_COUNT // 2)))))
+FFMPEG_MAX_QUEUE = int(os.getenv("FFMPEG_MAX_QUEUE", "64"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+
+
+class PoolSaturated(Exception):
+    """Raised instead of queueing more work on a full pool (mapped to HTTP 429)."""
+    def __init__(self, pool: str):
+        super().__init__(f"{pool} pool is saturated, retry shortly")
+        self.pool = pool
+
+
+class BoundedPool:
+    """Executor wrapper that rejects work once workers + max_queue tasks are in flight."""
+
+    def __init__(self, name, make_executor, workers, max_queue):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self._make_executor = make_executor
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _get_executor(self):
+        # Created lazily so importing this module never forks/spawns anything
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = self._make_executor(self.workers)
+        return self._executor
+
+    def _done(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+
+    def submit(self, fn, *args, **kwargs):
+        """concurrent.futures.Future for fn(*args, **kwargs); raises PoolSaturated when full."""
+        executor = self._get_executor()
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise PoolSaturated(self.name)
+            self._in_flight += 1
+            self._submitted += 1
+        try:
+            future = executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) on this pool from an async handler."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "in_flight": self._in_flight,
+                "queued": max(0, self._in_flight - self.workers),
+                "max_queue": self.max_queue,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+
+class AsyncLimiter:
+    """Concurrency limit for async calls (LLM requests) with a bounded wait queue."""
+
+    def __init__(self, name, max_concurrency, max_queue):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._semaphore = None
+        self._waiting = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def __aenter__(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self._rejected += 1
+            raise PoolSaturated(self.name)
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._active += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self._active -= 1
+        self._completed += 1
+        self._semaphore.release()
+        return False
+
+    def metrics(self):
+        return {
+            "workers": self.max_concurrency,
+            "in_flight": self._active + self._waiting,
+            "queued": self._waiting,
+            "max_queue": self.max_queue,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
+
+
+compute_pool = BoundedPool(
+    "compute", lambda n: ThreadPoolExecutor(max_workers=n, thread_name_prefix="compute"),
+    COMPUTE_WORKERS, COMPUTE_MAX_QUEUE,
+)
+retrieval_pool = BoundedPool(
+    "retrieval", lambda n: ThreadPoolExecutor(max_workers=n, thread_name_prefix="retrieval"),
+    RETRIEVAL_WORKERS, RETRIEVAL_MAX_QUEUE,
+)
+# spawn (not fork): the API process holds torch/tokenizer threads that must not be forked
+ffmpeg_pool = BoundedPool(
+    "ffmpeg", lambda n: ProcessPoolExecutor(max_workers=n, mp_context=multiprocessing.get_context("spawn")),
+    FFMPEG_WORKERS, FFMPEG_MAX_QUEUE,
+)
+llm_limiter = AsyncLimiter("llm", LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE)
+
+
+def executor_metrics():
+    """Queue depth and throughput counters for every pool (served at /metrics/executors)."""
+    return {p.name: p.metrics() for p in (compute_pool, retrieval_pool, ffmpeg_pool, llm_limiter)}
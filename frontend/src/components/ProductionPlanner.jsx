@@ -27,6 +27,7 @@ const ProductionPlanner = () => {
   const [fetching, setFetching] = useState(false)
   const [loading, setLoading] = useState(false)
   const [result, setResult] = useState(null)
+  const [streamedScenes, setStreamedScenes] = useState([])
   const [error, setError] = useState('')
   const [activeTab, setActiveTab] = useState('budget')
 
@@ -99,16 +100,24 @@ const ProductionPlanner = () => {
     setLoading(true)
     setError('')
     setResult(null)
+    setStreamedScenes([])
 
     try {
-      const data = await productionAPI.generatePlan(script, budgetNum, actorsPayload)
-
-      if (data.error) {
-        setError(data.error)
-      } else {
-        setResult(data)
-        setActiveTab('budget')
-      }
+      // Scenes arrive one by one while the model writes the plan; the full plan (with schedule) comes last
+      await productionAPI.generatePlanStream(script, budgetNum, actorsPayload, (event, data) => {
+        if (event === 'scene') {
+          setStreamedScenes(prev => [...prev, data])
+        } else if (event === 'plan') {
+          if (data.error) {
+            setError(data.error)
+          } else {
+            setResult(data)
+            setActiveTab('budget')
+          }
+        } else if (event === 'error') {
+          setError(data.error)
+        }
+      })
     } catch (err) {
       setError(err.message || 'Failed to generate production plan')
     } finally {
@@ -314,6 +323,16 @@ const ProductionPlanner = () => {
         </p>
       </form>
 
+      {loading && streamedScenes.length > 0 && (
+        <div className="status" style={{ marginTop: '16px' }}>
+          <span>🎬</span>
+          <span>
+            {streamedScenes.length} scene{streamedScenes.length === 1 ? '' : 's'} planned:{' '}
+            {streamedScenes.map(sc => sc.scene_title || `Scene ${sc.scene_number}`).join(', ')}
+          </span>
+        </div>
+      )}
+
       {error && (
         <div className="status error" style={{ marginTop: '16px' }}>
           <span>❌</span>
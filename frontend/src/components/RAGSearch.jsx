@@ -7,6 +7,7 @@ const RAGSearch = () => {
   const [query, setQuery] = useState('')
   const [ragData, setRagData] = useState(null)
   const [loading, setLoading] = useState(false)
+  const [explaining, setExplaining] = useState(false)
   const [searchMode, setSearchMode] = useState('multimodal') // 'multimodal' or 'audio'
 
   const handleSearch = async () => {
@@ -17,20 +18,28 @@ const RAGSearch = () => {
     }
     setLoading(true)
     setRagData(null)
+    setExplaining(false)
     try {
-      let data
-      if (searchMode === 'audio') {
-        data = await videoAPI.audioSearch(searchQuery)
-      } else {
-        data = await videoAPI.ragSearch(searchQuery)
-      }
-      setRagData(data)
+      // Clips render as soon as retrieval finishes; the explanation streams in afterwards
+      await videoAPI.streamSearch(searchQuery, searchMode === 'audio', (event, data) => {
+        if (event === 'results') {
+          setRagData({ ...data, explanation: '' })
+          setLoading(false)
+          setExplaining(true)
+        } else if (event === 'explanation') {
+          setRagData((prev) => prev && { ...prev, explanation: prev.explanation + data.delta })
+        } else if (event === 'fallback' || event === 'done') {
+          setRagData((prev) => prev && { ...prev, explanation: data.explanation, ...(data.debug && { debug: data.debug }) })
+          if (event === 'done') setExplaining(false)
+        }
+      })
     } catch (error) {
       console.error('Search error:', error)
       setRagData(null)
       alert('❌ Error: ' + (error.message || 'Unknown error'))
     } finally {
       setLoading(false)
+      setExplaining(false)
     }
   }
 
@@ -98,7 +107,7 @@ const RAGSearch = () => {
             <div className="ai-explanation">
               <h4>💡 Explanation</h4>
               <p className="text-muted" style={{ lineHeight: 1.6 }}>
-                {ragData.explanation || 'No explanation available.'}
+                {ragData.explanation || (explaining ? 'Generating explanation...' : 'No explanation available.')}
               </p>
               <h4>📊 Summary</h4>
               <p className="text-muted" style={{ lineHeight: 1.6 }}>
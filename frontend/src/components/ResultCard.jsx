@@ -3,6 +3,8 @@ const toLocalUrl = (url) => (import.meta.env.DEV && url ? url.replace('http://lo
 
 const ResultCard = ({ item, index }) => {
   const frameSrc = item.best_frame ? (import.meta.env.DEV ? `/frames/${item.best_frame}` : `http://localhost:8000/frames/${item.best_frame}`) : null
+  // Prefer the per-source sprite sheet (one cached request for many results) over the full-res frame
+  const sprite = item.sprite
   const videoSrc = toLocalUrl(item.video_url)
   const fullVideoHref = toLocalUrl(item.full_video_url) || item.full_video_url
   return (
@@ -31,7 +33,19 @@ const ResultCard = ({ item, index }) => {
       </div>
       <div className="media-container">
         <div className="frame-preview">
-          {frameSrc && (
+          {sprite ? (
+            <div
+              role="img"
+              aria-label="Frame preview"
+              style={{
+                width: `${sprite.width}px`,
+                height: `${sprite.height}px`,
+                backgroundImage: `url(${toLocalUrl(sprite.sheet_url)})`,
+                backgroundPosition: `-${sprite.x}px -${sprite.y}px`,
+                backgroundRepeat: 'no-repeat',
+              }}
+            />
+          ) : frameSrc && (
             <img
               src={frameSrc}
               alt="Frame preview"
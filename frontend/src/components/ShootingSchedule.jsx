@@ -2,6 +2,7 @@ const ShootingSchedule = ({ data }) => {
   const calendar = data?.shooting_calendar || []
   const blocked = data?.blocked_scenes || []
   const suggestions = data?.suggestions || []
+  const summary = data?.schedule_summary
   const hasConflicts = blocked.length > 0
 
   return (
@@ -10,6 +11,14 @@ const ShootingSchedule = ({ data }) => {
         📅 Shooting Schedule
       </h3>
 
+      {summary && calendar.length > 0 && (
+        <p style={{ color: 'var(--text-muted)', marginBottom: '16px' }}>
+          {summary.shooting_days} shooting days · {summary.actor_work_days} actor days
+          {summary.actor_hold_days ? ` (+${summary.actor_hold_days} on hold)` : ''} · ₹{Number(summary.actor_cost || 0).toLocaleString('en-IN')} cast
+          · {summary.company_moves} company moves
+        </p>
+      )}
+
       {calendar.length === 0 && !hasConflicts && (
         <div
           style={{
@@ -40,6 +49,7 @@ const ShootingSchedule = ({ data }) => {
               <tr style={{ borderBottom: '1px solid var(--border-strong)' }}>
                 <th style={{ textAlign: 'left', padding: '12px 16px', color: 'var(--text-muted)', fontWeight: 600 }}>Scene</th>
                 <th style={{ textAlign: 'left', padding: '12px 16px', color: 'var(--text-muted)', fontWeight: 600 }}>Day range</th>
+                <th style={{ textAlign: 'left', padding: '12px 16px', color: 'var(--text-muted)', fontWeight: 600 }}>Set</th>
                 <th style={{ textAlign: 'left', padding: '12px 16px', color: 'var(--text-muted)', fontWeight: 600 }}>Actors</th>
               </tr>
             </thead>
@@ -48,7 +58,10 @@ const ShootingSchedule = ({ data }) => {
                 <tr key={idx} style={{ borderBottom: '1px solid var(--border)' }}>
                   <td style={{ padding: '12px 16px', color: 'var(--text)' }}>Scene {entry.scene_number}</td>
                   <td style={{ padding: '12px 16px', color: 'var(--text)' }}>
-                    Day {entry.start_day} – Day {entry.end_day}
+                    {entry.start_day === entry.end_day ? `Day ${entry.start_day}` : `Day ${entry.start_day} – Day ${entry.end_day}`}
+                  </td>
+                  <td style={{ padding: '12px 16px', color: 'var(--text)' }}>
+                    {entry.set ? `${entry.set} (${entry.time_of_day})` : '—'}
                   </td>
                   <td style={{ padding: '12px 16px', color: 'var(--text)' }}>
                     {Array.isArray(entry.actors) ? entry.actors.join(', ') : (entry.actors ?? '—')}
@@ -10,6 +10,34 @@ const api = axios.create({
   },
 })
 
+// Read a text/event-stream response, calling onEvent(event, data) for each JSON event (fetch is used
+// for streamed endpoints because axios buffers the whole response in the browser)
+const readEventStream = async (response, onEvent) => {
+  if (!response.ok) {
+    throw new Error(`Request failed with status code ${response.status}`)
+  }
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    let boundary
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+      let event = 'message'
+      let data = ''
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7)
+        else if (line.startsWith('data: ')) data += line.slice(6)
+      }
+      if (data) onEvent(event, JSON.parse(data))
+    }
+  }
+}
+
 export const videoAPI = {
   // Process video from YouTube URL
   processVideo: async (url) => {
@@ -56,6 +84,14 @@ export const videoAPI = {
     const response = await api.post(`/audio-search?query=${encodeURIComponent(query)}`)
     return response.data
   },
+
+  // Streamed RAG / audio search (server-sent events): onEvent(event, data) is called with
+  // 'results' as soon as clips are ready, then 'explanation' deltas, 'fallback' and 'done'
+  streamSearch: async (query, audioOnly, onEvent) => {
+    const path = audioOnly ? '/audio-search' : '/rag-search'
+    const response = await fetch(`${API_BASE_URL}${path}?query=${encodeURIComponent(query)}&stream=true`, { method: 'POST' })
+    await readEventStream(response, onEvent)
+  },
 }
 
 export const productionAPI = {
@@ -72,6 +108,18 @@ export const productionAPI = {
     const response = await api.post('/production-plan', payload)
     return response.data
   },
+
+  // Streamed production plan: onEvent('scene', scene) per scene as it is generated, then 'plan' or 'error'
+  generatePlanStream: async (script, budget, actors = [], onEvent, number_of_scenes = null) => {
+    const payload = { script, budget, actors }
+    if (number_of_scenes != null && number_of_scenes > 0) payload.number_of_scenes = number_of_scenes
+    const response = await fetch(`${API_BASE_URL}/production-plan/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(payload),
+    })
+    await readEventStream(response, onEvent)
+  },
 }
 
 export default api
@@ -22,6 +22,8 @@ export default defineConfig({
       },
       '/clips': { target: 'http://localhost:8000', changeOrigin: true },
       '/frames': { target: 'http://localhost:8000', changeOrigin: true },
+      '/thumbnails': { target: 'http://localhost:8000', changeOrigin: true },
+      '/sprites': { target: 'http://localhost:8000', changeOrigin: true },
       '/source_clips': { target: 'http://localhost:8000', changeOrigin: true }
     }
   }
@@ -1,18 +1,8 @@
 from semantic_search import search_frames
-from video_utils import ensure_clip
+from video_utils import ensure_clips, get_full_video_url, is_youtube_source
+from thumbnails import get_sprite_for_frame
 
 WINDOW = 5
-import json
-
-VIDEO_URL = "http://localhost:8000/videos/video.mp4"
-
-def get_youtube_url():
-    try:
-        with open("video_config.json", "r") as f:
-            config = json.load(f)
-            return config.get("url", "https://www.youtube.com/watch?v=zhEWqfP6V_w")
-    except:
-        return "https://www.youtube.com/watch?v=zhEWqfP6V_w"
 
 def detect_intent(query: str):
     q = query.lower()
@@ -32,6 +22,7 @@ def intent_search(query: str):
 
     results = search_frames(clean)
     enhanced = []
+    windows = []
 
     for r in results:
         # Use start time as reference for "before/after" logic
@@ -56,7 +47,13 @@ def intent_search(query: str):
             diff = 3.0 - (adj_end - adj_start)
             adj_start = max(0, adj_start - diff / 2)
             adj_end = adj_end + diff / 2
+        windows.append((adj_start, adj_end))
 
+    # Cut all clips in parallel on the ffmpeg process pool
+    clip_filenames = ensure_clips([(a, b, r["best_frame"]) for (a, b), r in zip(windows, results)])
+    for r, (adj_start, adj_end), clip_filename in zip(results, windows, clip_filenames):
+        ts = r["start"]
+        end_ts = r["end"]
         enhanced.append({
             "best_frame": r["best_frame"],
             "caption": r["caption"],
@@ -67,8 +64,10 @@ def intent_search(query: str):
             "end": adj_end,
             "score": r["score"],
             # "video_url": f"{VIDEO_URL}#t={adj_start},{adj_end}" # OLD
-            "video_url": f"http://localhost:8000/clips/{ensure_clip(adj_start, adj_end)}",
-            "full_video_url": f"{get_youtube_url()}&t={int(adj_start)}s"
+            "video_url": f"http://localhost:8000/clips/{clip_filename}",
+            "full_video_url": get_full_video_url(r["best_frame"], adj_start),
+            "is_youtube": is_youtube_source(r["best_frame"]),
+            "sprite": get_sprite_for_frame(r["best_frame"])
         })
 
     return enhanced
@@ -0,0 +1,137 @@
+"""
+Incremental JSON parsing for streamed LLM output (production plans).
+StreamingJsonParser is fed completion text as it arrives and returns every element of a
+top-level array field (e.g. "scenes") as soon as its closing brace is seen, without waiting
+for the rest of the document. finish() parses the whole document and, if the model output was
+truncated (max_tokens) or has trailing garbage, repairs it by cutting back to the last complete
+value and closing the open objects/arrays.
+"""
+import json
+from collections import deque
+
+WHITESPACE = " \t\r\n"
+STRUCTURAL = "{}[]:,\""
+# How many recent "a value just completed here" positions finish() may cut back to
+MAX_REPAIR_POINTS = 64
+
+
+class StreamingJsonParser:
+    """Character-level scanner over one JSON object (leading code fences/prose are skipped)."""
+
+    def __init__(self, array_key="scenes"):
+        self.array_key = array_key
+        self.buffer = ""
+        self._pos = 0
+        self._start = None        # index of the top-level '{'
+        self._end = None          # index after the top-level '}'
+        self._stack = []          # open containers: {"type", "start", "expect_key", "key", "stream"}
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._scalar_start = None
+        self._repair_points = deque(maxlen=MAX_REPAIR_POINTS)
+        self.items_emitted = 0
+
+    def _closers(self):
+        return "".join("}" if f["type"] == "{" else "]" for f in reversed(self._stack))
+
+    def _value_done(self, end):
+        # A complete value ends at `end`: the prefix plus closers is a valid document
+        self._repair_points.append((end, self._closers()))
+        if self._stack and self._stack[-1]["type"] == "{":
+            self._stack[-1]["key"] = None
+
+    def feed(self, text):
+        """Add streamed text; returns the array_key elements completed by it (parsed dicts)."""
+        self.buffer += text
+        items = []
+        buf = self.buffer
+        i = self._pos
+        while i < len(buf) and self._end is None:
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    frame = self._stack[-1]
+                    if frame["type"] == "{" and frame["expect_key"]:
+                        try:
+                            frame["key"] = json.loads(buf[self._string_start:i + 1])
+                        except ValueError:
+                            frame["key"] = None
+                    else:
+                        self._value_done(i + 1)
+                i += 1
+                continue
+            if self._start is None:
+                # Skip ```json fences or any prose before the document
+                if ch == "{":
+                    self._start = i
+                    self._stack.append({"type": "{", "start": i, "expect_key": True, "key": None, "stream": False})
+                    self._repair_points.append((i + 1, "}"))
+                i += 1
+                continue
+            if self._scalar_start is not None and (ch in STRUCTURAL or ch in WHITESPACE):
+                self._scalar_start = None
+                self._value_done(i)
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                parent = self._stack[-1]
+                stream = (ch == "[" and len(self._stack) == 1 and parent["key"] == self.array_key)
+                self._stack.append({"type": ch, "start": i, "expect_key": ch == "{", "key": None, "stream": stream})
+                self._repair_points.append((i + 1, self._closers()))
+            elif ch in "}]":
+                frame = self._stack.pop()
+                if self._stack and self._stack[-1]["stream"] and ch == "}":
+                    try:
+                        items.append(json.loads(buf[frame["start"]:i + 1]))
+                        self.items_emitted += 1
+                    except ValueError:
+                        pass
+                if not self._stack:
+                    self._end = i + 1
+                else:
+                    self._value_done(i + 1)
+            elif ch == ":":
+                self._stack[-1]["expect_key"] = False
+            elif ch == ",":
+                if self._stack[-1]["type"] == "{":
+                    self._stack[-1]["expect_key"] = True
+            elif ch not in WHITESPACE and self._scalar_start is None:
+                self._scalar_start = i
+            i += 1
+        self._pos = i
+        return items
+
+    @property
+    def complete(self):
+        return self._end is not None
+
+    def finish(self):
+        """
+        The parsed document. Returns (result, repaired); repaired is True when the text was
+        truncated and had to be cut back to its last complete value. Raises ValueError if nothing
+        usable was found.
+        """
+        if self._start is None:
+            raise ValueError("No JSON object in model output")
+        if self._end is not None:
+            return json.loads(self.buffer[self._start:self._end]), False
+        for end, closers in reversed(self._repair_points):
+            try:
+                return json.loads(self.buffer[self._start:end] + closers), True
+            except ValueError:
+                continue
+        raise ValueError("Could not repair truncated JSON")
+
+
+def repair_truncated_json(text):
+    """(result, repaired) for a complete or truncated JSON object, see StreamingJsonParser.finish."""
+    parser = StreamingJsonParser()
+    parser.feed(text)
+    return parser.finish()
@@ -0,0 +1,138 @@
+"""
+Local BM25 inverted index over captions.txt and audio_transcriptions.txt.
+Built in memory and refreshed incrementally: only lines appended since the last
+refresh are tokenized, so ingest never triggers a full rebuild. Used by
+vector_store for hybrid (BM25 + cosine, reciprocal rank fusion) retrieval.
+"""
+import os
+import math
+import re
+import hashlib
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_FILES = {
+    "captions": os.path.join(BASE_DIR, "captions.txt"),
+    "audio": os.path.join(BASE_DIR, "audio_transcriptions.txt"),
+}
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60  # reciprocal rank fusion constant (standard value from the RRF paper)
+
+# Very common words carry no signal in short captions ("a man is standing in a room")
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "of", "in", "on", "at", "to", "and", "or",
+    "with", "for", "by", "it", "its", "this", "that", "be", "as", "from", "up", "down",
+}
+
+_lock = threading.Lock()
+# name -> {"offset": bytes consumed, "ids": [...], "texts": [...], "lengths": [...],
+#          "total_length": int, "postings": {token: {doc_idx: tf}}, "id_to_idx": {...}}
+_indexes = {}
+
+def split_frame_name(frame: str):
+    """youtube_001_frame_0042.jpg -> ("youtube_001_frame_", 42, ".jpg"); frame_0042.jpg -> ("frame_", 42, ".jpg")."""
+    m = re.match(r"^(.*?)(\d+)(\.\w+)?$", frame or "")
+    if not m:
+        return frame or "", 0, ""
+    return m.group(1), int(m.group(2)), m.group(3) or ""
+
+def caption_row_id(frame: str, caption: str) -> str:
+    """
+    Id of the caption row a frame belongs to: one row per distinct (source, caption),
+    shared by every frame of that source with the same caption (youtube_001_frame_caption_<hash>).
+    """
+    prefix, _, _ = split_frame_name(frame)
+    return f"{prefix}caption_{hashlib.sha1(caption.encode('utf-8')).hexdigest()[:16]}"
+
+# Document id per index: captions collapse frames with identical captions into one row
+DOC_ID_FUNCTIONS = {
+    "captions": caption_row_id,
+    "audio": lambda doc_id, text: doc_id,
+}
+
+def tokenize(text: str):
+    return [t for t in re.findall(r"[a-z0-9']+", (text or "").lower()) if t not in STOPWORDS]
+
+def _empty_index():
+    return {"offset": 0, "ids": [], "texts": [], "lengths": [], "total_length": 0, "postings": {}, "id_to_idx": {}}
+
+def refresh_index(name: str):
+    """Tokenize lines appended to the source file since the last refresh (cheap no-op if unchanged)."""
+    path = SOURCE_FILES[name]
+    with _lock:
+        index = _indexes.setdefault(name, _empty_index())
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return index
+        if size < index["offset"]:
+            # File was rewritten (not appended): start over
+            index = _indexes[name] = _empty_index()
+        if size == index["offset"]:
+            return index
+        with open(path, "rb") as f:
+            f.seek(index["offset"])
+            data = f.read(size - index["offset"])
+        # Only consume complete lines; a half-written last line is picked up next time
+        end = data.rfind(b"\n") + 1
+        index["offset"] += end
+        for raw in data[:end].decode("utf-8", errors="replace").splitlines():
+            if ": " not in raw:
+                continue
+            key, text = raw.strip().split(": ", 1)
+            doc_id = DOC_ID_FUNCTIONS[name](key, text)
+            if doc_id in index["id_to_idx"]:
+                continue
+            tokens = tokenize(text)
+            doc_idx = len(index["ids"])
+            index["id_to_idx"][doc_id] = doc_idx
+            index["ids"].append(doc_id)
+            index["texts"].append(text)
+            index["lengths"].append(len(tokens))
+            index["total_length"] += len(tokens)
+            for token in tokens:
+                postings = index["postings"].setdefault(token, {})
+                postings[doc_idx] = postings.get(doc_idx, 0) + 1
+        return index
+
+def bm25_search(name: str, query: str, top_k: int = 50, require_all: bool = False, doc_filter=None):
+    """
+    BM25 ranking over one index. Returns [(doc_id, text, score), ...] best first.
+    require_all: only documents containing every query token (exact-name / quoted lookups).
+    doc_filter: optional predicate on doc_id (e.g. source scope), applied before taking top_k.
+    """
+    index = refresh_index(name)
+    tokens = list(dict.fromkeys(tokenize(query)))
+    n_docs = len(index["ids"])
+    if not tokens or n_docs == 0:
+        return []
+    avg_len = index["total_length"] / n_docs or 1.0
+
+    scores = {}
+    matched = {}
+    for token in tokens:
+        postings = index["postings"].get(token)
+        if not postings:
+            continue
+        idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+        for doc_idx, tf in postings.items():
+            norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * index["lengths"][doc_idx] / avg_len))
+            scores[doc_idx] = scores.get(doc_idx, 0.0) + idf * norm
+            matched[doc_idx] = matched.get(doc_idx, 0) + 1
+
+    if require_all:
+        scores = {d: s for d, s in scores.items() if matched[d] == len(tokens)}
+    if doc_filter is not None:
+        scores = {d: s for d, s in scores.items() if doc_filter(index["ids"][d])}
+    ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
+    return [(index["ids"][d], index["texts"][d], s) for d, s in ranked]
+
+def reciprocal_rank_fusion(*rankings):
+    """Fuse ranked id lists: score(id) = sum 1 / (RRF_K + rank). Returns {id: fused_score}."""
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (RRF_K + rank)
+    return fused
@@ -0,0 +1,185 @@
+"""
+Persistent prompt-keyed cache for LLM completions (explanations and suggestions).
+Entries are keyed by a hash of model, messages, temperature and max_tokens and stored in a
+local SQLite file (WAL mode), so every API worker process shares the same cache.
+- LLM_CACHE_ENABLED: set to 0 to bypass the cache
+- LLM_CACHE_TTL: seconds an entry stays valid (default 7 days)
+- LLM_CACHE_MAX_ENTRIES: least recently used entries are evicted beyond this (default 5000)
+- LLM_CACHE_FLUSH_INTERVAL: seconds between writes of buffered hit/miss counters and last_used
+  times (default 30), so a lookup is a read and only occasionally a write
+Cache errors never fail a request: they are logged and treated as misses.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(BASE_DIR, "llm_cache.sqlite3"))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_FLUSH_INTERVAL = float(os.getenv("LLM_CACHE_FLUSH_INTERVAL", "30"))
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_process_stats = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+# Not yet written to SQLite: lookup counters and {key: (last_used, hits)} for cache hits
+_pending = {"hits": 0, "misses": 0, "touched": {}}
+_last_flush = time.monotonic()
+
+
+def _connect():
+    # sqlite3 connections are per thread; one lazily opened connection per thread
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(LLM_CACHE_PATH, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache(last_used)")
+        # Lookup totals across all workers (per-process counters are kept in _process_stats)
+        conn.execute("CREATE TABLE IF NOT EXISTS llm_cache_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def _count(name):
+    with _stats_lock:
+        _process_stats[name] += 1
+
+
+def _record_lookup(key, hit, now):
+    with _stats_lock:
+        _process_stats["hits" if hit else "misses"] += 1
+        _pending["hits" if hit else "misses"] += 1
+        if hit:
+            _, hits = _pending["touched"].get(key, (now, 0))
+            _pending["touched"][key] = (now, hits + 1)
+
+
+def _flush_pending(conn, force=False):
+    """Write buffered lookup counters and last_used times; at most once per LLM_CACHE_FLUSH_INTERVAL unless forced."""
+    global _last_flush
+    with _stats_lock:
+        if not force and time.monotonic() - _last_flush < LLM_CACHE_FLUSH_INTERVAL:
+            return
+        if not (_pending["hits"] or _pending["misses"] or _pending["touched"]):
+            _last_flush = time.monotonic()
+            return
+        hits, misses, touched = _pending["hits"], _pending["misses"], _pending["touched"]
+        _pending.update(hits=0, misses=0, touched={})
+        _last_flush = time.monotonic()
+    try:
+        conn.executemany(
+            "UPDATE llm_cache SET last_used = MAX(last_used, ?), hits = hits + ? WHERE key = ?",
+            [(used, n, key) for key, (used, n) in touched.items()]
+        )
+        conn.executemany(
+            "INSERT INTO llm_cache_stats (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            [(name, n) for name, n in (("hits", hits), ("misses", misses)) if n]
+        )
+        conn.commit()
+    except sqlite3.Error:
+        # Put the counts back so the next flush retries them
+        with _stats_lock:
+            _pending["hits"] += hits
+            _pending["misses"] += misses
+            for key, (used, n) in touched.items():
+                prev_used, prev_n = _pending["touched"].get(key, (used, 0))
+                _pending["touched"][key] = (max(used, prev_used), prev_n + n)
+        raise
+
+
+def cache_key(request):
+    """Hash of the parts of a chat completion request that determine its output."""
+    payload = {
+        "model": request.get("model"),
+        "messages": request.get("messages"),
+        "temperature": request.get("temperature"),
+        "max_tokens": request.get("max_tokens"),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def get_cached(request):
+    """Cached response text for a chat completion request, or None (miss, expired or disabled)."""
+    if not LLM_CACHE_ENABLED:
+        return None
+    key = cache_key(request)
+    now = time.time()
+    try:
+        conn = _connect()
+        row = conn.execute("SELECT response, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        hit = row is not None and now - row[1] <= LLM_CACHE_TTL
+    except sqlite3.Error as e:
+        print(f"⚠️ LLM cache lookup failed: {e}")
+        _count("errors")
+        return None
+    _record_lookup(key, hit, now)
+    try:
+        _flush_pending(conn)
+    except sqlite3.Error as e:
+        print(f"⚠️ LLM cache stats write failed: {e}")
+        _count("errors")
+    return row[0] if hit else None
+
+
+def set_cached(request, response):
+    """Store the response text for a request, then drop expired and least recently used entries."""
+    if not LLM_CACHE_ENABLED or not response:
+        return
+    now = time.time()
+    try:
+        conn = _connect()
+        # Recency first, so eviction below sees the latest last_used times
+        _flush_pending(conn, force=True)
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, model, response, created, last_used, hits) VALUES (?, ?, ?, ?, ?, 0)",
+            (cache_key(request), request.get("model"), response, now, now)
+        )
+        conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - LLM_CACHE_TTL,))
+        conn.execute(
+            "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (LLM_CACHE_MAX_ENTRIES,)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"⚠️ LLM cache write failed: {e}")
+        _count("errors")
+        return
+    _count("writes")
+
+
+def _hit_rate(hits, misses):
+    return round(hits / (hits + misses), 3) if hits + misses else 0.0
+
+
+def cache_stats():
+    """Entry count and hit rate for this process and across all workers (served at /metrics/llm-cache)."""
+    with _stats_lock:
+        process = dict(_process_stats)
+    process["hit_rate"] = _hit_rate(process["hits"], process["misses"])
+    stats = {"enabled": LLM_CACHE_ENABLED, "ttl_seconds": LLM_CACHE_TTL, "max_entries": LLM_CACHE_MAX_ENTRIES,
+             "process": process}
+    if not LLM_CACHE_ENABLED:
+        return stats
+    try:
+        conn = _connect()
+        _flush_pending(conn, force=True)
+        totals = dict(conn.execute("SELECT name, value FROM llm_cache_stats").fetchall())
+        stats["entries"] = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+    except sqlite3.Error as e:
+        print(f"⚠️ LLM cache stats failed: {e}")
+        return stats
+    hits, misses = totals.get("hits", 0), totals.get("misses", 0)
+    stats["all_workers"] = {"hits": hits, "misses": misses, "hit_rate": _hit_rate(hits, misses)}
+    return stats
@@ -0,0 +1,271 @@
+"""
+Shared LLM client layer used by rag_generator (explanations/suggestions) and production_planner.
+- One pooled HTTP client (keep-alive connections) per provider, sync and async, created lazily
+- Concurrency limits: threading semaphore for sync calls, executors.llm_limiter for async calls
+- Retries with jittered exponential backoff on connection errors, timeouts, 429 and 5xx
+- Per-call latency and token metrics per provider (served at /metrics/llm)
+Providers: openai (OPENAI_API_KEY / OPENAI_MODEL), groq (GROQ_API_KEY / GROQ_MODEL) and local, any
+OpenAI-compatible endpoint such as Ollama (LLM_LOCAL_URL, default OLLAMA_URL + /v1, model OLLAMA_MODEL)
+or the offline stand-in server in llm_standin.py.
+Each role picks a provider: RAG_LLM_PROVIDER (default openai), PLANNER_LLM_PROVIDER (default groq);
+LLM_PROVIDER overrides both, e.g. LLM_PROVIDER=local to run everything offline.
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).resolve().parent / ".env")
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_POOL_CONNECTIONS = int(os.getenv("LLM_POOL_CONNECTIONS", "20"))
+LLM_SYNC_CONCURRENCY = int(os.getenv("LLM_SYNC_CONCURRENCY", os.getenv("LLM_MAX_CONCURRENCY", "8")))
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+LLM_LOCAL_URL = os.getenv("LLM_LOCAL_URL", OLLAMA_URL.rstrip("/") + "/v1")
+
+PROVIDERS = {
+    "openai": {"package": "openai", "key_env": "OPENAI_API_KEY", "model_env": "OPENAI_MODEL", "model": "gpt-3.5-turbo"},
+    "groq": {"package": "groq", "key_env": "GROQ_API_KEY", "model_env": "GROQ_MODEL", "model": "llama-3.3-70b-versatile"},
+    "local": {"package": "openai", "key_env": None, "model_env": "OLLAMA_MODEL", "model": "llama3.2:1b",
+              "base_url": LLM_LOCAL_URL},
+}
+ROLE_DEFAULTS = {"rag": "openai", "planner": "groq"}
+
+# Status codes worth retrying; everything else (400, 401, 404, ...) fails immediately
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+LATENCY_WINDOW = 500
+
+
+class LLMUnavailable(Exception):
+    """The provider's package or API key is missing."""
+
+
+def _is_retryable(error):
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRY_STATUS
+    # openai/groq APIConnectionError and APITimeoutError (no status code), asyncio timeouts
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError", "TimeoutError", "ConnectError", "ReadTimeout")
+
+
+def _backoff(attempt):
+    # Full jitter: uniform in [0, base * 2^attempt] so retrying workers do not synchronize
+    return random.uniform(0, LLM_RETRY_BASE_DELAY * (2 ** attempt))
+
+
+class LLMClient:
+    """Pooled sync + async chat completion client for one provider."""
+
+    def __init__(self, provider):
+        config = PROVIDERS[provider]
+        self.provider = provider
+        self.model = os.getenv(config["model_env"], config["model"])
+        self.base_url = config.get("base_url")
+        self.api_key = os.getenv(config["key_env"]) if config["key_env"] else "local"
+        self.unavailable_reason = None
+        try:
+            if config["package"] == "groq":
+                import groq as sdk
+                self._sync_cls, self._async_cls = sdk.Groq, sdk.AsyncGroq
+            else:
+                import openai as sdk
+                self._sync_cls, self._async_cls = sdk.OpenAI, sdk.AsyncOpenAI
+        except ImportError:
+            self.unavailable_reason = f"{config['package']} package not installed. Install with: pip install {config['package']}"
+        if not self.unavailable_reason and not self.api_key:
+            self.unavailable_reason = f"{config['key_env']} not found in .env file"
+        self.available = self.unavailable_reason is None
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+        self._sync_slots = threading.BoundedSemaphore(LLM_SYNC_CONCURRENCY)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._stats = {"calls": 0, "errors": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def _kwargs(self, http_client):
+        kwargs = {"api_key": self.api_key, "http_client": http_client, "max_retries": 0, "timeout": LLM_TIMEOUT}
+        if self.base_url:
+            kwargs["base_url"] = self.base_url
+        return kwargs
+
+    def _limits(self):
+        import httpx
+        return httpx.Limits(max_connections=LLM_POOL_CONNECTIONS, max_keepalive_connections=LLM_POOL_CONNECTIONS)
+
+    def _sync(self):
+        if not self.available:
+            raise LLMUnavailable(self.unavailable_reason)
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import httpx
+                    self._client = self._sync_cls(**self._kwargs(httpx.Client(limits=self._limits())))
+        return self._client
+
+    def _async(self):
+        if not self.available:
+            raise LLMUnavailable(self.unavailable_reason)
+        if self._async_client is None:
+            import httpx
+            self._async_client = self._async_cls(**self._kwargs(httpx.AsyncClient(limits=self._limits())))
+        return self._async_client
+
+    def _request(self, request):
+        request = dict(request)
+        request.setdefault("model", self.model)
+        return request
+
+    def _record(self, started, usage=None, error=False, retries=0):
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["retries"] += retries
+            if error:
+                self._stats["errors"] += 1
+            else:
+                self._latencies.append(time.perf_counter() - started)
+            if usage is not None:
+                self._stats["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+                self._stats["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
+    def complete(self, **request):
+        """Chat completion text (blocking), retried on transient errors."""
+        client = self._sync()
+        request = self._request(request)
+        started = time.perf_counter()
+        with self._sync_slots:
+            for attempt in range(LLM_MAX_RETRIES + 1):
+                try:
+                    response = client.chat.completions.create(**request)
+                    break
+                except Exception as e:
+                    if attempt == LLM_MAX_RETRIES or not _is_retryable(e):
+                        self._record(started, error=True, retries=attempt)
+                        raise
+                    time.sleep(_backoff(attempt))
+        self._record(started, response.usage, retries=attempt)
+        return response.choices[0].message.content
+
+    async def acomplete(self, request, timeout=None):
+        """Chat completion text from an async handler, under the shared LLM concurrency limit.
+        timeout bounds the whole call including retries (asyncio.TimeoutError)."""
+        from executors import llm_limiter
+
+        client = self._async()
+        request = self._request(request)
+
+        async def call():
+            for attempt in range(LLM_MAX_RETRIES + 1):
+                try:
+                    return await client.chat.completions.create(**request), attempt
+                except Exception as e:
+                    if attempt == LLM_MAX_RETRIES or not _is_retryable(e):
+                        raise
+                    await asyncio.sleep(_backoff(attempt))
+
+        async with llm_limiter:
+            started = time.perf_counter()
+            try:
+                response, retries = await asyncio.wait_for(call(), timeout)
+            except BaseException:
+                self._record(started, error=True)
+                raise
+        self._record(started, response.usage, retries=retries)
+        return response.choices[0].message.content
+
+    async def astream(self, request, deadline=None):
+        """
+        Yield text deltas of a streamed chat completion under the shared LLM limit.
+        deadline: event-loop time after which asyncio.TimeoutError is raised (covers the whole stream).
+        Only opening the stream is retried; a stream that fails midway raises.
+        """
+        from executors import llm_limiter
+
+        client = self._async()
+        request = self._request(request)
+        loop = asyncio.get_running_loop()
+
+        def remaining():
+            return None if deadline is None else max(0.0, deadline - loop.time())
+
+        async with llm_limiter:
+            started = time.perf_counter()
+            stream = None
+            retries = 0
+            try:
+                for retries in range(LLM_MAX_RETRIES + 1):
+                    try:
+                        stream = await asyncio.wait_for(client.chat.completions.create(stream=True, **request), remaining())
+                        break
+                    except asyncio.TimeoutError:
+                        raise
+                    except Exception as e:
+                        if retries == LLM_MAX_RETRIES or not _is_retryable(e):
+                            raise
+                        await asyncio.sleep(_backoff(retries))
+                chunks = stream.__aiter__()
+                usage = None
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), remaining())
+                    except StopAsyncIteration:
+                        break
+                    usage = getattr(chunk, "usage", None) or usage
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        yield delta
+            except BaseException:
+                self._record(started, error=True, retries=retries)
+                raise
+            finally:
+                if stream is not None and hasattr(stream, "close"):
+                    await stream.close()
+        self._record(started, usage, retries=retries)
+
+    def metrics(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = dict(self._stats)
+
+        def pct(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else 0.0
+
+        stats.update({"model": self.model, "available": self.available, "latency_p50_ms": pct(0.5),
+                      "latency_p95_ms": pct(0.95)})
+        if self.base_url:
+            stats["base_url"] = self.base_url
+        return stats
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def role_provider(role):
+    """Provider name for a role ("rag" or "planner")."""
+    provider = os.getenv("LLM_PROVIDER") or os.getenv(f"{role.upper()}_LLM_PROVIDER") or ROLE_DEFAULTS[role]
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider '{provider}' (expected one of {', '.join(PROVIDERS)})")
+    return provider
+
+
+def get_llm(role):
+    """Shared LLMClient for a role; roles on the same provider share one connection pool."""
+    provider = role_provider(role)
+    with _clients_lock:
+        if provider not in _clients:
+            _clients[provider] = LLMClient(provider)
+            if not _clients[provider].available:
+                print(f"⚠️ LLM provider '{provider}' unavailable: {_clients[provider].unavailable_reason}")
+        return _clients[provider]
+
+
+def llm_metrics():
+    """Per-provider call counts, retries, errors, token usage and latency percentiles."""
+    with _clients_lock:
+        return {name: c.metrics() for name, c in _clients.items()}
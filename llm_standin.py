@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for an OpenAI-compatible LLM endpoint, for running and load-testing the app
+without API keys. Serves POST /v1/chat/completions (plain and stream=true) with deterministic
+canned answers shaped like the real ones: explanations, 3-line search suggestions, actor-name
+JSON arrays, production plans built from the script's INT./EXT. scene headings and costings
+of pre-parsed scenes.
+Usage: python llm_standin.py [--port 11435] [--latency 0.3] [--tokens-per-second 200]
+Then: LLM_PROVIDER=local LLM_LOCAL_URL=http://localhost:11435/v1 uvicorn app:app
+"""
+import re
+import json
+import time
+import asyncio
+import argparse
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="LLM stand-in")
+settings = {"latency": 0.3, "tokens_per_second": 200.0}
+
+SCENE_HEADING = re.compile(r"^\s*(?:\d+\s*[.)]?\s*)?((?:INT|EXT|INT\./EXT|I/E)\.?\s+.+)$", re.IGNORECASE | re.MULTILINE)
+CHARACTER_CUE = re.compile(r"^\s*([A-Z][A-Z .'-]{1,30})(?:\s*\(.*\))?\s*$", re.MULTILINE)
+
+
+def _script_from_prompt(prompt):
+    if "Script:" not in prompt:
+        return prompt
+    script = prompt.rsplit("Script:", 1)[1]
+    return script.split("\n\nTotal Budget:")[0]
+
+
+def _actor_names(prompt):
+    names = []
+    for cue in CHARACTER_CUE.findall(_script_from_prompt(prompt)):
+        cue = cue.strip()
+        if cue.startswith(("INT", "EXT", "CUT TO", "FADE")) or cue in ("MAN", "WOMAN"):
+            continue
+        name = cue.title()
+        if name not in names:
+            names.append(name)
+    return names[:20]
+
+
+def _production_plan(prompt):
+    budget_match = re.search(r"Total Budget: ₹([\d,]+(?:\.\d+)?)", prompt)
+    total_budget = float(budget_match.group(1).replace(",", "")) if budget_match else 1000000.0
+    count_match = re.search(r"Create exactly (\d+) scenes", prompt)
+    actors_match = re.search(r"Available actors \(use these exact names in required_actors\): (.+)", prompt)
+    actors = [a.strip() for a in actors_match.group(1).split(",")] if actors_match else []
+    headings = [h.strip() for h in SCENE_HEADING.findall(_script_from_prompt(prompt))] or ["INT. LOCATION - DAY"]
+    count = int(count_match.group(1)) if count_match else len(headings)
+    per_scene = round(total_budget / count, 2)
+    shares = {"cast_and_crew": 0.35, "location_and_set": 0.2, "props_and_costumes": 0.1,
+              "equipment_and_technical": 0.2, "special_effects_and_stunts": 0.05, "miscellaneous": 0.1}
+    scenes = []
+    for i in range(count):
+        heading = headings[i % len(headings)]
+        scenes.append({
+            "scene_number": i + 1,
+            "scene_title": heading.split(" - ")[0].split(".", 1)[-1].strip().title() or f"Scene {i + 1}",
+            "location": "outdoor" if heading.upper().startswith("EXT") else "indoor",
+            "time_of_day": "night" if "NIGHT" in heading.upper() else "day",
+            "description": heading,
+            "required_actors": actors[i % len(actors):i % len(actors) + 2] if actors else [],
+            "estimated_days": 1,
+            "budget": {
+                "total_scene_budget": per_scene,
+                "breakdown": {k: round(per_scene * v, 2) for k, v in shares.items()},
+            },
+            "safety_measures": ["Standard set safety briefing"],
+            "risks": [{"risk_description": "Schedule overrun", "risk_level": "Low", "mitigation": "Buffer half a day"}],
+        })
+    return {
+        "total_budget": total_budget,
+        "scenes": scenes,
+        "budget_summary": {"total_allocated": round(per_scene * count, 2),
+                           "remaining_budget": round(total_budget - per_scene * count, 2)},
+    }
+
+
+def _scene_costing(prompt):
+    budget_match = re.search(r"Total Budget for these \d+ scenes: ₹([\d,]+(?:\.\d+)?)", prompt)
+    numbers = [int(n) for n in re.findall(r"^Scene (\d+): ", prompt, re.MULTILINE)]
+    per_scene = round(float(budget_match.group(1).replace(",", "")) / max(1, len(numbers)), 2) if budget_match else 100000.0
+    return {"scenes": [{
+        "scene_number": n,
+        "scene_title": f"Scene {n}",
+        "description": "Stand-in description",
+        "budget": {"total_scene_budget": per_scene, "breakdown": {"cast_and_crew": per_scene}},
+        "safety_measures": ["Standard set safety briefing"],
+        "risks": [{"risk_description": "Schedule overrun", "risk_level": "Low", "mitigation": "Buffer half a day"}],
+    } for n in numbers]}
+
+
+def canned_answer(messages):
+    """Deterministic answer for the prompts rag_generator and production_planner send."""
+    system = next((m["content"] for m in messages if m["role"] == "system"), "")
+    prompt = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+    if "extract character names" in system:
+        return json.dumps(_actor_names(prompt))
+    if "already been broken into scenes" in prompt:
+        return json.dumps(_scene_costing(prompt), indent=2)
+    if "production planner" in system:
+        return json.dumps(_production_plan(prompt), indent=2)
+    if "search queries" in system or "search phrases" in system:
+        query = re.search(r'"([^"]*)"', prompt)
+        query = query.group(1) if query else "key moment"
+        return f"{query}\nbefore {query}\nafter {query}"
+    count = re.search(r"Found (\d+) matching", prompt)
+    top = re.search(r"1\. At ([\d.]+)s-[\d.]+s: '(.*)'", prompt)
+    if top:
+        return (f"I found {count.group(1) if count else 'several'} moments that match your search. "
+                f"The best match is at {top.group(1)}s, showing '{top.group(2)}'.")
+    return "This is a canned response from the local LLM stand-in."
+
+
+def _usage(messages, text):
+    prompt_tokens = sum(len(m["content"].split()) for m in messages)
+    completion_tokens = len(text.split())
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+@app.get("/v1/models")
+def models():
+    return {"object": "list", "data": [{"id": "standin", "object": "model", "owned_by": "local"}]}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    model = body.get("model", "standin")
+    text = canned_answer(messages)
+    created = int(time.time())
+    await asyncio.sleep(settings["latency"])
+    if not body.get("stream"):
+        return {
+            "id": f"chatcmpl-standin-{created}", "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": _usage(messages, text),
+        }
+
+    async def events():
+        # Token-ish chunks (words with their trailing whitespace) at tokens_per_second
+        for piece in re.findall(r"\S+\s*", text):
+            chunk = {"id": f"chatcmpl-standin-{created}", "object": "chat.completion.chunk", "created": created,
+                     "model": model, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(1.0 / settings["tokens_per_second"])
+        final = {"id": f"chatcmpl-standin-{created}", "object": "chat.completion.chunk", "created": created,
+                 "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible LLM stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    args = parser.parse_args()
+    settings["latency"] = args.latency
+    settings["tokens_per_second"] = args.tokens_per_second
+    print(f"🤖 LLM stand-in on http://{args.host}:{args.port}/v1 (latency {args.latency}s)")
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
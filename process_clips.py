@@ -5,14 +5,16 @@ Incremental: does not erase existing frames or captions.
 """
 import sys
 import os
-import json
 import re
 import subprocess
+import time
+from source_registry import register_source, update_source_stats, find_by_content_hash, add_source_alias
 
 def default_logger(msg):
     print(msg)
 
 SOURCE_CLIPS_DIR = "source_clips"
+INCOMING_DIR = os.path.join(SOURCE_CLIPS_DIR, ".incoming")  # uploads staged here until a clip id is assigned
 FRAMES_DIR = "frames"
 CAPTIONS_FILE = "captions.txt"
 FPS = 5
@@ -40,30 +42,42 @@ def get_existing_captioned_frames():
                 existing.add(frame)
     return existing
 
+_captioner = None  # predict_step for this process; loaded once, reused across clips
+
+def _get_captioner():
+    """Load the ViT-GPT2 captioner once per process and return predict_step(paths) -> [caption]."""
+    global _captioner
+    if _captioner is not None:
+        return _captioner
+    from transformers import VisionEncoderDecoderModel, ViTImageProcessor, AutoTokenizer
+    from PIL import Image
+    import torch
+
+    model_name = "nlpconnect/vit-gpt2-image-captioning"
+    model = VisionEncoderDecoderModel.from_pretrained(model_name)
+    feature_extractor = ViTImageProcessor.from_pretrained(model_name)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model.to(device)
+    max_length, num_beams = 16, 4
+    gen_kwargs = {"max_length": max_length, "num_beams": num_beams}
+
+    def predict_step(paths):
+        images = [Image.open(p).convert("RGB") for p in paths]
+        pixel_values = feature_extractor(images=images, return_tensors="pt").pixel_values.to(device)
+        output_ids = model.generate(pixel_values, **gen_kwargs)
+        return [t.strip() for t in tokenizer.batch_decode(output_ids, skip_special_tokens=True)]
+
+    _captioner = predict_step
+    return _captioner
+
 def caption_new_frames(new_frame_paths, update_status=default_logger):
     """Generate captions for new frames and append to captions.txt."""
     if not new_frame_paths:
         return
     try:
-        from transformers import VisionEncoderDecoderModel, ViTImageProcessor, AutoTokenizer
-        from PIL import Image
-        import torch
         from tqdm import tqdm
-
-        model_name = "nlpconnect/vit-gpt2-image-captioning"
-        model = VisionEncoderDecoderModel.from_pretrained(model_name)
-        feature_extractor = ViTImageProcessor.from_pretrained(model_name)
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        model.to(device)
-        max_length, num_beams = 16, 4
-        gen_kwargs = {"max_length": max_length, "num_beams": num_beams}
-
-        def predict_step(paths):
-            images = [Image.open(p).convert("RGB") for p in paths]
-            pixel_values = feature_extractor(images=images, return_tensors="pt").pixel_values.to(device)
-            output_ids = model.generate(pixel_values, **gen_kwargs)
-            return [t.strip() for t in tokenizer.batch_decode(output_ids, skip_special_tokens=True)]
+        predict_step = _get_captioner()
 
         with open(CAPTIONS_FILE, "a") as outf:
             for path in tqdm(new_frame_paths, desc="Captioning new frames"):
@@ -89,10 +103,200 @@ def extract_frames_for_clip(video_path: str, output_prefix: str, frames_dir: str
     ]
     subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
-def process_clips_logic(file_data, update_status=default_logger):
+def _process_clips_serial(saved_paths, update_status=default_logger):
+    """
+    Single-process ingest (one clip, or INGEST_WORKERS=1).
+    Returns {clip_id: {"frame_count", "captioned_frames", "audio_segments", "complete"}}.
+    """
+    # 3. Extract frames for new clips only (keep existing frames)
+    new_frame_paths = []
+    frame_counts = {}
+    for clip_id, video_path in saved_paths:
+        update_status(f"🎞️ Extracting frames from clip {clip_id}...")
+        prefix = f"clip_{clip_id}_frame"
+        extract_frames_for_clip(video_path, prefix, FRAMES_DIR)
+        clip_frames = [f for f in os.listdir(FRAMES_DIR) if f.startswith(prefix) and f.endswith(".jpg")]
+        new_frame_paths.extend(os.path.join(FRAMES_DIR, f) for f in clip_frames)
+        frame_counts[clip_id] = len(clip_frames)
+        # Downscaled thumbnails + sprite sheets for result cards
+        try:
+            from thumbnails import generate_previews_for_source
+            generate_previews_for_source(f"clip_{clip_id}", update_status)
+        except Exception as e:
+            update_status(f"⚠️ Thumbnail generation error for clip {clip_id}: {e}")
+    new_frame_paths.sort()
+
+    # 4. Caption only new frames and append to captions.txt
+    existing = get_existing_captioned_frames()
+    to_caption = [p for p in new_frame_paths if os.path.basename(p) not in existing]
+    if to_caption:
+        update_status("🤖 Generating visual captions for new frames...")
+        caption_new_frames(to_caption, update_status)
+    else:
+        update_status("📝 No new frames to caption.")
+
+    # 5. Extract and transcribe audio for each clip
+    segment_counts = {}
+    for clip_id, video_path in saved_paths:
+        try:
+            from audio_processor import process_audio_for_video
+            update_status(f"🎵 Processing audio for clip {clip_id}...")
+            prefix = f"clip_{clip_id}"
+            segments = process_audio_for_video(video_path, prefix, update_status)
+            segment_counts[clip_id] = len(segments or [])
+            if segments:
+                update_status(f"✅ Processed {len(segments)} audio segments for clip {clip_id}")
+            else:
+                update_status(f"⚠️ No audio segments extracted for clip {clip_id}")
+        except ImportError:
+            update_status("⚠️ Audio processing not available (install openai-whisper)")
+            break
+        except Exception as e:
+            update_status(f"⚠️ Audio processing error for clip {clip_id}: {e}")
+
+    captioned = [os.path.basename(p) for p in to_caption]
+    return {
+        clip_id: {
+            "frame_count": frame_counts.get(clip_id, 0),
+            "captioned_frames": sum(1 for f in captioned if f.startswith(f"clip_{clip_id}_frame")),
+            "audio_segments": segment_counts.get(clip_id, 0),
+            "complete": _audio_complete(f"clip_{clip_id}"),
+        }
+        for clip_id, _ in saved_paths
+    }
+
+def _audio_complete(source_id: str) -> bool:
+    """Transcription finished and saved (process_audio_for_video reports errors instead of raising)."""
+    try:
+        from audio_processor import get_transcription_state
+        return get_transcription_state(source_id)["complete"]
+    except ImportError:
+        return False
+
+def get_ingest_workers(clip_count: int) -> int:
+    """Worker processes for multi-clip ingest: INGEST_WORKERS env, else one per core (capped by clip count)."""
+    try:
+        configured = int(os.getenv("INGEST_WORKERS", "0"))
+    except ValueError:
+        configured = 0
+    workers = configured if configured > 0 else (os.cpu_count() or 1)
+    return max(1, min(workers, clip_count))
+
+def _init_ingest_worker(torch_threads: int):
+    """Split cores between workers so per-process torch thread pools don't oversubscribe the machine."""
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    # Clips already run in parallel across workers: one transcription thread (and one Whisper
+    # model) per worker, instead of cpu//2 threads each loading its own model
+    os.environ["WHISPER_WORKERS"] = "1"
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+
+def _ingest_clip_worker(clip_id: str, video_path: str, existing_captions: set):
+    """
+    Runs in a pool process: frames, captions, thumbnails and transcription for one clip.
+    Captioner and Whisper models are loaded once per worker and reused for every clip it handles.
+    Captions are returned so the parent is the only writer of captions.txt and keeps each clip's
+    lines contiguous; transcriptions go through process_audio_for_video like the serial path
+    (resumable, skipped when complete, appends and progress under a cross-process file lock).
+    """
+    messages = []
+    log = messages.append
+    prefix = f"clip_{clip_id}_frame"
+    extract_frames_for_clip(video_path, prefix, FRAMES_DIR)
+    frames = sorted(f for f in os.listdir(FRAMES_DIR) if f.startswith(prefix) and f.endswith(".jpg"))
+
+    captions = []
+    to_caption = [f for f in frames if f not in existing_captions]
+    if to_caption:
+        try:
+            predict_step = _get_captioner()
+            for frame in to_caption:
+                try:
+                    captions.append((frame, predict_step([os.path.join(FRAMES_DIR, frame)])[0]))
+                except Exception as e:
+                    log(f"⚠️ Caption error for {frame}: {e}")
+        except ImportError:
+            log("⚠️ Transformers not available for captioning")
+
+    try:
+        from thumbnails import generate_previews_for_source
+        generate_previews_for_source(f"clip_{clip_id}", log)
+    except Exception as e:
+        log(f"⚠️ Thumbnail generation error for clip {clip_id}: {e}")
+
+    segments = []
+    try:
+        from audio_processor import process_audio_for_video
+        segments = process_audio_for_video(video_path, f"clip_{clip_id}", log)
+    except ImportError:
+        log("⚠️ Audio processing not available (install openai-whisper)")
+    except Exception as e:
+        log(f"⚠️ Audio processing error for clip {clip_id}: {e}")
+
+    return {
+        "clip_id": clip_id,
+        "frame_count": len(frames),
+        "captions": captions,
+        "segments": segments,
+        "audio_complete": _audio_complete(f"clip_{clip_id}"),
+        "messages": messages,
+    }
+
+def _process_clips_parallel(saved_paths, workers, update_status=default_logger):
+    """
+    Multi-clip ingest: fan clips out over a process pool, then write captions from the parent
+    in clip-number order (workers append their own transcriptions).
+    Returns {clip_id: {"frame_count", "captioned_frames", "audio_segments", "complete"}}.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    existing = get_existing_captioned_frames()
+    update_status(f"⚡ Processing {len(saved_paths)} clips on {workers} worker processes...")
+
+    stats = {}
+    # spawn: the API process has model/tokenizer threads running, fork could deadlock
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_ingest_worker, initargs=(torch_threads,)) as pool:
+        futures = [
+            (clip_id, video_path, pool.submit(
+                _ingest_clip_worker, clip_id, video_path,
+                {f for f in existing if f.startswith(f"clip_{clip_id}_frame")}
+            ))
+            for clip_id, video_path in saved_paths
+        ]
+        # Collect in submission (clip number) order so captions.txt stays grouped by clip
+        for done, (clip_id, video_path, future) in enumerate(futures, 1):
+            try:
+                result = future.result()
+            except Exception as e:
+                update_status(f"⚠️ Ingest error for clip {clip_id}: {e}")
+                stats[clip_id] = {"frame_count": 0, "captioned_frames": 0, "audio_segments": 0, "complete": False}
+                continue
+            for msg in result["messages"]:
+                update_status(msg)
+            if result["captions"]:
+                with open(CAPTIONS_FILE, "a") as outf:
+                    outf.writelines(f"{frame}: {caption}\n" for frame, caption in result["captions"])
+            stats[clip_id] = {
+                "frame_count": result["frame_count"],
+                "captioned_frames": len(result["captions"]),
+                "audio_segments": len(result["segments"]),
+                "complete": result["audio_complete"],
+            }
+            update_status(f"✅ Clip {clip_id} done ({done}/{len(futures)})")
+    return stats
+
+def process_clips_logic(uploads, update_status=default_logger):
     """
     Process multiple uploaded video files. Incremental: keeps existing frames and captions.
-    file_data: list of (filename, file_content_bytes) - content read before passing.
+    uploads: list of (filename, staged_path, sha256) - files already streamed to
+    source_clips/.incoming/ by the API, so no clip is ever held in memory here.
     """
     try:
         update_status("Starting processing for uploaded clips...")
@@ -102,70 +306,65 @@ def process_clips_logic(file_data, update_status=default_logger):
         os.makedirs(FRAMES_DIR, exist_ok=True)
         os.makedirs("clips", exist_ok=True)
 
-        # 2. Find next clip index and save uploaded files
-        start_idx = get_next_clip_index()
+        job_start = time.time()
+
+        # 2. Find next clip index, save uploaded files and record them in the source catalog.
+        # Media already in the catalog (same bytes) is linked to the existing source instead.
+        next_idx = get_next_clip_index()
         saved_paths = []
-        for i, (filename, content) in enumerate(file_data):
-            clip_id = f"{start_idx + i:03d}"
+        batch_hashes = {}  # duplicates within this batch (hashes are only matched once ingest completes)
+        for filename, staged_path, content_hash in uploads:
+            known = find_by_content_hash(content_hash) if content_hash else None
+            source_id = known["source_id"] if known else batch_hashes.get(content_hash)
+            if source_id:
+                os.remove(staged_path)
+                add_source_alias(source_id, filename)
+                update_status(f"♻️ {filename} already ingested as {source_id} - reusing its frames, captions and transcriptions")
+                continue
+            clip_id = f"{next_idx:03d}"
+            next_idx += 1
             ext = os.path.splitext(filename)[1] or ".mp4"
             save_path = os.path.join(SOURCE_CLIPS_DIR, f"clip_{clip_id}{ext}")
-            with open(save_path, "wb") as f:
-                f.write(content)
+            os.replace(staged_path, save_path)  # same filesystem: rename, no copy
             saved_paths.append((clip_id, save_path))
+            register_source(f"clip_{clip_id}", save_path, "clip", content_hash=content_hash, update_status=update_status)
+            if content_hash:
+                batch_hashes[content_hash] = f"clip_{clip_id}"
             update_status(f"📥 Saved clip {clip_id}: {os.path.basename(save_path)}")
 
-        # 3. Update config with all sources
-        all_sources = []
-        if os.path.exists(SOURCE_CLIPS_DIR):
-            for f in sorted(os.listdir(SOURCE_CLIPS_DIR)):
-                if f.lower().endswith((".mp4", ".mov", ".webm", ".avi", ".mkv")):
-                    all_sources.append(os.path.join(SOURCE_CLIPS_DIR, f))
-        config = {"mode": "clips", "sources": all_sources, "clip_count": len(all_sources)}
-        with open("video_config.json", "w") as f:
-            json.dump(config, f, indent=4)
-
-        # 4. Extract frames for new clips only (keep existing frames)
-        new_frame_paths = []
-        for clip_id, video_path in saved_paths:
-            update_status(f"🎞️ Extracting frames from clip {clip_id}...")
-            prefix = f"clip_{clip_id}_frame"
-            extract_frames_for_clip(video_path, prefix, FRAMES_DIR)
-            for f in os.listdir(FRAMES_DIR):
-                if f.startswith(prefix) and f.endswith(".jpg"):
-                    new_frame_paths.append(os.path.join(FRAMES_DIR, f))
-        new_frame_paths.sort()
-
-        # 5. Caption only new frames and append to captions.txt
-        existing = get_existing_captioned_frames()
-        to_caption = [p for p in new_frame_paths if os.path.basename(p) not in existing]
-        if to_caption:
-            update_status("🤖 Generating visual captions for new frames...")
-            caption_new_frames(to_caption, update_status)
+        if not saved_paths:
+            update_status("COMPLETED")
+            return
+
+        workers = get_ingest_workers(len(saved_paths))
+        if workers > 1:
+            # Multi-clip mode: steps 3-5 run per clip in parallel worker processes
+            clip_stats = _process_clips_parallel(saved_paths, workers, update_status)
         else:
-            update_status("📝 No new frames to caption.")
+            clip_stats = _process_clips_serial(saved_paths, update_status)
 
-        # 6. Extract and transcribe audio for each clip
-        for clip_id, video_path in saved_paths:
-            try:
-                from audio_processor import process_audio_for_video
-                update_status(f"🎵 Processing audio for clip {clip_id}...")
-                prefix = f"clip_{clip_id}"
-                segments = process_audio_for_video(video_path, prefix, update_status)
-                if segments:
-                    update_status(f"✅ Processed {len(segments)} audio segments for clip {clip_id}")
-                else:
-                    update_status(f"⚠️ No audio segments extracted for clip {clip_id}")
-            except ImportError:
-                update_status("⚠️ Audio processing not available (install openai-whisper)")
-                break
-            except Exception as e:
-                update_status(f"⚠️ Audio processing error for clip {clip_id}: {e}")
+        for clip_id, _ in saved_paths:
+            stats = clip_stats.get(clip_id, {})
+            update_source_stats(
+                f"clip_{clip_id}",
+                frame_count=stats.get("frame_count", 0),
+                ingest_complete=stats.get("complete", False),
+                captioned_frames=stats.get("captioned_frames", 0),
+                audio_segments=stats.get("audio_segments", 0),
+                batch_ingest_seconds=round(time.time() - job_start, 1),
+                ingest_workers=workers,
+            )
 
         update_status("COMPLETED")
 
     except Exception as e:
         update_status(f"ERROR: {str(e)}")
         raise e
+    finally:
+        # Staged uploads not moved into source_clips/ (job failed early) would leak in .incoming/
+        for _, staged_path, _ in uploads:
+            if os.path.exists(staged_path):
+                os.remove(staged_path)
 
 
 if __name__ == "__main__":
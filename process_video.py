@@ -1,9 +1,11 @@
 import sys
 import os
-import json
 import subprocess
 import hashlib
-from datetime import datetime
+import time
+from source_registry import (
+    register_source, update_source_stats, find_by_video_id, find_by_content_hash, add_source_alias, hash_file
+)
 
 def default_logger(msg):
     print(msg)
@@ -12,7 +14,6 @@ import re
 
 FRAMES_DIR = "frames"
 CAPTIONS_FILE = "captions.txt"
-VIDEO_HISTORY_FILE = "video_history.json"
 SOURCE_CLIPS_DIR = "source_clips"
 FPS = 5
 
@@ -53,18 +54,6 @@ def get_existing_captioned_frames():
                 existing.add(frame)
     return existing
 
-def load_video_history():
-    """Load video processing history."""
-    if os.path.exists(VIDEO_HISTORY_FILE):
-        with open(VIDEO_HISTORY_FILE, "r") as f:
-            return json.load(f)
-    return {"videos": []}
-
-def save_video_history(history):
-    """Save video processing history."""
-    with open(VIDEO_HISTORY_FILE, "w") as f:
-        json.dump(history, f, indent=4)
-
 def extract_frames_for_youtube(video_path: str, output_prefix: str, frames_dir: str):
     """Extract frames from a video with a given prefix (e.g. youtube_001_frame)."""
     os.makedirs(frames_dir, exist_ok=True)
@@ -156,12 +145,11 @@ def process_video_logic(youtube_url, update_status=default_logger):
         video_id = get_youtube_video_id(youtube_url)
         
         # Check if this video was already processed
-        history = load_video_history()
-        for v in history.get("videos", []):
-            if v.get("video_id") == video_id:
-                update_status(f"⚠️ Video {video_id} already processed. Skipping to avoid duplicates.")
-                update_status("COMPLETED")
-                return
+        if find_by_video_id(video_id):
+            update_status(f"⚠️ Video {video_id} already processed. Skipping to avoid duplicates.")
+            update_status("COMPLETED")
+            return
+        job_start = time.time()
 
         # 1. Get next youtube index and prepare directories (NO DELETION)
         youtube_idx = get_next_youtube_index()
@@ -186,30 +174,21 @@ def process_video_logic(youtube_url, update_status=default_logger):
         ]
         subprocess.run(cmd_dl, check=True)
         
+        # Same bytes already ingested (e.g. uploaded as a clip or under another URL): link, don't reprocess
+        content_hash = hash_file(youtube_video_path)
+        known = find_by_content_hash(content_hash)
+        if known:
+            os.remove(youtube_video_path)
+            add_source_alias(known["source_id"], youtube_url)
+            update_status(f"♻️ Video already ingested as {known['source_id']} - reusing its frames, captions and transcriptions")
+            update_status("COMPLETED")
+            return
+
         update_status(f"📥 Saved as {youtube_prefix}.mp4 in source_clips/")
 
-        # 3. Update Configuration (append to history, not replace)
-        update_status("📝 Updating config...")
-        config = {
-            "mode": "youtube", 
-            "url": youtube_url,
-            "current_prefix": youtube_prefix,
-            "video_id": video_id,
-            "video_path": youtube_video_path
-        }
-        with open("video_config.json", "w") as f:
-            json.dump(config, f, indent=4)
-        
-        # Add to video history
-        history["videos"].append({
-            "type": "youtube",
-            "url": youtube_url,
-            "video_id": video_id,
-            "prefix": youtube_prefix,
-            "video_path": youtube_video_path,
-            "processed_at": datetime.now().isoformat()
-        })
-        save_video_history(history)
+        # 3. Record the source in the catalog (per-source URL, path, duration, codec)
+        register_source(youtube_prefix, youtube_video_path, "youtube", url=youtube_url, video_id=video_id,
+                        content_hash=content_hash, update_status=update_status)
         
         # 4. Extract Frames with unique prefix (keeps existing frames)
         update_status(f"🎞️ Extracting frames (5 FPS) with prefix {youtube_prefix}...")
@@ -224,6 +203,13 @@ def process_video_logic(youtube_url, update_status=default_logger):
         
         update_status(f"📁 Extracted {len(new_frame_paths)} frames")
 
+        # Downscaled thumbnails + sprite sheets for result cards
+        try:
+            from thumbnails import generate_previews_for_source
+            generate_previews_for_source(youtube_prefix, update_status)
+        except Exception as e:
+            update_status(f"⚠️ Thumbnail generation error: {e}")
+
         # 5. Generate Captions for NEW frames only (append to captions.txt)
         existing_captions = get_existing_captioned_frames()
         to_caption = [p for p in new_frame_paths if os.path.basename(p) not in existing_captions]
@@ -235,6 +221,7 @@ def process_video_logic(youtube_url, update_status=default_logger):
             update_status("📝 No new frames to caption.")
 
         # 6. Extract and transcribe audio
+        segments = []
         try:
             from audio_processor import process_audio_for_video
             update_status("🎵 Processing audio...")
@@ -248,6 +235,22 @@ def process_video_logic(youtube_url, update_status=default_logger):
         except Exception as e:
             update_status(f"⚠️ Audio processing error: {e}")
 
+        # process_audio_for_video reports errors instead of raising: trust the saved state
+        try:
+            from audio_processor import get_transcription_state
+            audio_complete = get_transcription_state(youtube_prefix)["complete"]
+        except ImportError:
+            audio_complete = False
+
+        update_source_stats(
+            youtube_prefix,
+            frame_count=len(new_frame_paths),
+            ingest_complete=audio_complete,
+            captioned_frames=len(to_caption),
+            audio_segments=len(segments or []),
+            ingest_seconds=round(time.time() - job_start, 1),
+        )
+
         update_status("COMPLETED")
         
     except Exception as e:
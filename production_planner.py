@@ -1,30 +1,34 @@
 # production_planner.py
 import os
+import re
 import json
+import math
+import asyncio
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from llm_client import get_llm
+from executors import compute_pool, PoolSaturated
+from json_stream import StreamingJsonParser, repair_truncated_json
+from script_parser import SCENE_HEADING_RE, parse_screenplay, extract_cast, day_or_night
+from scheduler import greedy_schedule, optimize_schedule, schedule_summary
 
 # Load .env from project root (same dir as this file)
 load_dotenv(Path(__file__).resolve().parent / ".env")
 
-try:
-    from groq import Groq
-    api_key = os.getenv("GROQ_API_KEY")
-    if api_key:
-        client = Groq(api_key=api_key)
-        GROQ_AVAILABLE = True
-    else:
-        print("⚠️ GROQ_API_KEY not found in .env file")
-        GROQ_AVAILABLE = False
-        client = None
-except ImportError:
-    print("⚠️ Groq package not installed. Install with: pip install groq")
-    GROQ_AVAILABLE = False
-    client = None
-except Exception as e:
-    print(f"⚠️ Groq client initialization failed: {e}")
-    GROQ_AVAILABLE = False
-    client = None
+# Shared pooled LLM client (llm_client.py); Groq by default, PLANNER_LLM_PROVIDER=local for Ollama / offline stand-in
+llm = get_llm("planner")
+LLM_AVAILABLE = llm.available
+
+LLM_UNAVAILABLE_ERROR = {"error": f"LLM API not available: {llm.unavailable_reason}. Add GROQ_API_KEY to your .env file or set PLANNER_LLM_PROVIDER=local."}
+
+def _strip_code_fence(content: str) -> str:
+    """Extract JSON if the model wrapped it in markdown code blocks."""
+    if "```json" in content:
+        return content.split("```json")[1].split("```")[0].strip()
+    if "```" in content:
+        return content.split("```")[1].split("```")[0].strip()
+    return content
 
 PRODUCTION_PROMPT = """You are a professional film production planner, line producer, and risk assessment expert.
 
@@ -157,40 +161,110 @@ Script:
 """
 
 
+# Screenplay-formatted scripts (INT./EXT. headings, character cues) are segmented and their cast
+# extracted by script_parser without an LLM; set LOCAL_SCRIPT_PARSER=0 to always use the LLM
+LOCAL_SCRIPT_PARSER = os.getenv("LOCAL_SCRIPT_PARSER", "1") != "0"
+# Longer scripts are split at scene headings and extracted per chunk
+EXTRACT_CHUNK_CHARS = 8000
+
+def _extract_actors_request(script_text: str):
+    # Callers pass chunks of at most EXTRACT_CHUNK_CHARS (split_script_into_chunks), keeping the prompt short
+    prompt = f"{EXTRACT_ACTORS_PROMPT}\n{script_text}"
+    return {
+        "model": llm.model,
+        "messages": [
+            {"role": "system", "content": "You extract character names from scripts. Reply with a JSON array of strings only, e.g. [\"Name1\", \"Name2\"]."},
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": 500,
+        "temperature": 0.3,
+    }
+
+
+def _parse_actor_names(content: str):
+    names = json.loads(_strip_code_fence(content.strip()))
+    if not isinstance(names, list):
+        return {"error": "Invalid response: expected JSON array"}
+    actor_names = [str(n).strip() for n in names if n and str(n).strip()]
+    return {"actor_names": actor_names}
+
+
+def _merge_actor_names(chunk_results):
+    """Union of per-chunk actor names in first-appearance order (case-insensitive dedupe)."""
+    names, seen, errors = [], set(), []
+    for r in chunk_results:
+        if "error" in r:
+            errors.append(r["error"])
+            continue
+        for name in r["actor_names"]:
+            if name.lower() not in seen:
+                seen.add(name.lower())
+                names.append(name)
+    if errors and len(errors) == len(chunk_results):
+        return {"error": errors[0]}
+    return {"actor_names": names}
+
+
+def _parsed_cast(script_text: str):
+    """{"actor_names"} from the local screenplay parser, or None if the text is not screenplay-formatted."""
+    if not LOCAL_SCRIPT_PARSER:
+        return None
+    parsed = parse_screenplay(script_text)
+    if not parsed["is_screenplay"]:
+        return None
+    return {"actor_names": extract_cast(script_text), "source": "script_parser"}
+
+
+def _extract_actor_chunk(content: str):
+    try:
+        return _parse_actor_names(content)
+    except json.JSONDecodeError as e:
+        return {"error": f"Failed to parse actor names: {str(e)}"}
+
+
 def extract_actor_names_from_script(script_text: str):
     """Extract character/actor names from script using Groq. Returns {"actor_names": [...]} or {"error": "..."}."""
     if not script_text or not (script_text := script_text.strip()):
         return {"actor_names": []}
-    if not GROQ_AVAILABLE or not client:
-        return {"error": "Groq API not available. Please add GROQ_API_KEY to your .env file."}
-    # Keep extract prompt short for faster response (~5–15 sec)
-    script_slice = script_text[:8000] if len(script_text) > 8000 else script_text
-    try:
-        prompt = f"{EXTRACT_ACTORS_PROMPT}\n{script_slice}"
-        model = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You extract character names from scripts. Reply with a JSON array of strings only, e.g. [\"Name1\", \"Name2\"]."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=500,
-            temperature=0.3
-        )
-        content = response.choices[0].message.content.strip()
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-        names = json.loads(content)
-        if not isinstance(names, list):
-            return {"error": "Invalid response: expected JSON array"}
-        actor_names = [str(n).strip() for n in names if n and str(n).strip()]
-        return {"actor_names": actor_names}
-    except json.JSONDecodeError as e:
-        return {"error": f"Failed to parse actor names: {str(e)}"}
-    except Exception as e:
-        return {"error": str(e)}
+    if (cast := _parsed_cast(script_text)) is not None:
+        return cast
+    if not LLM_AVAILABLE:
+        return dict(LLM_UNAVAILABLE_ERROR)
+    chunks = split_script_into_chunks(script_text, EXTRACT_CHUNK_CHARS)
+
+    def extract(chunk):
+        try:
+            return _extract_actor_chunk(llm.complete(**_extract_actors_request(chunk)))
+        except Exception as e:
+            return {"error": str(e)}
+
+    if len(chunks) == 1:
+        return extract(chunks[0])
+    with ThreadPoolExecutor(max_workers=PLAN_PARALLEL_CHUNKS) as pool:
+        return _merge_actor_names(list(pool.map(extract, chunks)))
+
+
+async def extract_actor_names_from_script_async(script_text: str):
+    """extract_actor_names_from_script for async handlers (async client under the shared LLM limit)."""
+    if not script_text or not (script_text := script_text.strip()):
+        return {"actor_names": []}
+    if (cast := _parsed_cast(script_text)) is not None:
+        return cast
+    if not LLM_AVAILABLE:
+        return dict(LLM_UNAVAILABLE_ERROR)
+    chunks = split_script_into_chunks(script_text, EXTRACT_CHUNK_CHARS)
+    slots = asyncio.Semaphore(PLAN_PARALLEL_CHUNKS)
+
+    async def extract(chunk):
+        async with slots:
+            try:
+                return _extract_actor_chunk(await llm.acomplete(_extract_actors_request(chunk)))
+            except Exception as e:
+                return {"error": str(e)}
+
+    if len(chunks) == 1:
+        return await extract(chunks[0])
+    return _merge_actor_names(await asyncio.gather(*(extract(c) for c in chunks)))
 
 
 def _normalize_scenes(result, actor_names):
@@ -233,18 +307,6 @@ def _scene_cost(scene, actor_model):
     return total
 
 
-def _min_remaining_days(scene, actor_model):
-    """Minimum remaining_days among required actors for this scene."""
-    required = scene.get("required_actors") or []
-    if not required:
-        return float("inf")
-    mins = []
-    for aname in required:
-        if aname in actor_model:
-            mins.append(actor_model[aname]["remaining_days"])
-    return min(mins) if mins else 0
-
-
 def _apply_user_scene_assignments(result, actors_list):
     """Override each scene's required_actors from user-provided scene_numbers (actor present in which scenes)."""
     if not actors_list:
@@ -264,8 +326,13 @@ def _apply_user_scene_assignments(result, actors_list):
         scene["required_actors"] = required
 
 
+# Shooting order/blocked scenes from scheduler.optimize_schedule (local search, SCHEDULE_TIME_BUDGET);
+# set SCHEDULE_OPTIMIZER=0 for the original greedy pass
+SCHEDULE_OPTIMIZER = os.getenv("SCHEDULE_OPTIMIZER", "1") != "0"
+
+
 def _build_calendar_and_blocked(result, actors_list):
-    """Python-only scheduling: sort scenes, build shooting_calendar, blocked_scenes, suggestions."""
+    """Python-only scheduling: build shooting_calendar, blocked_scenes, schedule_summary, suggestions."""
     if not actors_list:
         result["shooting_calendar"] = []
         result["blocked_scenes"] = []
@@ -280,67 +347,17 @@ def _build_calendar_and_blocked(result, actors_list):
     actor_names = list(actor_model.keys())
     _normalize_scenes(result, actor_names)
 
-    scenes = list(result.get("scenes", []))
-    # Working copy of actor remaining_days (we mutate during calendar build)
-    remaining = {name: data["remaining_days"] for name, data in actor_model.items()}
-
-    def sort_key(scene):
-        min_rem = float("inf")
-        for aname in scene.get("required_actors") or []:
-            if aname in remaining:
-                min_rem = min(min_rem, remaining[aname])
-        cost = _scene_cost(scene, actor_model)
-        return (min_rem, -cost)
-
-    sorted_scenes = sorted(scenes, key=sort_key)
-
-    shooting_calendar = []
-    blocked_scenes = []
-    current_day = 1
-
-    for scene in sorted_scenes:
-        sn = scene.get("scene_number")
-        req_actors = scene.get("required_actors") or []
-        est_days = scene.get("estimated_days", 1)
-
-        shortage_actor = None
-        days_missing = 0
-        if req_actors:
-            for aname in req_actors:
-                if aname not in remaining:
-                    continue
-                if remaining[aname] < est_days:
-                    need = est_days - remaining[aname]
-                    if need > days_missing:
-                        days_missing = need
-                        shortage_actor = aname
-
-        can_schedule = not req_actors or (req_actors and all(remaining.get(a, 0) >= est_days for a in req_actors))
-
-        if can_schedule:
-            start_day = current_day
-            end_day = current_day + est_days - 1
-            shooting_calendar.append({
-                "scene_number": sn,
-                "start_day": start_day,
-                "end_day": end_day,
-                "actors": req_actors,
-            })
-            for aname in req_actors:
-                if aname in remaining:
-                    remaining[aname] -= est_days
-            current_day = end_day + 1
-        else:
-            reason = f"Actor '{shortage_actor or req_actors[0]}' needs {days_missing or est_days} more day(s)"
-            blocked_scenes.append({
-                "scene_number": sn,
-                "reason": reason,
-                "actor_shortage": shortage_actor or (req_actors[0] if req_actors else None),
-                "days_missing": days_missing or est_days,
-            })
+    scenes = [s for s in result.get("scenes", []) if isinstance(s, dict)]
+    if SCHEDULE_OPTIMIZER:
+        shooting_calendar, blocked_scenes, stats = optimize_schedule(scenes, actor_model, SHOOT_PAGES_PER_DAY)
+        summary = {"engine": "optimized", **schedule_summary(shooting_calendar, actor_model), **stats}
+    else:
+        shooting_calendar, blocked_scenes = greedy_schedule(scenes, actor_model)
+        summary = {"engine": "greedy", **schedule_summary(shooting_calendar, actor_model)}
 
     result["shooting_calendar"] = shooting_calendar
     result["blocked_scenes"] = blocked_scenes
+    result["schedule_summary"] = summary
 
     suggestions = []
     for b in blocked_scenes:
@@ -356,18 +373,84 @@ def _build_calendar_and_blocked(result, actors_list):
     result["suggestions"] = suggestions
 
 
-# Limit script length sent to LLM to avoid huge prompts and slow timeouts (Groq has context limits)
+# Limit script length sent to LLM to avoid huge prompts and slow timeouts (Groq has context limits).
+# Longer scripts are planned map-reduce style: split at scene headings into chunks of at most
+# MAX_SCRIPT_CHARS, planned concurrently (PLAN_PARALLEL_CHUNKS at a time) and merged in script order.
 MAX_SCRIPT_CHARS = 12000
-
-def generate_production_plan(script_text: str, total_budget: float, actors=None, number_of_scenes=None):
-    """Generate production breakdown using Groq; then run Python scheduling if actors provided."""
-    
-    if not GROQ_AVAILABLE or not client:
-        return {
-            "error": "Groq API not available. Please add GROQ_API_KEY to your .env file."
-        }
-    
-    actors_list = actors if isinstance(actors, list) else []
+PLAN_PARALLEL_CHUNKS = int(os.getenv("PLAN_PARALLEL_CHUNKS", "4"))
+
+
+def _split_blocks(script_text: str):
+    """Scene blocks (each starting at an INT./EXT. heading), or paragraphs if the script has no headings."""
+    lines = script_text.splitlines(keepends=True)
+    blocks, current = [], []
+    for line in lines:
+        if SCENE_HEADING_RE.match(line) and any(l.strip() for l in current):
+            blocks.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        blocks.append("".join(current))
+    if len(blocks) > 1:
+        return blocks
+    return [p + "\n\n" for p in re.split(r"\n\s*\n", script_text) if p.strip()]
+
+
+def _fit_block(block: str, max_chars: int):
+    """Pieces of a block of at most max_chars each: split at paragraphs, then lines, then hard cuts."""
+    if len(block) <= max_chars:
+        return [block]
+    for separator in (r"(?<=\n\n)", r"(?<=\n)"):
+        parts = [p for p in re.split(separator, block) if p]
+        if len(parts) > 1:
+            pieces, current = [], ""
+            for part in parts:
+                if current and len(current) + len(part) > max_chars:
+                    pieces.append(current)
+                    current = ""
+                current += part
+            pieces.append(current)
+            return [f for piece in pieces for f in _fit_block(piece, max_chars)]
+    return [block[i:i + max_chars] for i in range(0, len(block), max_chars)]
+
+
+def split_script_into_chunks(script_text: str, max_chars: int = MAX_SCRIPT_CHARS):
+    """
+    Split a script at scene headings into chunks of at most max_chars; a single scene longer than
+    that is split at paragraphs (then lines). Returns the stripped chunks in script order.
+    """
+    script_text = (script_text or "").strip()
+    if len(script_text) <= max_chars:
+        return [script_text]
+    chunks, current = [], ""
+    for block in _split_blocks(script_text):
+        for piece in _fit_block(block, max_chars):
+            if current and len(current) + len(piece) > max_chars:
+                chunks.append(current)
+                current = ""
+            current += piece
+    if current:
+        chunks.append(current)
+    return [c.strip() for c in chunks if c.strip()]
+
+
+def _allocate(total, weights, decimals=2):
+    """Split total proportionally to weights at `decimals` precision; rounding leftovers go to the largest remainders."""
+    if not weights:
+        return []
+    if not sum(weights):
+        weights = [1] * len(weights)
+    unit = 10 ** decimals
+    exact = [total * unit * w / sum(weights) for w in weights]
+    shares = [int(x) for x in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda i: (-(exact[i] - shares[i]), i))
+    for i in by_remainder[:int(round(total * unit)) - sum(shares)]:
+        shares[i] += 1
+    return [s / unit if decimals else s for s in shares]
+
+
+def _production_plan_request(script_text: str, total_budget: float, actors_list, number_of_scenes=None, part=None):
+    """Chat request for one plan; part=(index, count) marks a chunk of a longer script."""
     actor_names_str = ""
     if actors_list:
         names = [str(a.get("name", "")).strip() for a in actors_list if a.get("name")]
@@ -378,52 +461,503 @@ def generate_production_plan(script_text: str, total_budget: float, actors=None,
     if number_of_scenes is not None and number_of_scenes > 0:
         scene_count_str = f"\n\nCreate exactly {int(number_of_scenes)} scenes in the scene breakdown."
 
-    # Truncate long scripts so the API call stays fast (full script can cause 60s+ delays)
+    # Scripts longer than MAX_SCRIPT_CHARS never get here whole: _plan_jobs splits them into chunks
     script_for_prompt = (script_text or "").strip()
-    if len(script_for_prompt) > MAX_SCRIPT_CHARS:
-        script_for_prompt = script_for_prompt[:MAX_SCRIPT_CHARS] + "\n\n[... script truncated for speed ...]"
 
+    part_str = ""
+    if part:
+        part_str = (f"\n\nThis is part {part[0] + 1} of {part[1]} of a longer script. Plan only the scenes in this part; "
+                    f"the Total Budget above is this part's share of the production budget.")
+
+    prompt = f"{PRODUCTION_PROMPT}\n\nScript:\n{script_for_prompt}\n\nTotal Budget: ₹{total_budget:,.2f} (Indian Rupees){scene_count_str}{actor_names_str}{part_str}"
+    # Default 70B model is accurate but slower; set GROQ_MODEL=llama-3.1-8b-instant in .env for faster (30b also available)
+    return {
+        "model": llm.model,
+        "messages": [
+            {"role": "system", "content": "You are a professional film production planner. Always return valid JSON only, no explanations."},
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": 4000,
+        "temperature": 0.7,
+    }
+
+
+def _complete_scenes(result):
+    """Drop scenes cut off by a truncated response (no number or no budget yet)."""
+    scenes = result.get("scenes")
+    if isinstance(scenes, list):
+        result["scenes"] = [sc for sc in scenes if isinstance(sc, dict) and "scene_number" in sc and "budget" in sc]
+
+
+def _finish_production_plan(result, repaired, actors_list, total_budget=None):
+    """Validate a parsed (or repaired) plan, then run Python-only scheduling. Returns result or {"error"}."""
+    if repaired:
+        _complete_scenes(result)
+        print(f"⚠️ Production plan JSON was truncated; repaired to {len(result.get('scenes') or [])} scenes")
+        if "total_budget" not in result and total_budget is not None:
+            result["total_budget"] = total_budget
+        result["truncated"] = True
+
+    # Validate structure
+    if not isinstance(result, dict) or "scenes" not in result or "total_budget" not in result:
+        return {"error": "Invalid response format from AI"}
+    
+    # Python-only scheduling (actor availability, calendar, blocked, suggestions)
+    _build_calendar_and_blocked(result, actors_list)
+    return result
+
+
+def _load_plan_json(content: str):
+    """(result, repaired) from the model output; truncated JSON is repaired. Raises JSONDecodeError."""
+    try:
+        return json.loads(_strip_code_fence(content.strip())), False
+    except json.JSONDecodeError as e:
+        try:
+            return repair_truncated_json(content)
+        except ValueError:
+            print(f"⚠️ JSON decode error: {e}")
+            print(f"Response content: {content[:500]}")
+            raise e
+
+
+def _parse_production_plan(content: str, actors_list, total_budget=None):
+    """Parse the model's JSON plan (repairing truncated output), then run Python-only scheduling."""
+    try:
+        result, repaired = _load_plan_json(content)
+    except json.JSONDecodeError as e:
+        return {"error": f"Failed to parse AI response as JSON: {str(e)}"}
+    return _finish_production_plan(result, repaired, actors_list, total_budget)
+
+
+def _parse_chunk_plan(content: str):
+    """Scenes of one chunk's plan (no scheduling; that runs once on the merged plan)."""
     try:
-        prompt = f"{PRODUCTION_PROMPT}\n\nScript:\n{script_for_prompt}\n\nTotal Budget: ₹{total_budget:,.2f} (Indian Rupees){scene_count_str}{actor_names_str}"
-        
-        # Default 70B model is accurate but slower; set GROQ_MODEL=llama-3.1-8b-instant in .env for faster (30b also available)
-        model = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are a professional film production planner. Always return valid JSON only, no explanations."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=4000,
-            temperature=0.7
-        )
-        
-        content = response.choices[0].message.content.strip()
-        
-        # Try to extract JSON if wrapped in markdown code blocks
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-        
-        # Parse JSON
-        result = json.loads(content)
-        
-        # Validate structure
-        if "scenes" not in result or "total_budget" not in result:
-            return {"error": "Invalid response format from AI"}
-        
-        # Python-only scheduling (actor availability, calendar, blocked, suggestions)
-        _build_calendar_and_blocked(result, actors_list)
-        
-        return result
-        
+        result, repaired = _load_plan_json(content)
     except json.JSONDecodeError as e:
-        print(f"⚠️ JSON decode error: {e}")
-        print(f"Response content: {content[:500]}")
         return {"error": f"Failed to parse AI response as JSON: {str(e)}"}
+    if not isinstance(result, dict) or not isinstance(result.get("scenes"), list):
+        return {"error": "Invalid response format from AI"}
+    if repaired:
+        _complete_scenes(result)
+    return result
+
+
+def _scene_total(scene):
+    try:
+        return float((scene.get("budget") or {}).get("total_scene_budget") or 0)
+    except (TypeError, ValueError, AttributeError):
+        return 0.0
+
+
+def _chunk_scenes(chunk_plan, share, first_number):
+    """
+    Scenes of one chunk renumbered from first_number, with scene budgets rescaled so the chunk
+    spends exactly its budget share (models rarely sum their allocations exactly).
+    """
+    scenes = [sc for sc in chunk_plan.get("scenes") or [] if isinstance(sc, dict)]
+    totals = [_scene_total(sc) for sc in scenes]
+    new_totals = _allocate(share, totals)
+    for n, (scene, old, new) in enumerate(zip(scenes, totals, new_totals), first_number):
+        scene["scene_number"] = n
+        budget = scene.get("budget") if isinstance(scene.get("budget"), dict) else {}
+        breakdown = budget.get("breakdown") if isinstance(budget.get("breakdown"), dict) else {}
+        factor = new / old if old else 0.0
+        for key, value in breakdown.items():
+            if isinstance(value, (int, float)):
+                breakdown[key] = round(value * factor, 2)
+        budget["total_scene_budget"] = new
+        budget["breakdown"] = breakdown
+        scene["budget"] = budget
+    return scenes
+
+
+def _chunk_shares(chunks, total_budget, number_of_scenes):
+    """
+    Budget share and scene count per chunk, proportional to chunk length. Every chunk is planned
+    with at least one scene so none of the script is dropped; with fewer scenes requested than
+    chunks, _merged_plan combines neighbouring scenes back down to the requested count.
+    """
+    weights = [len(c) for c in chunks]
+    counts = [None] * len(chunks)
+    if number_of_scenes is not None and number_of_scenes > 0:
+        extra = max(0, int(number_of_scenes) - len(chunks))
+        counts = [1 + n for n in _allocate(extra, weights, decimals=0)]
+    return _allocate(float(total_budget), weights), counts
+
+
+def _combine_scenes(scenes, target):
+    """Merge runs of consecutive scenes so exactly target remain (script order, budgets summed)."""
+    combined = []
+    sizes = _allocate(len(scenes), [1] * target, decimals=0)
+    start = 0
+    for size in sizes:
+        group, start = scenes[start:start + size], start + size
+        if len(group) == 1:
+            combined.append(group[0])
+            continue
+        scene = dict(group[0])
+        scene["scene_title"] = " / ".join(str(sc.get("scene_title") or "") for sc in group if sc.get("scene_title"))
+        scene["description"] = " ".join(str(sc.get("description") or "") for sc in group if sc.get("description"))
+        locations = list(dict.fromkeys(str(sc["location"]) for sc in group if sc.get("location")))
+        if locations:
+            scene["location"] = " / ".join(locations)
+        scene["estimated_days"] = sum(int(sc.get("estimated_days") or 1) for sc in group)
+        scene["required_actors"] = list(dict.fromkeys(a for sc in group for a in sc.get("required_actors") or []))
+        for key in ("safety_measures", "risks"):
+            scene[key] = [item for sc in group for item in sc.get(key) or []]
+        breakdown = {}
+        for sc in group:
+            for key, value in ((sc.get("budget") or {}).get("breakdown") or {}).items():
+                if isinstance(value, (int, float)):
+                    breakdown[key] = round(breakdown.get(key, 0) + value, 2)
+        scene["budget"] = {"total_scene_budget": round(sum(_scene_total(sc) for sc in group), 2), "breakdown": breakdown}
+        combined.append(scene)
+    for n, scene in enumerate(combined, 1):
+        scene["scene_number"] = n
+    return combined
+
+
+SCENE_COSTING_PROMPT = """You are a professional film line producer and risk assessment expert.
+
+The script has already been broken into scenes (listed below with their heading, setting, page
+length and speaking cast). For EACH listed scene provide:
+- A short scene title and a one-sentence description
+- A budget: allocate the Total Budget across the listed scenes (sum must equal it), realistic for the
+  scene's setting, length and complexity, broken into cast_and_crew, location_and_set,
+  props_and_costumes, equipment_and_technical, special_effects_and_stunts, miscellaneous
+- Safety measures (physical, environmental, equipment, crowd, fire/water/heights/vehicles/weapons/animals)
+- Risks, each with risk_description, risk_level (Low | Medium | High) and mitigation
+
+OUTPUT FORMAT (STRICT JSON, no text outside the JSON):
+{
+  "scenes": [
+    {
+      "scene_number": number,
+      "scene_title": string,
+      "description": string,
+      "budget": {
+        "total_scene_budget": number,
+        "breakdown": {
+          "cast_and_crew": number,
+          "location_and_set": number,
+          "props_and_costumes": number,
+          "equipment_and_technical": number,
+          "special_effects_and_stunts": number,
+          "miscellaneous": number
+        }
+      },
+      "safety_measures": [ string ],
+      "risks": [ { "risk_description": string, "risk_level": "Low | Medium | High", "mitigation": string } ]
+    }
+  ]
+}"""
+
+# Pre-parsed scenes are costed PLAN_SCENES_PER_CALL at a time (keeps each answer well under max_tokens)
+PLAN_SCENES_PER_CALL = int(os.getenv("PLAN_SCENES_PER_CALL", "12"))
+SCENE_EXCERPT_CHARS = 600
+# Shooting pace used for estimated_days of pre-parsed scenes
+SHOOT_PAGES_PER_DAY = float(os.getenv("SHOOT_PAGES_PER_DAY", "4"))
+
+
+def _scene_costing_request(batch, budget_share, part):
+    """Chat request asking only for titles, budgets, safety and risks of pre-parsed scenes."""
+    listing = []
+    for sc in batch:
+        cast = ", ".join(sc["characters"]) or "no speaking roles"
+        excerpt = sc["text"][:SCENE_EXCERPT_CHARS] + ("..." if len(sc["text"]) > SCENE_EXCERPT_CHARS else "")
+        listing.append(f"Scene {sc['scene_number']}: {sc['heading']} | {sc['pages']} pages | cast: {cast}\n{excerpt}")
+    prompt = (f"{SCENE_COSTING_PROMPT}\n\nScenes (part {part[0] + 1} of {part[1]}):\n\n" + "\n\n".join(listing)
+              + f"\n\nTotal Budget for these {len(batch)} scenes: ₹{budget_share:,.2f} (Indian Rupees)")
+    return {
+        "model": llm.model,
+        "messages": [
+            {"role": "system", "content": "You are a professional film production planner. Always return valid JSON only, no explanations."},
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": 4000,
+        "temperature": 0.7,
+    }
+
+
+def _parsed_scene(sc):
+    """Plan scene from a script_parser scene: everything the LLM is not needed for."""
+    setting = {"INT": "indoor", "EXT": "outdoor"}.get(sc["location_type"], "indoor/outdoor")
+    first_action = next((l.strip() for l in sc["text"].splitlines() if l.strip()), "")
+    return {
+        "scene_number": sc["scene_number"],
+        "scene_title": sc["location"].title() or f"Scene {sc['scene_number']}",
+        "heading": sc["heading"],
+        "location": setting,
+        "set": sc["location"],
+        "time_of_day": day_or_night(sc["time_of_day"]),
+        "description": first_action,
+        "required_actors": list(sc["characters"]),
+        "estimated_days": max(1, math.ceil(sc["page_eighths"] / (8 * SHOOT_PAGES_PER_DAY))),
+        "page_eighths": sc["page_eighths"],
+        "pages": sc["pages"],
+    }
+
+
+def _costed_batch(batch, content=None, warning=None):
+    """
+    Merge the LLM's costing into the pre-parsed scenes of a batch (matched by scene_number).
+    Scenes the LLM skipped (or the whole batch, if the call failed) get a budget proportional to
+    page length at the batch's average rate and no risks, plus a warning.
+    """
+    costed = {}
+    if content is not None:
+        plan = _parse_chunk_plan(content)
+        if "error" in plan:
+            warning = plan["error"]
+        for item in plan.get("scenes") or []:
+            if isinstance(item, dict) and "scene_number" in item:
+                try:
+                    costed[int(item["scene_number"])] = item
+                except (TypeError, ValueError):
+                    continue
+    scenes = [_parsed_scene(sc) for sc in batch]
+    priced = [(sc, costed[sc["scene_number"]]) for sc in scenes if sc["scene_number"] in costed]
+    eighths_priced = sum(sc["page_eighths"] for sc, _ in priced)
+    rate = (sum(_scene_total(item) for _, item in priced) / eighths_priced) if eighths_priced else 1.0
+    missing = 0
+    for scene in scenes:
+        item = costed.get(scene["scene_number"])
+        if item is None:
+            missing += 1
+            scene.update({"budget": {"total_scene_budget": round(rate * scene["page_eighths"], 2), "breakdown": {}},
+                          "safety_measures": [], "risks": []})
+            continue
+        for key in ("scene_title", "description"):
+            if item.get(key):
+                scene[key] = item[key]
+        scene["budget"] = item.get("budget") if isinstance(item.get("budget"), dict) else {"total_scene_budget": 0, "breakdown": {}}
+        scene["safety_measures"] = item.get("safety_measures") or []
+        scene["risks"] = item.get("risks") or []
+    result = {"scenes": scenes}
+    if missing and not warning:
+        warning = f"{missing} scene(s) were not costed by the AI; budget estimated from page length"
+    if warning:
+        result["warning"] = warning
+    return result
+
+
+def _plan_jobs(script_text: str, total_budget: float, actors_list, number_of_scenes=None):
+    """
+    LLM calls for a multi-part plan as ([(request, parse, fallback)], budget shares), or None when a
+    single call plans the whole script. parse(content) and fallback(error) both return a part plan.
+    - Screenplays are pre-segmented by script_parser; the LLM only costs scenes, PLAN_SCENES_PER_CALL
+      per call (unless number_of_scenes asks for a different scene division).
+    - Other scripts longer than MAX_SCRIPT_CHARS are split into chunks planned map-reduce style.
+    """
+    parsed = parse_screenplay(script_text) if LOCAL_SCRIPT_PARSER else None
+    if parsed and parsed["is_screenplay"] and (not number_of_scenes or int(number_of_scenes) == len(parsed["scenes"])):
+        scenes = parsed["scenes"]
+        batches = [scenes[i:i + PLAN_SCENES_PER_CALL] for i in range(0, len(scenes), PLAN_SCENES_PER_CALL)]
+        shares = _allocate(float(total_budget), [sum(sc["page_eighths"] for sc in b) for b in batches])
+        jobs = [
+            (_scene_costing_request(b, shares[i], (i, len(batches))),
+             lambda content, b=b: _costed_batch(b, content),
+             lambda error, b=b: _costed_batch(b, warning=error))
+            for i, b in enumerate(batches)
+        ]
+        return jobs, shares
+    chunks = split_script_into_chunks(script_text, MAX_SCRIPT_CHARS)
+    if len(chunks) == 1:
+        return None
+    shares, counts = _chunk_shares(chunks, total_budget, number_of_scenes)
+    jobs = [
+        (_production_plan_request(chunk, shares[i], actors_list, counts[i], part=(i, len(chunks))),
+         _parse_chunk_plan,
+         lambda error: {"error": error})
+        for i, chunk in enumerate(chunks)
+    ]
+    return jobs, shares
+
+
+def _merge_part(i, count, plan, share, scenes, warnings):
+    """Append part i's scenes (renumbered, budgets rescaled to its share) to scenes; returns the new ones."""
+    if "error" in plan:
+        warnings.append(f"Part {i + 1} of {count} could not be planned: {plan['error']}")
+        return []
+    if plan.get("warning"):
+        warnings.append(f"Part {i + 1} of {count}: {plan['warning']}")
+    new_scenes = _chunk_scenes(plan, share, len(scenes) + 1)
+    scenes.extend(new_scenes)
+    return new_scenes
+
+
+def _merge_chunk_plans(chunk_plans, shares, total_budget, number_of_scenes=None):
+    """Merge part plans in script order: scenes renumbered 1..N, budgets per part share, failures as warnings."""
+    scenes, warnings = [], []
+    for i, (plan, share) in enumerate(zip(chunk_plans, shares)):
+        _merge_part(i, len(chunk_plans), plan, share, scenes, warnings)
+    return _merged_plan(scenes, warnings, len(chunk_plans), total_budget, number_of_scenes)
+
+
+def _combines_parts(chunk_count, number_of_scenes):
+    """True when more parts were planned (one scene each at least) than scenes were requested."""
+    return bool(number_of_scenes) and chunk_count > int(number_of_scenes)
+
+
+def _merged_plan(scenes, warnings, chunk_count, total_budget, number_of_scenes=None):
+    if not scenes:
+        return {"error": warnings[0] if warnings else "Invalid response format from AI"}
+    if _combines_parts(chunk_count, number_of_scenes) and len(scenes) > int(number_of_scenes):
+        warnings = warnings + [f"The script was planned in {chunk_count} parts; their {len(scenes)} scenes were "
+                               f"combined into the {int(number_of_scenes)} requested"]
+        scenes = _combine_scenes(scenes, int(number_of_scenes))
+    allocated = round(sum(_scene_total(sc) for sc in scenes), 2)
+    result = {
+        "total_budget": total_budget,
+        "scenes": scenes,
+        "budget_summary": {"total_allocated": allocated, "remaining_budget": round(total_budget - allocated, 2)},
+        "chunks": chunk_count,
+    }
+    if warnings:
+        result["warnings"] = warnings
+    return result
+
+
+def _run_job(i, job, content=None, error=None):
+    _, parse, fallback = job
+    if error is None:
+        try:
+            return parse(content)
+        except Exception as e:
+            error = e
+    print(f"⚠️ Error planning script part {i + 1}: {error}")
+    return fallback(str(error))
+
+
+def generate_production_plan(script_text: str, total_budget: float, actors=None, number_of_scenes=None):
+    """Generate production breakdown using Groq; then run Python scheduling if actors provided."""
+    
+    if not LLM_AVAILABLE:
+        return dict(LLM_UNAVAILABLE_ERROR)
+    
+    actors_list = actors if isinstance(actors, list) else []
+    planned = _plan_jobs(script_text, total_budget, actors_list, number_of_scenes)
+    if planned:
+        jobs, shares = planned
+
+        def run(i):
+            try:
+                return _run_job(i, jobs[i], content=llm.complete(**jobs[i][0]))
+            except Exception as e:
+                return _run_job(i, jobs[i], error=e)
+
+        with ThreadPoolExecutor(max_workers=PLAN_PARALLEL_CHUNKS) as pool:
+            result = _merge_chunk_plans(list(pool.map(run, range(len(jobs)))), shares, total_budget, number_of_scenes)
+        return _finish_production_plan(result, False, actors_list) if "error" not in result else result
+    try:
+        content = llm.complete(**_production_plan_request(script_text, total_budget, actors_list, number_of_scenes))
+        return _parse_production_plan(content, actors_list, total_budget)
+    except Exception as e:
+        print(f"⚠️ Error generating production plan: {e}")
+        return {"error": f"Error generating production plan: {str(e)}"}
+
+
+def _plan_job_tasks(jobs):
+    """One task per job, at most PLAN_PARALLEL_CHUNKS LLM calls in flight (plus the global LLM limit)."""
+    slots = asyncio.Semaphore(PLAN_PARALLEL_CHUNKS)
+
+    async def run(i):
+        async with slots:
+            try:
+                content = await llm.acomplete(jobs[i][0])
+            except Exception as e:
+                return _run_job(i, jobs[i], error=e)
+        return _run_job(i, jobs[i], content=content)
+
+    return [asyncio.ensure_future(run(i)) for i in range(len(jobs))]
+
+
+async def generate_production_plan_async(script_text: str, total_budget: float, actors=None, number_of_scenes=None):
+    """generate_production_plan for async handlers (async client under the shared LLM limit)."""
+    if not LLM_AVAILABLE:
+        return dict(LLM_UNAVAILABLE_ERROR)
+
+    actors_list = actors if isinstance(actors, list) else []
+    planned = _plan_jobs(script_text, total_budget, actors_list, number_of_scenes)
+    if planned:
+        jobs, shares = planned
+        part_plans = await asyncio.gather(*_plan_job_tasks(jobs))
+        result = _merge_chunk_plans(part_plans, shares, total_budget, number_of_scenes)
+        if "error" in result:
+            return result
+        # Schedule search is CPU-bound (up to SCHEDULE_TIME_BUDGET): keep it off the event loop
+        return await compute_pool.run(_finish_production_plan, result, False, actors_list)
+    try:
+        content = await llm.acomplete(_production_plan_request(script_text, total_budget, actors_list, number_of_scenes))
+    except Exception as e:
+        print(f"⚠️ Error generating production plan: {e}")
+        return {"error": f"Error generating production plan: {str(e)}"}
+    try:
+        return await compute_pool.run(_parse_production_plan, content, actors_list, total_budget)
+    except PoolSaturated:
+        raise
     except Exception as e:
         print(f"⚠️ Error generating production plan: {e}")
         return {"error": f"Error generating production plan: {str(e)}"}
 
+
+async def stream_production_plan(script_text: str, total_budget: float, actors=None, number_of_scenes=None):
+    """
+    Streamed generate_production_plan: consumes the completion as it is generated and yields
+    ("scene", scene) for each scene as soon as its JSON object is complete, then ("plan", result)
+    with scheduling applied, or ("error", {"error": ...}). Truncated output is repaired.
+    """
+    if not LLM_AVAILABLE:
+        yield "error", dict(LLM_UNAVAILABLE_ERROR)
+        return
+
+    actors_list = actors if isinstance(actors, list) else []
+    planned = _plan_jobs(script_text, total_budget, actors_list, number_of_scenes)
+    if planned:
+        # Parts are planned concurrently; scenes are released in script order as soon as every
+        # earlier part is done, so their final numbers and budgets are already known
+        jobs, shares = planned
+        tasks = _plan_job_tasks(jobs)
+        scenes, warnings = [], []
+        # Scenes that will be combined down to number_of_scenes only arrive with the final plan
+        combine = _combines_parts(len(jobs), number_of_scenes)
+        try:
+            for i, task in enumerate(tasks):
+                for scene in _merge_part(i, len(jobs), await task, shares[i], scenes, warnings):
+                    if not combine:
+                        yield "scene", scene
+        finally:
+            for task in tasks:
+                task.cancel()
+        result = _merged_plan(scenes, warnings, len(jobs), total_budget, number_of_scenes)
+        if "error" in result:
+            yield "error", result
+            return
+        try:
+            yield "plan", await compute_pool.run(_finish_production_plan, result, False, actors_list)
+        except Exception as e:
+            print(f"⚠️ Error generating production plan: {e}")
+            yield "error", {"error": f"Error generating production plan: {str(e)}"}
+        return
+
+    parser = StreamingJsonParser("scenes")
+    try:
+        async for delta in llm.astream(_production_plan_request(script_text, total_budget, actors_list, number_of_scenes)):
+            for scene in parser.feed(delta):
+                yield "scene", scene
+    except Exception as e:
+        print(f"⚠️ Error streaming production plan: {e}")
+        if not parser.items_emitted:
+            yield "error", {"error": f"Error generating production plan: {str(e)}"}
+            return
+    try:
+        result, repaired = parser.finish()
+    except ValueError as e:
+        print(f"Response content: {parser.buffer[:500]}")
+        yield "error", {"error": f"Failed to parse AI response as JSON: {str(e)}"}
+        return
+    try:
+        yield "plan", await compute_pool.run(_finish_production_plan, result, repaired, actors_list, total_budget)
+    except Exception as e:
+        print(f"⚠️ Error generating production plan: {e}")
+        yield "error", {"error": f"Error generating production plan: {str(e)}"}
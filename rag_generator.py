@@ -1,41 +1,52 @@
 # rag_generator.py
 import os
+import asyncio
 from dotenv import load_dotenv
+from llm_cache import get_cached, set_cached
+from llm_client import get_llm
 
 load_dotenv()
 
-# Try to import OpenAI, but handle gracefully if not available
-try:
-    from openai import OpenAI
-    api_key = os.getenv("OPENAI_API_KEY")
-    if api_key:
-        client = OpenAI(api_key=api_key)
-        OPENAI_AVAILABLE = True
-    else:
-        print("⚠️ OPENAI_API_KEY not found in .env file")
-        OPENAI_AVAILABLE = False
-        client = None
-except ImportError:
-    print("⚠️ OpenAI package not installed. Install with: pip install openai")
-    OPENAI_AVAILABLE = False
-    client = None
-except Exception as e:
-    print(f"⚠️ OpenAI client initialization failed: {e}")
-    OPENAI_AVAILABLE = False
-    client = None
-
-def generate_explanation(query, search_results):
-    """Generate natural language explanation of search results"""
-    
+# Seconds to wait for the LLM explanation before falling back to the template explanation
+EXPLANATION_TIMEOUT = float(os.getenv("RAG_EXPLANATION_TIMEOUT", "8"))
+
+# Shared pooled LLM client (llm_client.py); OpenAI by default, RAG_LLM_PROVIDER=local for Ollama / offline stand-in
+llm = get_llm("rag")
+LLM_AVAILABLE = llm.available
+
+def _cached_completion(**request):
+    """Chat completion text, served from the persistent LLM cache when the same prompt was seen before."""
+    request.setdefault("model", llm.model)
+    cached = get_cached(request)
+    if cached is not None:
+        return cached
+    text = llm.complete(**request)
+    set_cached(request, text)
+    return text
+
+async def _cached_completion_async(request, timeout):
+    """_cached_completion for async handlers; the timeout only applies to the LLM call."""
+    # SQLite cache calls run in a thread so a busy or locked cache file never stalls the event loop
+    cached = await asyncio.to_thread(get_cached, request)
+    if cached is not None:
+        return cached
+    text = await llm.acomplete(request, timeout=timeout)
+    await asyncio.to_thread(set_cached, request, text)
+    return text
+
+NO_RESULTS_EXPLANATION = "No matching moments found. Try rephrasing your query or using different keywords."
+
+def template_explanation(search_results, with_score=True):
+    """Explanation without an LLM (no API key, LLM error or timeout)."""
     if not search_results:
-        return "No matching moments found. Try rephrasing your query or using different keywords."
-    
-    if not OPENAI_AVAILABLE or not client:
-        # Fallback explanation without LLM
-        if search_results:
-            return f"Found {len(search_results)} matching moments. Top result: '{search_results[0]['caption']}' at {search_results[0]['start']:.1f}s with {search_results[0]['score']:.0%} relevance."
         return "No results found."
-    
+    top = search_results[0]
+    if with_score:
+        return f"Found {len(search_results)} matching moments. Top result: '{top['caption']}' at {top['start']:.1f}s with {top['score']:.0%} relevance."
+    return f"Found {len(search_results)} matching moments. Top result: '{top['caption']}' at {top['start']:.1f}s."
+
+def _explanation_request(query, search_results):
+    """Chat completion kwargs for the explanation of search results."""
     # Build context from results
     context_parts = []
     for i, result in enumerate(search_results[:5], 1):
@@ -59,23 +70,83 @@ Provide a concise, friendly explanation (2-3 sentences) that:
 
 Be conversational and helpful."""
 
+    return {
+        "model": llm.model,
+        "messages": [
+            {"role": "system", "content": "You are a helpful video search assistant."},
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": 150,
+        "temperature": 0.7,
+    }
+
+def generate_explanation(query, search_results):
+    """Generate natural language explanation of search results"""
+    
+    if not search_results:
+        return NO_RESULTS_EXPLANATION
+    
+    if not LLM_AVAILABLE:
+        # Fallback explanation without LLM
+        return template_explanation(search_results)
+
     try:
-        response = client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-3.5-turbo"),
-            messages=[
-                {"role": "system", "content": "You are a helpful video search assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=150,
-            temperature=0.7
-        )
-        return response.choices[0].message.content
+        return _cached_completion(**_explanation_request(query, search_results))
     except Exception as e:
         print(f"⚠️ Error generating explanation: {e}")
         # Fallback
-        if search_results:
-            return f"Found {len(search_results)} matching moments. Top result: '{search_results[0]['caption']}' at {search_results[0]['start']:.1f}s."
-        return "No results found."
+        return template_explanation(search_results, with_score=False)
+
+async def generate_explanation_async(query, search_results, timeout=None):
+    """
+    generate_explanation for async handlers (async client under the shared LLM concurrency limit).
+    Falls back to the template explanation after timeout seconds (EXPLANATION_TIMEOUT by default).
+    """
+    if not search_results:
+        return NO_RESULTS_EXPLANATION
+    if not LLM_AVAILABLE:
+        return template_explanation(search_results)
+    try:
+        return await _cached_completion_async(_explanation_request(query, search_results), timeout or EXPLANATION_TIMEOUT)
+    except asyncio.TimeoutError:
+        print(f"⚠️ Explanation timed out after {timeout or EXPLANATION_TIMEOUT}s, using template")
+        return template_explanation(search_results)
+    except Exception as e:
+        print(f"⚠️ Error generating explanation: {e}")
+        return template_explanation(search_results, with_score=False)
+
+async def stream_explanation_async(query, search_results, timeout=None):
+    """
+    Yield the explanation as text chunks while the LLM generates it (stream=True).
+    If the LLM is unavailable, fails or the whole stream exceeds timeout seconds, the rest
+    of the explanation is replaced by the template: yields ("fallback", text) instead of ("delta", text).
+    """
+    if not search_results:
+        yield "fallback", NO_RESULTS_EXPLANATION
+        return
+    if not LLM_AVAILABLE:
+        yield "fallback", template_explanation(search_results)
+        return
+    request = _explanation_request(query, search_results)
+    cached = await asyncio.to_thread(get_cached, request)
+    if cached is not None:
+        yield "delta", cached
+        return
+    deadline = asyncio.get_running_loop().time() + (timeout or EXPLANATION_TIMEOUT)
+    parts = []
+    try:
+        async for delta in llm.astream(request, deadline=deadline):
+            parts.append(delta)
+            yield "delta", delta
+    except asyncio.TimeoutError:
+        print(f"⚠️ Explanation stream timed out after {timeout or EXPLANATION_TIMEOUT}s, using template")
+        yield "fallback", template_explanation(search_results)
+        return
+    except Exception as e:
+        print(f"⚠️ Error streaming explanation: {e}")
+        yield "fallback", template_explanation(search_results, with_score=False)
+        return
+    await asyncio.to_thread(set_cached, request, "".join(parts))
 
 def generate_suggestions(query, search_results):
     """Generate suggestion prompts that will give the best search results.
@@ -93,7 +164,7 @@ def generate_suggestions(query, search_results):
         "after the key moment"
     ]
 
-    if not OPENAI_AVAILABLE or not client:
+    if not LLM_AVAILABLE:
         return fallback_no_results if not search_results else fallback_with_results[:3]
 
     if not search_results:
@@ -117,16 +188,15 @@ Suggest exactly 3 SEARCH QUERIES that would give the BEST results for this video
 Return ONLY the 3 search phrases, one per line. No numbers, bullets, or explanations."""
 
     try:
-        response = client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-3.5-turbo"),
+        raw = _cached_completion(
+            model=llm.model,
             messages=[
                 {"role": "system", "content": "You suggest concrete video search queries that get the best results. Output only the 3 search phrases, one per line."},
                 {"role": "user", "content": prompt}
             ],
             max_tokens=120,
             temperature=0.7
-        )
-        raw = response.choices[0].message.content.strip()
+        ).strip()
         suggestions = raw.split("\n")
         cleaned = [s.strip("- ").strip().strip('"').strip("'").strip() for s in suggestions if s.strip()]
         # Remove leading numbers (e.g. "1. query" -> "query")
@@ -155,7 +225,7 @@ def generate_suggestions_from_vector_db(query, vector_db_results):
 
     context = "\n".join(caption_lines) if caption_lines else "(no captions)"
 
-    if not OPENAI_AVAILABLE or not client:
+    if not LLM_AVAILABLE:
         captions = [r.get("caption", "") for r in vector_db_results[:5] if r.get("caption")]
         if captions:
             return [captions[0][:50], "before the key moment", "after the main event"][:3]
@@ -176,16 +246,15 @@ Rules for the 3 suggestions:
 Return ONLY 3 short search phrases, one per line. No numbers, bullets, or explanations."""
 
     try:
-        response = client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-3.5-turbo"),
+        raw = _cached_completion(
+            model=llm.model,
             messages=[
                 {"role": "system", "content": "You suggest video search queries with clear intent (before/after/during) and emotion, based on real video captions. Output only 3 search phrases, one per line."},
                 {"role": "user", "content": prompt}
             ],
             max_tokens=120,
             temperature=0.6
-        )
-        raw = response.choices[0].message.content.strip()
+        ).strip()
         suggestions = raw.split("\n")
         cleaned = [s.strip("- ").strip().strip('"').strip("'").strip() for s in suggestions if s.strip()]
         cleaned = [s.lstrip("0123456789.").strip() for s in cleaned]
@@ -214,7 +283,7 @@ def generate_suggestions_from_audio(query, audio_vector_results):
 
     context = "\n".join(dialog_lines) if dialog_lines else "(no dialogs)"
 
-    if not OPENAI_AVAILABLE or not client:
+    if not LLM_AVAILABLE:
         dialogs = [r.get("text", r.get("caption", ""))[:40] for r in audio_vector_results[:3] if r.get("text") or r.get("caption")]
         return dialogs[:3] if dialogs else fallback
 
@@ -235,16 +304,15 @@ Rules for the 3 suggestions:
 Return ONLY 3 short search phrases, one per line. No numbers, bullets, or explanations."""
 
     try:
-        response = client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-3.5-turbo"),
+        raw = _cached_completion(
+            model=llm.model,
             messages=[
                 {"role": "system", "content": "You suggest search queries for finding video moments by spoken dialogue. Output only 3 phrases, one per line."},
                 {"role": "user", "content": prompt}
             ],
             max_tokens=120,
             temperature=0.6
-        )
-        raw = response.choices[0].message.content.strip()
+        ).strip()
         suggestions = raw.split("\n")
         cleaned = [s.strip("- ").strip().strip('"').strip("'").strip() for s in suggestions if s.strip()]
         cleaned = [s.lstrip("0123456789.").strip() for s in cleaned]
@@ -1,32 +1,14 @@
 # rag_search.py
-from vector_store import search_vector_db, search_audio_vector_db
+import time
+import threading
+from executors import retrieval_pool
+from vector_store import search_vector_db, search_audio_vector_db, embed_query
 from rag_generator import generate_explanation, generate_summary
-from video_utils import ensure_clip, _get_source_video_for_frame
-import json
-import os
+from video_utils import ensure_clips, get_full_video_url, is_youtube_source
+from thumbnails import get_sprite_for_frame
+from dialog_index import extract_quoted_phrase, find_phrase
 import re
 
-def get_video_config():
-    try:
-        with open("video_config.json", "r") as f:
-            return json.load(f)
-    except:
-        return {}
-
-def get_full_video_url(best_frame: str, start: float):
-    """Return URL for 'full video' - YouTube link or source clip depending on mode."""
-    config = get_video_config()
-    mode = config.get("mode", "youtube")
-    if mode == "clips":
-        source_path, _ = _get_source_video_for_frame(best_frame)
-        if source_path and os.path.exists(source_path):
-            # Use actual filename (could be .mp4, .mov, etc.)
-            basename = os.path.basename(source_path)
-            return f"http://localhost:8000/source_clips/{basename}"
-    # YouTube mode
-    url = config.get("url", "https://www.youtube.com/watch?v=zhEWqfP6V_w")
-    return f"{url}&t={int(start)}s"
-
 def _normalize_clip_id_for_frame(clip_id: str) -> str:
     """Ensure clip_id has 3-digit padding for frame lookup (clip_001, youtube_001)."""
     if not clip_id or clip_id == "0":
@@ -36,12 +18,54 @@ def _normalize_clip_id_for_frame(clip_id: str) -> str:
         return f"{m.group(1)}_{m.group(2).zfill(3)}"
     return clip_id
 
-def rag_search(query: str, audio_only: bool = False):
-    """RAG-enhanced search with explanations. When audio_only=True, prioritizes dialog/audio matches."""
+def _timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, round((time.perf_counter() - t0) * 1000, 1)
+
+def _in_time_range(result, filters):
+    start, end = (filters or {}).get("start"), (filters or {}).get("end")
+    return (start is None or result["end"] >= start) and (end is None or result["start"] <= end)
+
+def rag_retrieve(query: str, audio_only: bool = False, filters: dict = None):
+    """
+    Retrieval half of rag_search (no LLM): search, merge, temporal intent and clip generation.
+    Returns {"results": playable clips, "search_results": raw hits for the explanation, "timings": {...}}.
+    """
+    source_ids = (filters or {}).get("source_ids")
+    started = time.perf_counter()
+    timings = {}
     
-    # Step 1: Retrieve from video captions and/or audio transcriptions
-    video_results = [] if audio_only else search_vector_db(query, top_k=10, threshold=0.4)
-    audio_results = search_audio_vector_db(query, top_k=15 if audio_only else 10, threshold=0.35 if audio_only else 0.4)
+    # Step 1: Retrieve from video captions and/or audio transcriptions.
+    # Both indexes are searched concurrently. The query is embedded at most once, and only when a
+    # vector query runs: quoted queries answered by exact matches never pay for the embedding.
+    timings["embed_ms"] = 0.0
+    embedding, embed_lock = [], threading.Lock()
+
+    def query_embedding():
+        with embed_lock:
+            if not embedding:
+                value, timings["embed_ms"] = _timed(embed_query, query)
+                embedding.append(value)
+            return embedding[0]
+
+    def audio_search():
+        # Quoted dialog ("we did it") is answered from the word index with exact word timings;
+        # the vector query only runs when there is no quote or no exact match
+        quoted = extract_quoted_phrase(query)
+        results = [r for r in find_phrase(quoted, source_ids=source_ids) if _in_time_range(r, filters)] if quoted else []
+        if not results:
+            results = search_audio_vector_db(query, top_k=15 if audio_only else 10, threshold=0.35 if audio_only else 0.4,
+                                             filters=filters, query_embedding=query_embedding)
+        return results
+
+    t0 = time.perf_counter()
+    # Video and audio retrieval run side by side (Chroma / numpy release the GIL)
+    audio_future = retrieval_pool.submit(_timed, audio_search)
+    video_results, timings["video_retrieval_ms"] = ([], 0.0) if audio_only else _timed(
+        search_vector_db, query, top_k=10, threshold=0.4, filters=filters, query_embedding=query_embedding)
+    audio_results, timings["audio_retrieval_ms"] = audio_future.result()
+    timings["retrieval_ms"] = round((time.perf_counter() - t0) * 1000, 1)
     
     # Merge and deduplicate results (prioritize higher scores)
     all_results = []
@@ -75,6 +99,7 @@ def rag_search(query: str, audio_only: bool = False):
     search_results = all_results[:15] if audio_only else all_results[:10]
     
     # Step 2: Apply temporal intent (reuse existing logic)
+    t0 = time.perf_counter()
     intent_results = []
     if search_results:
         # Detect intent
@@ -95,6 +120,7 @@ def rag_search(query: str, audio_only: bool = False):
         # Apply temporal adjustments
         WINDOW = 5
         AUDIO_PAD = 1.0  # Extra padding for dialog clips so full phrase is heard
+        windows = []
         for r in search_results:
             ts = r["start"]
             end_ts = r["end"]
@@ -116,8 +142,13 @@ def rag_search(query: str, audio_only: bool = False):
                 diff = 3.0 - (adj_end - adj_start)
                 adj_start = max(0, adj_start - diff / 2)
                 adj_end = adj_end + diff / 2
-            
-            clip_filename = ensure_clip(adj_start, adj_end, r["best_frame"])
+            windows.append((adj_start, adj_end))
+
+        # Cut all clips in parallel on the ffmpeg process pool
+        clip_filenames = ensure_clips([(a, b, r["best_frame"]) for (a, b), r in zip(windows, search_results)])
+        for r, (adj_start, adj_end), clip_filename in zip(search_results, windows, clip_filenames):
+            ts = r["start"]
+            end_ts = r["end"]
             full_url = get_full_video_url(r["best_frame"], adj_start)
             intent_results.append({
                 "best_frame": r["best_frame"],
@@ -130,20 +161,44 @@ def rag_search(query: str, audio_only: bool = False):
                 "score": r["score"],
                 "video_url": f"http://localhost:8000/clips/{clip_filename}",
                 "full_video_url": full_url,
-                "is_youtube": get_video_config().get("mode", "youtube") != "clips",
-                "source": r.get("source", "video")  # "video" or "audio"
+                "is_youtube": is_youtube_source(r["best_frame"]),
+                "source": r.get("source", "video"),  # "video" or "audio"
+                "sprite": get_sprite_for_frame(r["best_frame"])
             })
     
-    # Step 3: Generate explanations (RAG)
-    explanation = generate_explanation(query, search_results)
-    summary = generate_summary(query, search_results)
-    
-    # Step 4: Return enhanced results
+    timings["clip_generation_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    timings["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return {"results": intent_results, "search_results": search_results, "timings": timings}
+
+
+def build_rag_response(query: str, retrieved: dict, explanation: str, llm_ms: float):
+    """Final /rag-search payload from rag_retrieve output and the generated explanation."""
+    timings = dict(retrieved["timings"])
+    timings["llm_ms"] = llm_ms
+    timings["total_ms"] = round(timings["total_ms"] + llm_ms, 1)
     return {
         "query": query,
-        "results": intent_results,
+        "results": retrieved["results"],
         "explanation": explanation,
-        "summary": summary,
-        "count": len(intent_results)
+        "summary": generate_summary(query, retrieved["search_results"]),
+        "count": len(retrieved["results"]),
+        "debug": {"timings": timings}
     }
 
+
+def rag_search(query: str, audio_only: bool = False, filters: dict = None):
+    """
+    RAG-enhanced search with explanations. When audio_only=True, prioritizes dialog/audio matches.
+    filters: optional {"source_ids": [...], "start": seconds, "end": seconds} search scope.
+    """
+    # Steps 1-2: retrieval, merge, temporal intent, clips
+    retrieved = rag_retrieve(query, audio_only, filters)
+    
+    # Step 3: Generate explanations (RAG)
+    t0 = time.perf_counter()
+    explanation = generate_explanation(query, retrieved["search_results"])
+    llm_ms = round((time.perf_counter() - t0) * 1000, 1)
+    
+    # Step 4: Return enhanced results
+    return build_rag_response(query, retrieved, explanation, llm_ms)
+
@@ -0,0 +1,566 @@
+"""
+Pluggable nearest-neighbour backends behind vector_store's caption/transcription search.
+- "chroma": query the Chroma collection directly (HNSW, persisted on disk).
+- "numpy": exact brute-force search. Normalized embeddings are copied out of Chroma once
+  into a contiguous float32 matrix; a query is one GEMV plus argpartition, with no
+  per-query client round trips. Chroma stays the persisted source of truth.
+- "ivf": compressed approximate index for very large libraries. Vectors are clustered
+  into IVF_NLIST coarse lists and stored as uint8 scalar-quantized codes (4x smaller
+  than float32); a query scans only the IVF_NPROBE closest lists, then re-ranks the top
+  candidates exactly with float vectors memory-mapped from the index's own file, so Chroma's
+  HNSW index is never loaded for queries.
+Pick with VECTOR_BACKEND=chroma|numpy|ivf; benchmark_retrieval.py compares them.
+ShardedBackend puts one of these per shard (per-source caption collections) behind the
+same interface and fans queries out over a thread pool.
+Every backend accepts a Chroma-style `where` metadata filter that is applied before
+ranking (Chroma where / masked matmul), so scoped queries never lose hits to a global top-n.
+"""
+import os
+import re
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+LOAD_BATCH_SIZE = 5000  # rows per Chroma get() when copying a collection into memory
+
+# IVF knobs: more lists = faster scans but coarser; more probes / re-rank = better recall, slower
+ANN_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ann_index")
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0 = about 4 * sqrt(rows)
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+IVF_RERANK_FACTOR = int(os.getenv("IVF_RERANK_FACTOR", "4"))  # exact re-rank of n_results * factor candidates
+IVF_TRAIN_SAMPLE = 100000  # vectors used to train centroids and quantization ranges
+IVF_KMEANS_ITERS = 10
+IVF_REBUILD_GROWTH = 0.5  # retrain when the collection grew by this fraction since the last build
+
+# Shard fan-out: numpy GEMV and Chroma queries release the GIL, so threads run shards in parallel
+SHARD_QUERY_WORKERS = int(os.getenv("SHARD_QUERY_WORKERS", str(min(8, os.cpu_count() or 1))))
+_fanout_pool = ThreadPoolExecutor(max_workers=max(1, SHARD_QUERY_WORKERS), thread_name_prefix="shard-query")
+
+def matches_where(meta, where):
+    """
+    Evaluate the subset of Chroma's where syntax used by vector_store on one metadata dict:
+    {"$and": [...]}, {field: {"$gte"|"$lte"|"$in"|"$eq": value}} and {field: value}.
+    """
+    if not where:
+        return True
+    meta = meta or {}
+    if "$and" in where:
+        return all(matches_where(meta, w) for w in where["$and"])
+    for field, cond in where.items():
+        value = meta.get(field)
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        for op, target in cond.items():
+            if value is None:
+                return False
+            if op == "$eq" and value != target:
+                return False
+            if op == "$in" and value not in target:
+                return False
+            if op == "$gte" and not value >= target:
+                return False
+            if op == "$lte" and not value <= target:
+                return False
+    return True
+
+def _normalize(vec):
+    q = np.asarray(vec, dtype=np.float32).ravel()
+    return q / (np.linalg.norm(q) or 1.0)
+
+
+class ChromaBackend:
+    """Search straight through the Chroma collection."""
+    name = "chroma"
+
+    def __init__(self, coll):
+        self.coll = coll
+
+    def count(self):
+        return self.coll.count()
+
+    def query(self, query_embedding, n_results, where=None):
+        """Top n_results (among rows matching where) as [(id, document, cosine_similarity, metadata)], best first."""
+        count = self.coll.count()
+        if count == 0:
+            return []
+        kwargs = {"where": where} if where else {}
+        results = self.coll.query(
+            query_embeddings=[list(map(float, query_embedding))],
+            n_results=min(n_results, count),
+            include=["documents", "metadatas", "distances"],
+            **kwargs
+        )
+        # Convert distance to similarity score (ChromaDB uses distance, lower is better)
+        return [
+            (doc_id, doc, 1 - distance, meta)
+            for doc_id, doc, distance, meta in zip(
+                results["ids"][0], results["documents"][0], results["distances"][0], results["metadatas"][0]
+            )
+        ]
+
+    def fetch(self, ids, query_embedding=None):
+        """{id: (metadata, cosine_similarity or None)} for specific ids (e.g. lexical-only hits)."""
+        if not ids:
+            return {}
+        include = ["metadatas", "embeddings"] if query_embedding is not None else ["metadatas"]
+        got = self.coll.get(ids=list(ids), include=include)
+        q = _normalize(query_embedding) if query_embedding is not None else None
+        out = {}
+        for i, doc_id in enumerate(got["ids"]):
+            score = None
+            if q is not None:
+                e = np.asarray(got["embeddings"][i], dtype=np.float32)
+                score = float(e @ q / (np.linalg.norm(e) or 1.0))
+            out[doc_id] = (got["metadatas"][i], score)
+        return out
+
+    def invalidate(self):
+        """Chroma reads its own writes; nothing to do."""
+
+
+class NumpyBackend:
+    """Exact cosine search over an in-memory copy of a Chroma collection."""
+    name = "numpy"
+
+    def __init__(self, coll):
+        self.coll = coll
+        self._lock = threading.Lock()
+        self._snapshot = None  # (ids, documents, metadatas, matrix, id_to_row, columns); None = stale
+
+    def _load(self):
+        ids, docs, metas, rows = [], [], [], []
+        offset = 0
+        while True:
+            got = self.coll.get(include=["embeddings", "documents", "metadatas"], limit=LOAD_BATCH_SIZE, offset=offset)
+            if not got["ids"]:
+                break
+            ids.extend(got["ids"])
+            docs.extend(got["documents"])
+            metas.extend(got["metadatas"])
+            rows.append(np.asarray(got["embeddings"], dtype=np.float32))
+            offset += len(got["ids"])
+        dim = rows[0].shape[1] if rows else 0
+        matrix = np.ascontiguousarray(np.vstack(rows) if rows else np.zeros((0, dim), dtype=np.float32))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        # columns: metadata field -> numpy array, built on first filtered query
+        return ids, docs, metas, matrix, {doc_id: i for i, doc_id in enumerate(ids)}, {}
+
+    def _get_snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load()
+                    print(f"🧮 Loaded {len(self._snapshot[0])} vectors from {self.coll.name} into memory")
+                snapshot = self._snapshot
+        return snapshot
+
+    def count(self):
+        return len(self._get_snapshot()[0])
+
+    def _column(self, snapshot, field):
+        columns = snapshot[5]
+        if field not in columns:
+            columns[field] = np.array([(m or {}).get(field) for m in snapshot[2]], dtype=object)
+        return columns[field]
+
+    def _mask(self, snapshot, where):
+        """Boolean row mask for a where filter, evaluated column-wise."""
+        if "$and" in where:
+            mask = np.ones(len(snapshot[0]), dtype=bool)
+            for w in where["$and"]:
+                mask &= self._mask(snapshot, w)
+            return mask
+        mask = np.ones(len(snapshot[0]), dtype=bool)
+        for field, cond in where.items():
+            col = self._column(snapshot, field)
+            present = np.array([v is not None for v in col], dtype=bool)
+            mask &= present
+            if not isinstance(cond, dict):
+                cond = {"$eq": cond}
+            for op, target in cond.items():
+                if op == "$in":
+                    mask &= np.isin(col, list(target))
+                elif op == "$eq":
+                    mask &= col == target
+                elif op in ("$gte", "$lte"):
+                    values = np.where(present, col, 0).astype(np.float64)
+                    mask &= values >= target if op == "$gte" else values <= target
+        return mask
+
+    def query(self, query_embedding, n_results, where=None):
+        """Top n_results (among rows matching where) as [(id, document, cosine_similarity, metadata)], best first."""
+        snapshot = self._get_snapshot()
+        ids, docs, metas, matrix = snapshot[:4]
+        if not ids:
+            return []
+        q = _normalize(query_embedding)
+        if where:
+            # Masked matmul: only score the rows that pass the filter
+            rows = np.flatnonzero(self._mask(snapshot, where))
+            if len(rows) == 0:
+                return []
+            scores = matrix[rows] @ q
+        else:
+            rows = None
+            scores = matrix @ q
+        k = min(n_results, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [
+            (ids[r], docs[r], float(scores[i]), metas[r])
+            for i, r in ((i, rows[i] if rows is not None else i) for i in top)
+        ]
+
+    def fetch(self, ids, query_embedding=None):
+        """{id: (metadata, cosine_similarity or None)} for specific ids (e.g. lexical-only hits)."""
+        _, _, metas, matrix, id_to_row, _ = self._get_snapshot()
+        q = _normalize(query_embedding) if query_embedding is not None else None
+        out = {}
+        for doc_id in ids:
+            row = id_to_row.get(doc_id)
+            if row is not None:
+                out[doc_id] = (metas[row], float(matrix[row] @ q) if q is not None else None)
+        return out
+
+    def invalidate(self):
+        """Drop the in-memory copy after the collection was written; reloaded on next query."""
+        with self._lock:
+            self._snapshot = None
+
+
+def _iter_embeddings(coll):
+    """(ids, float32 embeddings) batches straight from Chroma."""
+    offset = 0
+    while True:
+        got = coll.get(include=["embeddings"], limit=LOAD_BATCH_SIZE, offset=offset)
+        if not got["ids"]:
+            return
+        yield got["ids"], np.asarray(got["embeddings"], dtype=np.float32)
+        offset += len(got["ids"])
+
+def _normalize_rows(x):
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+def _train_centroids(sample, nlist, iters=IVF_KMEANS_ITERS, seed=0):
+    """Spherical k-means on normalized vectors (centroids compared by dot product)."""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        lists, starts = np.unique(assign[order], return_index=True)
+        sums = np.zeros_like(centroids)
+        sums[lists] = np.add.reduceat(sample[order], starts, axis=0)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty lists with random points so every list stays useful
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+        centroids = _normalize_rows(sums)
+    return centroids.astype(np.float32)
+
+
+class IVFBackend:
+    """
+    Approximate search: IVF coarse lists over uint8 scalar-quantized vectors, exact re-rank.
+    Persisted to ann_index/<collection>.npz (lists and codes, held in memory) plus
+    ann_index/<collection>.<build>.f32 (normalized float32 vectors, memory-mapped and only paged in
+    for re-ranked rows). Queries never read vectors from Chroma, so its HNSW segment stays unloaded;
+    Chroma is only asked for ids, documents and metadata. Building or syncing new rows does read
+    their embeddings from Chroma. New rows are added to existing lists and the index is retrained
+    once the collection has grown by IVF_REBUILD_GROWTH.
+    """
+    name = "ivf"
+
+    def __init__(self, coll, nprobe=None, rerank_factor=None):
+        self.coll = coll
+        self.nprobe = nprobe or IVF_NPROBE
+        self.rerank_factor = rerank_factor or IVF_RERANK_FACTOR
+        self.path = os.path.join(ANN_INDEX_DIR, f"{coll.name}.npz")
+        self._lock = threading.Lock()
+        # dict: ids, id_to_row, centroids, lo, step, list_rows, list_codes, trained_rows, build, vectors
+        self._index = None
+        self._dirty = True
+
+    # --- build / persist -------------------------------------------------
+    def _quantize(self, x, lo, step):
+        return np.clip(np.rint((x - lo) / step), 0, 255).astype(np.uint8)
+
+    def _vectors_path(self, build):
+        return os.path.join(ANN_INDEX_DIR, f"{self.coll.name}.{build}.f32")
+
+    def _build(self):
+        total = self.coll.count()
+        if total == 0:
+            return None
+        # Pass 1: training sample (evenly strided over the collection) for centroids and ranges
+        stride = max(1, total // IVF_TRAIN_SAMPLE)
+        sample = np.vstack([_normalize_rows(emb)[::stride] for _, emb in _iter_embeddings(self.coll)])
+        nlist = IVF_NLIST or max(1, int(4 * np.sqrt(total)))
+        nlist = min(nlist, len(sample))
+        centroids = _train_centroids(sample, nlist)
+        lo = sample.min(axis=0)
+        step = (sample.max(axis=0) - lo) / 255.0
+        step[step == 0] = 1e-6
+        index = {
+            "ids": [], "id_to_row": {}, "centroids": centroids, "lo": lo.astype(np.float32),
+            "step": step.astype(np.float32), "list_rows": [np.zeros(0, dtype=np.int64) for _ in range(nlist)],
+            "list_codes": [np.zeros((0, centroids.shape[1]), dtype=np.uint8) for _ in range(nlist)],
+            "build": os.urandom(6).hex(), "vectors": None,
+        }
+        # Pass 2: assign and quantize every vector; float vectors go straight to this build's file
+        os.makedirs(ANN_INDEX_DIR, exist_ok=True)
+        with open(self._vectors_path(index["build"]), "wb") as out:
+            for ids, emb in _iter_embeddings(self.coll):
+                self._add_rows(index, ids, emb, out)
+        index["trained_rows"] = len(index["ids"])
+        print(f"🧭 Built IVF index for {self.coll.name}: {len(index['ids'])} vectors, {nlist} lists")
+        return index
+
+    def _add_rows(self, index, ids, emb, out):
+        x = _normalize_rows(emb).astype(np.float32)
+        out.write(x.tobytes())
+        index["vectors"] = None  # re-map on next use to cover the appended rows
+        assign = np.argmax(x @ index["centroids"].T, axis=1)
+        codes = self._quantize(x, index["lo"], index["step"])
+        first_row = len(index["ids"])
+        for offset, doc_id in enumerate(ids):
+            index["id_to_row"][doc_id] = first_row + offset
+        index["ids"].extend(ids)
+        rows = np.arange(first_row, first_row + len(ids))
+        for lst in np.unique(assign):
+            mask = assign == lst
+            index["list_rows"][lst] = np.concatenate([index["list_rows"][lst], rows[mask]])
+            index["list_codes"][lst] = np.concatenate([index["list_codes"][lst], codes[mask]])
+
+    def _save(self, index):
+        os.makedirs(ANN_INDEX_DIR, exist_ok=True)
+        sizes = np.array([len(r) for r in index["list_rows"]], dtype=np.int64)
+        tmp_path = self.path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            ids=np.array(index["ids"], dtype=object), centroids=index["centroids"], lo=index["lo"], step=index["step"],
+            sizes=sizes, rows=np.concatenate(index["list_rows"]), codes=np.concatenate(index["list_codes"]),
+            trained_rows=np.array(index["trained_rows"]), build=np.array(index["build"]),
+        )
+        os.replace(tmp_path, self.path)
+        # Vector files of earlier builds are unreferenced once the new index is in place
+        keep = os.path.basename(self._vectors_path(index["build"]))
+        for name in os.listdir(ANN_INDEX_DIR):
+            if re.fullmatch(re.escape(self.coll.name) + r"\.[0-9a-f]{12}\.f32", name) and name != keep:
+                os.remove(os.path.join(ANN_INDEX_DIR, name))
+
+    def _load_saved(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            data = np.load(self.path, allow_pickle=True)
+            bounds = np.cumsum(data["sizes"])[:-1]
+            ids = list(data["ids"])
+            build = str(data["build"])
+            # Rows appended by a sync that crashed before saving the index are cut off again
+            expected = len(ids) * data["centroids"].shape[1] * 4
+            vectors_path = self._vectors_path(build)
+            if os.path.getsize(vectors_path) < expected:
+                raise ValueError("vector file is shorter than the index")
+            with open(vectors_path, "r+b") as f:
+                f.truncate(expected)
+            return {
+                "ids": ids, "id_to_row": {doc_id: i for i, doc_id in enumerate(ids)},
+                "centroids": data["centroids"], "lo": data["lo"], "step": data["step"],
+                "list_rows": np.split(data["rows"], bounds), "list_codes": np.split(data["codes"], bounds),
+                "trained_rows": int(data["trained_rows"]), "build": build, "vectors": None,
+            }
+        except Exception as e:
+            print(f"⚠️ Could not load IVF index {self.path}: {e}, rebuilding")
+            return None
+
+    def _sync(self):
+        """Bring the index in line with the collection: add new rows, retrain on deletes or large growth."""
+        index = self._index if self._index is not None else self._load_saved()
+        current = self.coll.get(include=[])["ids"]
+        if index is not None:
+            current_set = set(current)
+            removed = any(doc_id not in current_set for doc_id in index["ids"])
+            new_ids = [doc_id for doc_id in current if doc_id not in index["id_to_row"]]
+            grown = len(index["ids"]) + len(new_ids) > index["trained_rows"] * (1 + IVF_REBUILD_GROWTH)
+            if removed or grown:
+                index = None
+            elif new_ids:
+                with open(self._vectors_path(index["build"]), "ab") as out:
+                    for i in range(0, len(new_ids), LOAD_BATCH_SIZE):
+                        got = self.coll.get(ids=new_ids[i:i + LOAD_BATCH_SIZE], include=["embeddings"])
+                        self._add_rows(index, got["ids"], np.asarray(got["embeddings"], dtype=np.float32), out)
+                self._save(index)
+            else:
+                return index
+        if index is None and current:
+            index = self._build()
+            if index is not None:
+                self._save(index)
+        return index
+
+    def _get_index(self):
+        if self._dirty:
+            with self._lock:
+                if self._dirty:
+                    self._index = self._sync()
+                    self._dirty = False
+        return self._index
+
+    def _vectors(self, index):
+        """Normalized float32 vectors, row-aligned with index["ids"], memory-mapped from disk."""
+        vectors = index["vectors"]
+        if vectors is None:
+            shape = (len(index["ids"]), index["centroids"].shape[1])
+            vectors = index["vectors"] = np.memmap(self._vectors_path(index["build"]), dtype=np.float32, mode="r", shape=shape)
+        return vectors
+
+    def _rerank(self, index, rows, q, n_results):
+        """Exact top n_results of rows (sorted row numbers) against the on-disk vectors, with documents and metadata."""
+        vectors = self._vectors(index)
+        exact = np.concatenate([vectors[rows[i:i + LOAD_BATCH_SIZE]] @ q for i in range(0, len(rows), LOAD_BATCH_SIZE)])
+        k = min(n_results, len(rows))
+        best = np.argpartition(-exact, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+        best = best[np.argsort(-exact[best])]
+        ids = [index["ids"][r] for r in rows[best]]
+        # Documents and metadata only: Chroma answers these from SQLite without loading its vector index
+        got = self.coll.get(ids=ids, include=["documents", "metadatas"])
+        found = {doc_id: (doc, meta) for doc_id, doc, meta in zip(got["ids"], got["documents"], got["metadatas"])}
+        return [(doc_id, found[doc_id][0], float(exact[i]), found[doc_id][1])
+                for doc_id, i in zip(ids, best) if doc_id in found]
+
+    # --- backend interface -----------------------------------------------
+    def count(self):
+        index = self._get_index()
+        return len(index["ids"]) if index else 0
+
+    def query(self, query_embedding, n_results, where=None):
+        """Top n_results as [(id, document, cosine_similarity, metadata)], best first (exactly re-ranked)."""
+        index = self._get_index()
+        if not index or not index["ids"]:
+            return []
+        q = _normalize(query_embedding)
+        if where:
+            # The compressed index holds no metadata: Chroma resolves the filter to ids (SQLite only),
+            # then the matching rows are scored exactly from the memory-mapped vectors
+            matching = self.coll.get(where=where, include=[])["ids"]
+            rows = np.array(sorted(index["id_to_row"][i] for i in matching if i in index["id_to_row"]), dtype=np.int64)
+            return self._rerank(index, rows, q, n_results) if len(rows) else []
+        centroid_scores = index["centroids"] @ q
+        nprobe = min(self.nprobe, len(centroid_scores))
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        rows = np.concatenate([index["list_rows"][p] for p in probe])
+        if len(rows) == 0:
+            return []
+        codes = np.concatenate([index["list_codes"][p] for p in probe])
+        # Dot product with dequantized vectors: q . (lo + code * step)
+        approx = codes.astype(np.float32) @ (q * index["step"]) + float(q @ index["lo"])
+        k = min(len(rows), max(n_results, n_results * self.rerank_factor))
+        top = np.argpartition(-approx, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+        # Exact re-rank with the float vectors (sorted rows read the file front to back)
+        return self._rerank(index, np.sort(rows[top]), q, n_results)
+
+    def fetch(self, ids, query_embedding=None):
+        """{id: (metadata, cosine_similarity or None)}; scores from the on-disk vectors, metadata from Chroma."""
+        if not ids:
+            return {}
+        got = self.coll.get(ids=list(ids), include=["metadatas"])
+        index = self._get_index() if query_embedding is not None else None
+        q = _normalize(query_embedding) if index else None
+        out = {}
+        for doc_id, meta in zip(got["ids"], got["metadatas"]):
+            score = None
+            if q is not None and doc_id in index["id_to_row"]:
+                score = float(self._vectors(index)[index["id_to_row"][doc_id]] @ q)
+            out[doc_id] = (meta, score)
+        return out
+
+    def invalidate(self):
+        """Collection was written: pick up new rows (or retrain) on the next query."""
+        self._dirty = True
+
+
+class ShardedBackend:
+    """
+    One backend per shard (e.g. per source id), queried in parallel and merged by score.
+    shard_for_id maps a document id to its shard so fetch() only touches the owning shard.
+    source_ids restricts a query to those shards; other shards are never touched.
+    """
+    name = "sharded"
+
+    def __init__(self, shard_for_id):
+        self.shard_for_id = shard_for_id
+        self._shards = {}
+        self._lock = threading.Lock()
+
+    def set_shard(self, shard, backend):
+        with self._lock:
+            self._shards = {**self._shards, shard: backend}
+
+    def remove_shard(self, shard):
+        with self._lock:
+            self._shards = {k: v for k, v in self._shards.items() if k != shard}
+
+    def shard_names(self):
+        return sorted(self._shards)
+
+    def get_shard(self, shard):
+        return self._shards.get(shard)
+
+    def _select(self, source_ids=None):
+        shards = self._shards  # copy-on-write dict: safe to read without the lock
+        if source_ids is None:
+            return list(shards.values())
+        return [shards[s] for s in source_ids if s in shards]
+
+    def count(self, source_ids=None):
+        return sum(b.count() for b in self._select(source_ids))
+
+    def query(self, query_embedding, n_results, where=None, source_ids=None):
+        """Top n_results over the selected shards as [(id, document, cosine_similarity, metadata)], best first."""
+        backends = self._select(source_ids)
+        if not backends:
+            return []
+        if len(backends) == 1:
+            return backends[0].query(query_embedding, n_results, where)
+        per_shard = _fanout_pool.map(lambda b: b.query(query_embedding, n_results, where), backends)
+        return heapq.nlargest(n_results, (r for results in per_shard for r in results), key=lambda r: r[2])
+
+    def fetch(self, ids, query_embedding=None):
+        """{id: (metadata, cosine_similarity or None)}, routed to each id's shard."""
+        by_shard = {}
+        for doc_id in ids:
+            by_shard.setdefault(self.shard_for_id(doc_id), []).append(doc_id)
+        out = {}
+        for shard, shard_ids in by_shard.items():
+            backend = self._shards.get(shard)
+            if backend is not None:
+                out.update(backend.fetch(shard_ids, query_embedding))
+        return out
+
+    def invalidate(self):
+        for backend in self._select():
+            backend.invalidate()
+
+
+BACKENDS = {
+    "chroma": ChromaBackend,
+    "numpy": NumpyBackend,
+    "ivf": IVFBackend,
+}
+
+def get_backend(coll, name=None):
+    """Backend instance for a collection (name defaults to VECTOR_BACKEND)."""
+    name = name or VECTOR_BACKEND
+    if name not in BACKENDS:
+        print(f"⚠️ Unknown VECTOR_BACKEND '{name}', using chroma")
+        name = "chroma"
+    return BACKENDS[name](coll)
@@ -0,0 +1,472 @@
+"""
+Shooting schedule for production plans: which scenes are shot on which days, and which cannot
+be scheduled within the actors' available days.
+- greedy_schedule: the original single pass (scenes sorted by scarcest actor, then cost, one
+  after another; a scene is blocked as soon as one of its actors runs short)
+- optimize_schedule: local search (simulated annealing) over the shooting order and the set of
+  blocked scenes, within SCHEDULE_TIME_BUDGET seconds
+The optimizer, in order of priority: keeps every actor within available_days (working days),
+blocks as few scene-days as possible, then minimizes shooting days + actor cost + company moves.
+A result with more shooting days than greedy's that blocks no fewer scene-days is replaced by greedy's.
+Actors are paid from their first to their last shooting day (hold days in between included), so
+the order of scenes changes the cast bill. Scenes at the same set and time of day are grouped;
+one-day scenes with a page length (page_eighths, from script_parser) share a shooting day while
+they fit into pages_per_day. Both return calendar entries in the shape ShootingSchedule.jsx reads.
+"""
+import os
+import math
+import time
+import random
+
+# Seconds of local search per plan (small plans converge and stop earlier, see SCHEDULE_STALL_ITERATIONS)
+SCHEDULE_TIME_BUDGET = float(os.getenv("SCHEDULE_TIME_BUDGET", "1.0"))
+# Stop after this many moves (times the scene count) without a better schedule
+SCHEDULE_STALL_ITERATIONS = int(os.getenv("SCHEDULE_STALL_ITERATIONS", "60"))
+SCHEDULE_SEED = int(os.getenv("SCHEDULE_SEED", "0"))
+
+# Objective weights, in shooting days. Actor cost is converted to days at the price of a day with
+# the whole cast on payroll. Penalties make availability and blocked scenes dominate everything else.
+OVERUSE_PENALTY = 10000.0   # per actor working day beyond available_days
+BLOCKED_PENALTY = 1000.0    # per estimated day of a blocked scene
+COMPANY_MOVE_WEIGHT = 0.25  # per change of set or day/night between consecutive shooting days
+# Share of the time budget spent ordering whole set/day-night runs before moving single scenes
+RUN_ORDER_SHARE = 0.4
+START_TEMPERATURE = 2.0
+END_TEMPERATURE = 0.02
+
+
+def scene_group(scene):
+    """(set, "day"/"night") a scene is shot at; scenes in the same group can share a day."""
+    place = str(scene.get("set") or scene.get("location") or "").strip().upper()
+    time_of_day = "night" if "night" in str(scene.get("time_of_day") or "").lower() else "day"
+    return place, time_of_day
+
+
+def _entry(scene, start_day, end_day):
+    place, time_of_day = scene_group(scene)
+    return {
+        "scene_number": scene.get("scene_number"),
+        "start_day": start_day,
+        "end_day": end_day,
+        "actors": scene.get("required_actors") or [],
+        "set": place,
+        "time_of_day": time_of_day,
+    }
+
+
+def _blocked_entry(scene, actor, days_missing):
+    return {
+        "scene_number": scene.get("scene_number"),
+        "reason": f"Actor '{actor}' needs {days_missing} more day(s)",
+        "actor_shortage": actor,
+        "days_missing": days_missing,
+    }
+
+
+def _greedy(scenes, actor_model):
+    """Indices of scenes in greedy order as (index, shortage actor, days missing); no shortage = scheduled."""
+    remaining = {name: data["remaining_days"] for name, data in actor_model.items()}
+
+    def cost(scene):
+        return sum(actor_model[a]["daily_rate"] * scene.get("estimated_days", 1)
+                   for a in scene.get("required_actors") or [] if a in actor_model)
+
+    def sort_key(i):
+        min_rem = float("inf")
+        for aname in scenes[i].get("required_actors") or []:
+            if aname in remaining:
+                min_rem = min(min_rem, remaining[aname])
+        return (min_rem, -cost(scenes[i]))
+
+    steps = []
+    for i in sorted(range(len(scenes)), key=sort_key):
+        req_actors = scenes[i].get("required_actors") or []
+        est_days = scenes[i].get("estimated_days", 1)
+
+        shortage_actor = None
+        days_missing = 0
+        for aname in req_actors:
+            if aname in remaining and remaining[aname] < est_days and est_days - remaining[aname] > days_missing:
+                days_missing = est_days - remaining[aname]
+                shortage_actor = aname
+
+        if all(remaining.get(a, 0) >= est_days for a in req_actors):
+            for aname in req_actors:
+                if aname in remaining:
+                    remaining[aname] -= est_days
+            steps.append((i, None, 0))
+        else:
+            steps.append((i, shortage_actor or req_actors[0], days_missing or est_days))
+    return steps
+
+
+def _greedy_entries(scenes, steps):
+    """(calendar, blocked) for _greedy steps: scheduled scenes back to back from day 1."""
+    calendar, blocked = [], []
+    current_day = 1
+    for i, shortage_actor, days_missing in steps:
+        scene = scenes[i]
+        if shortage_actor is None:
+            est_days = scene.get("estimated_days", 1)
+            calendar.append(_entry(scene, current_day, current_day + est_days - 1))
+            current_day += est_days
+        else:
+            blocked.append(_blocked_entry(scene, shortage_actor, days_missing))
+    return calendar, blocked
+
+
+def greedy_schedule(scenes, actor_model):
+    """
+    Original scheduler: sort by (min remaining days of the scene's actors, -actor cost) and give
+    each scene the next free days; a scene whose actors are short is blocked. Returns (calendar, blocked).
+    """
+    return _greedy_entries(scenes, _greedy(scenes, actor_model))
+
+
+def _shooting_days(calendar):
+    return max((e["end_day"] for e in calendar), default=0)
+
+
+def schedule_summary(calendar, actor_model):
+    """Shooting days, actor working/hold days, actor cost (first to last day paid) and company moves."""
+    worked = {}
+    for entry in calendar:
+        for aname in entry.get("actors") or []:
+            if aname in actor_model:
+                worked.setdefault(aname, set()).update(range(entry["start_day"], entry["end_day"] + 1))
+    work_days = sum(len(days) for days in worked.values())
+    paid_days = {a: max(days) - min(days) + 1 for a, days in worked.items()}
+    ordered = sorted(calendar, key=lambda e: (e["start_day"], e["end_day"]))
+    moves = sum(1 for prev, cur in zip(ordered, ordered[1:])
+                if (prev.get("set"), prev.get("time_of_day")) != (cur.get("set"), cur.get("time_of_day")))
+    return {
+        "shooting_days": _shooting_days(calendar),
+        "scheduled_scenes": len(calendar),
+        "actor_work_days": work_days,
+        "actor_hold_days": sum(paid_days.values()) - work_days,
+        "actor_cost": round(sum(actor_model[a]["daily_rate"] * d for a, d in paid_days.items()), 2),
+        "company_moves": moves,
+    }
+
+
+class _Problem:
+    """Scenes and actors as index arrays, and the decoder from (order, blocked) to a schedule."""
+
+    def __init__(self, scenes, actor_model, pages_per_day):
+        self.scenes = scenes
+        self.names = list(actor_model)
+        index = {name: i for i, name in enumerate(self.names)}
+        self.rates = [actor_model[a]["daily_rate"] for a in self.names]
+        self.available = [actor_model[a]["available_days"] for a in self.names]
+        self.day_value = sum(self.rates) or 1.0
+        self.capacity = pages_per_day * 8
+        groups = {}
+        self.days, self.cast, self.eighths, self.group = [], [], [], []
+        for scene in scenes:
+            days = max(1, int(scene.get("estimated_days") or 1))
+            eighths = scene.get("page_eighths")
+            packable = days == 1 and isinstance(eighths, (int, float)) and 0 < eighths <= self.capacity
+            self.days.append(days)
+            self.cast.append(tuple(sorted({index[a] for a in scene.get("required_actors") or [] if a in index})))
+            self.eighths.append(eighths if packable else None)
+            self.group.append(groups.setdefault(scene_group(scene), len(groups)))
+        self.scenes_of_actor = [[] for _ in self.names]
+        for i, cast in enumerate(self.cast):
+            for a in cast:
+                self.scenes_of_actor[a].append(i)
+        self.members = [[] for _ in groups]
+        for i, g in enumerate(self.group):
+            self.members[g].append(i)
+
+    def decode(self, order, blocked, layout=None):
+        """
+        Objective of shooting the unblocked scenes in this order; fills layout with (scene, start, end)
+        (0-based days) if given. Returns (objective, work days per actor).
+        """
+        days, cast, eighths, group, capacity = self.days, self.cast, self.eighths, self.group, self.capacity
+        n_actors = len(self.names)
+        work = [0] * n_actors
+        first = [-1] * n_actors
+        last = [-1] * n_actors
+        day = moves = blocked_days = 0
+        prev_group = open_group = -1
+        open_load = 0
+        for i in order:
+            if blocked[i]:
+                blocked_days += days[i]
+                continue
+            g = group[i]
+            e = eighths[i]
+            if e is not None and g == open_group and open_load + e <= capacity:
+                # Shares the day already open at this set
+                open_load += e
+                start = end = day - 1
+            else:
+                if g != prev_group and prev_group >= 0:
+                    moves += 1
+                prev_group = g
+                start = day
+                day += days[i]
+                end = day - 1
+                open_group, open_load = (g, e) if e is not None else (-1, 0)
+            for a in cast[i]:
+                if last[a] < start:
+                    work[a] += end - start + 1
+                    if first[a] < 0:
+                        first[a] = start
+                    last[a] = end
+            if layout is not None:
+                layout.append((i, start, end))
+        overuse = 0
+        cost = 0.0
+        for a in range(n_actors):
+            if first[a] >= 0:
+                if work[a] > self.available[a]:
+                    overuse += work[a] - self.available[a]
+                cost += self.rates[a] * (last[a] - first[a] + 1)
+        objective = (OVERUSE_PENALTY * overuse + BLOCKED_PENALTY * blocked_days + day
+                     + COMPANY_MOVE_WEIGHT * moves + cost / self.day_value)
+        return objective, work
+
+    def initial_order(self):
+        """Groups one after another (most similar cast next), same-cast scenes adjacent within a group."""
+        casts = [set().union(*(self.cast[i] for i in members)) for members in self.members]
+        left = set(range(len(self.members)))
+        if not left:
+            return []
+        current = max(left, key=lambda g: (sum(self.days[i] for i in self.members[g]), -g))
+        order = []
+        while True:
+            left.discard(current)
+            order.extend(sorted(self.members[current], key=lambda i: (self.cast[i], -(self.eighths[i] or 0), i)))
+            if not left:
+                return order
+            cast = casts[current]
+            current = max(left, key=lambda g: (len(cast & casts[g]) / (len(cast | casts[g]) or 1), -g))
+
+    def initial_blocked(self):
+        """Block scenes until no actor needs more than available_days (counting every scene as whole days)."""
+        blocked = [False] * len(self.days)
+        demand = [sum(self.days[i] for i in scenes) for scenes in self.scenes_of_actor]
+        while True:
+            short = {a for a, d in enumerate(demand) if d > self.available[a]}
+            if not short:
+                return blocked
+            # Most shortage relieved per blocked day; ties: the shorter scene
+            candidates = {i for a in short for i in self.scenes_of_actor[a] if not blocked[i]}
+            best = max(candidates, key=lambda i: (
+                sum(min(self.days[i], demand[a] - self.available[a]) for a in self.cast[i] if a in short) / self.days[i],
+                -self.days[i], -i))
+            blocked[best] = True
+            for a in self.cast[best]:
+                demand[a] -= self.days[best]
+
+    def unblock(self, order, blocked, objective):
+        """Unblock every blocked scene that now fits (shortest first). Returns the new objective."""
+        for i in sorted((i for i, b in enumerate(blocked) if b), key=lambda i: (self.days[i], i)):
+            blocked[i] = False
+            value, _ = self.decode(order, blocked)
+            if value < objective:
+                objective = value
+            else:
+                blocked[i] = True
+        return objective
+
+
+def _order_runs(problem, order, blocked, rng, deadline):
+    """
+    First phase: reorder whole runs of same-group scenes (each set / day-night shot in one go).
+    Shooting days, work days and company moves do not depend on the run order, only the actors'
+    first/last days do, so each run is reduced to its length and per-actor first/last offsets and
+    thousands of orders are scored per second. Returns the scene order.
+    """
+    runs = []
+    for i in order:
+        if runs and problem.group[runs[-1][-1]] == problem.group[i]:
+            runs[-1].append(i)
+        else:
+            runs.append([i])
+    if len(runs) < 3:
+        return order
+    info = []
+    for run in runs:
+        layout = []
+        problem.decode(run, blocked, layout)
+        length = max((end for _, _, end in layout), default=-1) + 1
+        offsets = {}
+        for i, start, end in layout:
+            for a in problem.cast[i]:
+                first, last = offsets.get(a, (start, end))
+                offsets[a] = (min(first, start), max(last, end))
+        info.append((length, [(a, first, last) for a, (first, last) in offsets.items()]))
+    rates = problem.rates
+    n_actors = len(rates)
+
+    def cost(run_order):
+        first = [-1] * n_actors
+        last = [0] * n_actors
+        day = 0
+        for r in run_order:
+            length, offsets = info[r]
+            for a, f, l in offsets:
+                if first[a] < 0:
+                    first[a] = day + f
+                last[a] = day + l
+            day += length
+        total = 0.0
+        for a in range(n_actors):
+            if first[a] >= 0:
+                total += rates[a] * (last[a] - first[a] + 1)
+        return total / problem.day_value
+
+    current_order = list(range(len(runs)))
+    current = cost(current_order)
+    best, best_order = current, current_order
+    n = len(runs)
+    iterations = since_best = 0
+    started = time.perf_counter()
+    span = max(1e-6, deadline - started)
+    temperature = START_TEMPERATURE
+    while since_best < SCHEDULE_STALL_ITERATIONS * n:
+        if iterations % 256 == 0:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            temperature = START_TEMPERATURE * (END_TEMPERATURE / START_TEMPERATURE) ** ((now - started) / span)
+        iterations += 1
+        since_best += 1
+        new = current_order[:]
+        i, j = rng.randrange(n), rng.randrange(n)
+        move = rng.random()
+        if move < 0.4:
+            new.insert(j, new.pop(i))
+        elif move < 0.7:
+            new[i], new[j] = new[j], new[i]
+        else:
+            lo, hi = min(i, j), max(i, j)
+            new[lo:hi + 1] = new[lo:hi + 1][::-1]
+        value = cost(new)
+        if value <= current or rng.random() < math.exp((current - value) / temperature):
+            current_order, current = new, value
+            if value < best - 1e-9:
+                best, best_order = value, new
+                since_best = 0
+    return [i for r in best_order for i in runs[r]]
+
+
+def _neighbour(problem, order, blocked, work, rng):
+    """A random move: (new order, scene to toggle blocked or None)."""
+    n = len(order)
+    move = rng.random()
+    over = [a for a, w in enumerate(work) if w > problem.available[a]]
+    if move < 0.1 or over and move < 0.3:
+        # Block/unblock: a scene of an over-used actor, otherwise any scene
+        pool = problem.scenes_of_actor[rng.choice(over)] if over else range(n)
+        return order, rng.choice(pool)
+    new = order[:]
+    i = rng.randrange(n)
+    if move < 0.55:
+        # Move a scene next to another scene of its group, or (shortens an actor's hold days) of its cast
+        cast = problem.cast[new[i]]
+        if move < 0.35 or not cast:
+            mate = rng.choice(problem.members[problem.group[new[i]]])
+        else:
+            mate = rng.choice(problem.scenes_of_actor[rng.choice(cast)])
+        scene = new.pop(i)
+        new.insert(new.index(mate) + (rng.random() < 0.5) if mate != scene else i, scene)
+    elif move < 0.65:
+        j = rng.randrange(n)
+        new[i], new[j] = new[j], new[i]
+    elif move < 0.85:
+        # Move the whole run of same-group scenes around position i elsewhere
+        g = problem.group[new[i]]
+        lo, hi = i, i + 1
+        while lo > 0 and problem.group[new[lo - 1]] == g:
+            lo -= 1
+        while hi < n and problem.group[new[hi]] == g:
+            hi += 1
+        run = new[lo:hi]
+        del new[lo:hi]
+        k = rng.randrange(len(new) + 1)
+        new[k:k] = run
+    else:
+        j = rng.randrange(n)
+        lo, hi = min(i, j), max(i, j)
+        new[lo:hi + 1] = new[lo:hi + 1][::-1]
+    return new, None
+
+
+def optimize_schedule(scenes, actor_model, pages_per_day=4.0, time_budget=None, seed=None):
+    """
+    Local-search schedule. Returns (calendar, blocked, stats) with calendar/blocked shaped like
+    greedy_schedule; stats has the search iterations and time.
+    """
+    time_budget = SCHEDULE_TIME_BUDGET if time_budget is None else time_budget
+    rng = random.Random(SCHEDULE_SEED if seed is None else seed)
+    started = time.perf_counter()
+    problem = _Problem(scenes, actor_model, pages_per_day)
+    n = len(scenes)
+    order = problem.initial_order()
+    blocked = problem.initial_blocked()
+    problem.unblock(order, blocked, problem.decode(order, blocked)[0])
+    order = _order_runs(problem, order, blocked, rng, started + time_budget * RUN_ORDER_SHARE)
+    current, work = problem.decode(order, blocked)
+    # Start from the greedy schedule instead when it scores better, so the search never ends up worse
+    steps = _greedy(scenes, actor_model)
+    greedy_order = [i for i, _, _ in steps]
+    greedy_blocked = [False] * n
+    for i, shortage_actor, _ in steps:
+        greedy_blocked[i] = shortage_actor is not None
+    greedy_value, greedy_work = problem.decode(greedy_order, greedy_blocked)
+    if greedy_value < current:
+        order, blocked, current, work = greedy_order, greedy_blocked, greedy_value, greedy_work
+    best = (current, order, blocked[:])
+
+    iterations = since_best = 0
+    stall_limit = SCHEDULE_STALL_ITERATIONS * max(1, n)
+    temperature = START_TEMPERATURE
+    while n > 1 and since_best < stall_limit:
+        if iterations % 64 == 0:
+            elapsed = time.perf_counter() - started
+            if elapsed >= time_budget:
+                break
+            temperature = START_TEMPERATURE * (END_TEMPERATURE / START_TEMPERATURE) ** (elapsed / time_budget)
+        iterations += 1
+        since_best += 1
+        new_order, toggle = _neighbour(problem, order, blocked, work, rng)
+        if toggle is not None:
+            blocked[toggle] = not blocked[toggle]
+        value, new_work = problem.decode(new_order, blocked)
+        if value <= current or rng.random() < math.exp((current - value) / temperature):
+            order, current, work = new_order, value, new_work
+            if value < best[0] - 1e-9:
+                best = (value, order, blocked[:])
+                since_best = 0
+        elif toggle is not None:
+            blocked[toggle] = not blocked[toggle]
+
+    objective, order, blocked = best
+    problem.unblock(order, blocked, objective)
+    layout = []
+    _, work = problem.decode(order, blocked, layout)
+    calendar = [_entry(scenes[i], start + 1, end + 1) for i, start, end in layout]
+    blocked_entries = []
+    for i in order:
+        if not blocked[i]:
+            continue
+        scene = scenes[i]
+        cast = problem.cast[i] or [None]
+        a = max(cast, key=lambda a: -1 if a is None else work[a] + problem.days[i] - problem.available[a])
+        name = problem.names[a] if a is not None else (scene.get("required_actors") or [None])[0]
+        missing = problem.days[i] if a is None else work[a] + problem.days[i] - problem.available[a]
+        blocked_entries.append(_blocked_entry(scene, name, max(1, missing)))
+    stats = {"iterations": iterations, "search_ms": round((time.perf_counter() - started) * 1000, 1)}
+    # Never hand back a longer shoot than greedy's unless it pays for itself in scheduled scenes
+    # (greedy can only be shorter by blocking more scene-days)
+    greedy_calendar, greedy_blocked_entries = _greedy_entries(scenes, steps)
+    if (_shooting_days(calendar) > _shooting_days(greedy_calendar)
+            and sum(problem.days[i] for i in range(n) if blocked[i])
+            >= sum(problem.days[i] for i in range(n) if greedy_blocked[i])):
+        stats["fallback"] = "greedy"
+        return greedy_calendar, greedy_blocked_entries, stats
+    return calendar, blocked_entries, stats
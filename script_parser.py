@@ -0,0 +1,148 @@
+"""
+Deterministic screenplay parser: slug lines, character cues, dialogue blocks and page-eighths
+length estimates, in milliseconds and without an LLM. production_planner uses it to pre-segment
+scenes and extract the cast, so the LLM only fills in budgets, safety measures and risks.
+Works on standard screenplay formatting (INT./EXT. headings, UPPERCASE character cues above
+dialogue); parse_screenplay(...)["is_screenplay"] is False for free-form text.
+"""
+import re
+
+# Scene heading ("slug line"): optional scene number, INT./EXT./INT/EXT/I/E, location, optional "- DAY"
+SCENE_HEADING_RE = re.compile(r"^\s*(?:\d+[A-Z]?\s*[.)]?\s+)?(?:INT\.?/EXT|EXT\.?/INT|I/E|INT|EXT)[.\s]", re.IGNORECASE)
+_HEADING_PARTS_RE = re.compile(
+    r"^\s*(?:(?P<number>\d+[A-Z]?)\s*[.)]?\s+)?(?P<type>INT\.?/EXT|EXT\.?/INT|I/E|INT|EXT)\.?\s*(?P<rest>.*?)\s*(?:\d+[A-Z]?\s*)?$",
+    re.IGNORECASE,
+)
+# "- DAY", "-- NIGHT (CONTINUOUS)", ... at the end of a heading
+_TIME_RE = re.compile(r"\s+-+\s*(?P<time>[A-Z][A-Z .'/()-]*)$", re.IGNORECASE)
+# Parenthetical extensions on cues: (V.O.), (O.S.), (CONT'D), (O.C.)
+_CUE_EXTENSION_RE = re.compile(r"\s*\((?:[^)]*)\)\s*$")
+_CUE_RE = re.compile(r"^[A-Z0-9][A-Z0-9 .'&-]*[A-Z0-9.)']$")
+TRANSITIONS = ("CUT TO", "FADE IN", "FADE OUT", "FADE TO", "DISSOLVE TO", "SMASH CUT", "MATCH CUT", "INTERCUT",
+               "BACK TO", "CONTINUOUS", "THE END", "TITLE", "SUPER", "MONTAGE", "END MONTAGE", "FLASHBACK",
+               "END FLASHBACK", "LATER", "MOMENTS LATER")
+# Unnamed roles are not cast (same rule the LLM extraction prompt uses)
+GENERIC_ROLES = {"MAN", "WOMAN", "BOY", "GIRL", "CROWD", "ALL", "VOICE", "VOICES", "EVERYONE", "BOTH", "OTHERS",
+                 "GUARD", "WAITER", "DRIVER", "NARRATOR", "PEOPLE"}
+NIGHT_WORDS = ("NIGHT", "EVENING", "DUSK", "MIDNIGHT")
+# Screenplay page ~ 55 lines; scene length is quoted in eighths of a page (min 1/8)
+LINES_PER_PAGE = 55
+MAX_CUE_WORDS = 4
+
+
+def _is_cue(line, next_line):
+    """UPPERCASE name line directly followed by dialogue or a parenthetical."""
+    stripped = line.strip()
+    if not stripped or not next_line.strip() or SCENE_HEADING_RE.match(stripped):
+        return False
+    name = _CUE_EXTENSION_RE.sub("", stripped).strip()
+    if not name or name != name.upper() or not _CUE_RE.match(name) or len(name.split()) > MAX_CUE_WORDS:
+        return False
+    if name.endswith(":") or name.startswith(TRANSITIONS) or not any(c.isalpha() for c in name):
+        return False
+    # A caps line followed by more caps is an action block ("BANG! THE DOOR FLIES OPEN"), not a cue
+    return not next_line.strip().isupper() or next_line.strip().startswith("(")
+
+
+def cue_name(line):
+    """Character name from a cue line: "RAVI (V.O.)" -> "Ravi"."""
+    name = _CUE_EXTENSION_RE.sub("", line.strip()).strip()
+    return " ".join(w.capitalize() if w.isalpha() else w.title() for w in name.split())
+
+
+def parse_heading(line):
+    """{"heading", "location_type", "location", "time_of_day"} for a slug line."""
+    heading = line.strip()
+    match = _HEADING_PARTS_RE.match(heading)
+    rest = match.group("rest") if match else heading
+    time_of_day = ""
+    time_match = _TIME_RE.search(rest)
+    if time_match:
+        time_of_day = time_match.group("time").strip().upper()
+        rest = rest[:time_match.start()]
+    location_type = match.group("type").upper().replace(".", "") if match else ""
+    return {
+        "heading": heading,
+        "location_type": location_type,
+        "location": rest.strip(" .-").upper(),
+        "time_of_day": time_of_day,
+    }
+
+
+def day_or_night(time_of_day):
+    """"night" for NIGHT/EVENING/DUSK/MIDNIGHT headings, otherwise "day" (CONTINUOUS, LATER, ... included)."""
+    return "night" if any(w in (time_of_day or "").upper() for w in NIGHT_WORDS) else "day"
+
+
+def format_eighths(eighths):
+    """Page length the way schedules print it: 11 -> "1 3/8", 4 -> "4/8"."""
+    pages, rest = divmod(int(eighths), 8)
+    if pages and rest:
+        return f"{pages} {rest}/8"
+    return f"{pages}" if pages else f"{rest}/8"
+
+
+def _finish_scene(scene, lines):
+    body = [l for l in lines if l.strip()]
+    scene["line_count"] = len(lines)
+    scene["page_eighths"] = max(1, round(len(lines) / LINES_PER_PAGE * 8))
+    scene["pages"] = format_eighths(scene["page_eighths"])
+    scene["text"] = "\n".join(lines).strip()
+    scene["action_lines"] = len(body) - scene["dialogue_lines"] - scene["cue_count"]
+    del scene["cue_count"]
+
+
+def parse_screenplay(text):
+    """
+    Parse screenplay text into scenes and cast.
+    Returns {"is_screenplay", "scenes": [...], "characters": [{"name", "lines", "scenes", "first_scene"}]}.
+    Each scene: scene_number, heading, location_type (INT/EXT/INT/EXT), location, time_of_day,
+    characters (speaking, first-appearance order), dialogue_lines, action_lines, line_count,
+    page_eighths, pages ("1 3/8") and text.
+    """
+    lines = (text or "").replace("\r\n", "\n").split("\n")
+    scenes, characters = [], {}
+    scene, scene_lines = None, []
+    speaker = None
+    for i, line in enumerate(lines):
+        if SCENE_HEADING_RE.match(line):
+            if scene:
+                _finish_scene(scene, scene_lines)
+            scene = {"scene_number": len(scenes) + 1, **parse_heading(line), "characters": [],
+                     "dialogue_lines": 0, "cue_count": 0}
+            scenes.append(scene)
+            scene_lines, speaker = [], None
+            continue
+        if scene is None:
+            continue  # title page / text before the first heading
+        scene_lines.append(line)
+        next_line = lines[i + 1] if i + 1 < len(lines) else ""
+        if not line.strip():
+            speaker = None
+        elif _is_cue(line, next_line):
+            speaker = cue_name(line)
+            scene["cue_count"] += 1
+            if speaker.upper() in GENERIC_ROLES or speaker in scene["characters"]:
+                continue
+            scene["characters"].append(speaker)
+            entry = characters.setdefault(speaker, {"name": speaker, "lines": 0, "scenes": 0, "first_scene": scene["scene_number"]})
+            entry["scenes"] += 1
+        elif speaker and not line.strip().startswith("("):
+            scene["dialogue_lines"] += 1
+            if speaker in characters:
+                characters[speaker]["lines"] += 1
+    if scene:
+        _finish_scene(scene, scene_lines)
+    cast = list(characters.values())  # first-appearance order
+    return {
+        "is_screenplay": bool(scenes) and bool(cast),
+        "scenes": scenes,
+        "characters": cast,
+    }
+
+
+def extract_cast(text, limit=20):
+    """Speaking characters, most dialogue first up to limit, returned in first-appearance order."""
+    cast = parse_screenplay(text)["characters"]
+    top = {c["name"] for c in sorted(cast, key=lambda c: -c["lines"])[:limit]}
+    return [c["name"] for c in cast if c["name"] in top]
@@ -1,6 +1,7 @@
 from sentence_transformers import SentenceTransformer, util
 import torch
 import re
+from source_registry import get_source_id_for_frame
 
 # Load model once (IMPORTANT for performance)
 model = SentenceTransformer("all-MiniLM-L6-v2")
@@ -8,9 +9,11 @@ model = SentenceTransformer("all-MiniLM-L6-v2")
 captions = []
 frames = []
 caption_embeddings = None
+frame_sources = []  # source id per frame ("legacy" for frame_NNNN.jpg), for filtered search
+frame_times = None  # tensor of frame timestamps (seconds)
 
 def load_data():
-    global captions, frames, caption_embeddings
+    global captions, frames, caption_embeddings, frame_sources, frame_times
     captions = []
     frames = []
     
@@ -25,6 +28,9 @@ def load_data():
                 frames.append(frame)
                 captions.append(caption)
 
+    frame_sources = [get_source_id_for_frame(f) or "legacy" for f in frames]
+    frame_times = torch.tensor([int((re.findall(r"\d+", f) or [0])[-1]) / 5.0 for f in frames])
+
     if captions:
         print(f"🔄 Loading {len(captions)} captions into embeddings...")
         caption_embeddings = model.encode(captions, convert_to_tensor=True)
@@ -36,10 +42,31 @@ import os
 load_data()
 
 
-def search(query, top_k=10, threshold=0.4):
+def _filter_rows(filters):
+    """Row indices of frames matching {"source_ids", "start", "end"}, or None for no filter."""
+    if not filters or all(filters.get(k) is None for k in ("source_ids", "start", "end")):
+        return None
+    mask = torch.ones(len(frames), dtype=torch.bool)
+    if filters.get("source_ids") is not None:
+        allowed = set(filters["source_ids"])
+        mask &= torch.tensor([s in allowed for s in frame_sources], dtype=torch.bool)
+    if filters.get("start") is not None:
+        mask &= frame_times >= float(filters["start"])
+    if filters.get("end") is not None:
+        mask &= frame_times <= float(filters["end"])
+    return torch.nonzero(mask).flatten()
+
 
+def search(query, top_k=10, threshold=0.4, filters=None):
     query_embedding = model.encode(query, convert_to_tensor=True)
-    scores = util.cos_sim(query_embedding, caption_embeddings)[0]
+    rows = _filter_rows(filters)
+    if rows is None:
+        scores = util.cos_sim(query_embedding, caption_embeddings)[0]
+    else:
+        # Masked matmul: only score frames inside the requested sources / time range
+        if len(rows) == 0:
+            return []
+        scores = util.cos_sim(query_embedding, caption_embeddings[rows.to(caption_embeddings.device)])[0]
 
     # Get a larger pool of potential matches to cluster
     top_results = torch.topk(scores, k=min(50, len(scores)))
@@ -50,7 +77,7 @@ def search(query, top_k=10, threshold=0.4):
         if score_val < threshold:
             continue
         
-        idx_val = int(idx)
+        idx_val = int(idx) if rows is None else int(rows[int(idx)])
         frame = frames[idx_val]
         nums = re.findall(r"\d+", frame)
         ts = int(nums[-1]) / 5.0 if nums else 0.0
@@ -123,5 +150,5 @@ def search(query, top_k=10, threshold=0.4):
     return clips[:1]
 
 
-def search_frames(query):
-    return search(query)
+def search_frames(query, filters=None):
+    return search(query, filters=filters)
@@ -0,0 +1,277 @@
+"""
+In-memory catalog of ingested source videos (replaces video_history.json).
+source id (youtube_001, clip_002) -> type, path, YouTube URL/video id, duration,
+fps, codec, frame count and ingest stats.
+Loaded once from source_registry.json, updated by ingest with atomic writes, so
+search never has to glob source_clips/ or re-read config files per result.
+"""
+import os
+import json
+import re
+import glob
+import subprocess
+import threading
+from datetime import datetime
+
+REGISTRY_FILE = "source_registry.json"
+SOURCE_CLIPS_DIR = "source_clips"
+VIDEO_HISTORY_FILE = "video_history.json"
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".webm", ".avi", ".mkv")
+
+_registry = None  # source_id -> entry dict; None until first use
+_video_id_index = {}  # YouTube video id -> source_id (dedup lookups)
+_hash_index = {}  # sha256 of file bytes -> source_id (content-addressed dedup)
+_lock = threading.Lock()
+
+def default_logger(msg):
+    print(msg)
+
+def normalize_source_id(source_id: str) -> str:
+    """clip_1 -> clip_001, youtube_02 -> youtube_002. Other ids are returned unchanged."""
+    m = re.match(r"^(clip|youtube)_(\d+)$", source_id or "")
+    if m:
+        return f"{m.group(1)}_{m.group(2).zfill(3)}"
+    return source_id
+
+def get_source_id_for_frame(frame: str):
+    """youtube_001_frame_0001.jpg -> youtube_001, clip_1_frame_0001.jpg -> clip_001, frame_0001.jpg -> None."""
+    m = re.match(r"(clip|youtube)_(\d+)_frame_\d+", frame or "")
+    if m:
+        return f"{m.group(1)}_{m.group(2).zfill(3)}"
+    return None
+
+def probe_video(video_path: str):
+    """Return {"duration", "fps", "codec", "width", "height"} via ffprobe (empty dict on failure)."""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=codec_name,width,height,avg_frame_rate:format=duration",
+        "-of", "json",
+        video_path
+    ]
+    try:
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        data = json.loads(out)
+    except Exception as e:
+        print(f"⚠️ ffprobe failed for {video_path}: {e}")
+        return {}
+    stream = (data.get("streams") or [{}])[0]
+    info = {
+        "codec": stream.get("codec_name"),
+        "width": stream.get("width"),
+        "height": stream.get("height"),
+    }
+    try:
+        info["duration"] = float(data.get("format", {}).get("duration"))
+    except (TypeError, ValueError):
+        info["duration"] = None
+    try:
+        num, den = stream.get("avg_frame_rate", "0/1").split("/")
+        info["fps"] = round(float(num) / float(den), 3) if float(den) else None
+    except (ValueError, ZeroDivisionError):
+        info["fps"] = None
+    return info
+
+def _save_registry():
+    """Atomic write: a crash mid-save never leaves a torn registry file."""
+    tmp_path = REGISTRY_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"sources": _registry}, f, indent=4)
+    os.replace(tmp_path, REGISTRY_FILE)
+
+def _bootstrap_registry():
+    """First run: build the catalog from source_clips/ and migrate entries from video_history.json."""
+    history = []
+    if os.path.exists(VIDEO_HISTORY_FILE):
+        try:
+            with open(VIDEO_HISTORY_FILE, "r") as f:
+                history = json.load(f).get("videos", [])
+        except Exception as e:
+            print(f"⚠️ Could not read {VIDEO_HISTORY_FILE}: {e}")
+
+    registry = {}
+    if os.path.exists(SOURCE_CLIPS_DIR):
+        for f in sorted(os.listdir(SOURCE_CLIPS_DIR)):
+            m = re.match(r"^(clip|youtube)_(\d+)\.[^.]+$", f, re.IGNORECASE)
+            if not m or not f.lower().endswith(VIDEO_EXTENSIONS):
+                continue
+            source_id = normalize_source_id(f"{m.group(1).lower()}_{m.group(2)}")
+            registry[source_id] = _new_entry(source_id, m.group(1).lower(), os.path.join(SOURCE_CLIPS_DIR, f))
+
+    for v in history:
+        if not v.get("prefix"):
+            continue
+        source_id = normalize_source_id(v["prefix"])
+        entry = registry.get(source_id) or _new_entry(source_id, v.get("type", "youtube"), v.get("video_path"), probe=False)
+        entry["url"] = v.get("url")
+        entry["video_id"] = v.get("video_id")
+        entry["processed_at"] = v.get("processed_at")
+        registry[source_id] = entry
+    return registry
+
+def _new_entry(source_id, source_type, video_path, url=None, video_id=None, content_hash=None, probe=True):
+    entry = {
+        "source_id": source_id,
+        "type": source_type,
+        "path": video_path,
+        "url": url,
+        "video_id": video_id,
+        "content_hash": content_hash,
+        "ingest_complete": False,
+        "processed_at": datetime.now().isoformat(),
+        "frame_count": None,
+        "stats": {},
+    }
+    if probe and video_path and os.path.exists(video_path):
+        entry.update(probe_video(video_path))
+    return entry
+
+def _ingest_complete(entry):
+    # Entries written before the flag existed got frame_count only once ingest finished
+    return entry.get("ingest_complete", entry.get("frame_count") is not None)
+
+def _rebuild_indexes():
+    _video_id_index.clear()
+    _hash_index.clear()
+    for source_id, entry in _registry.items():
+        if entry.get("video_id"):
+            _video_id_index[entry["video_id"]] = source_id
+        # Only fully ingested media counts as a duplicate; a failed ingest can be uploaded again
+        if entry.get("content_hash") and _ingest_complete(entry):
+            _hash_index[entry["content_hash"]] = source_id
+
+def _ensure_loaded():
+    global _registry
+    if _registry is not None:
+        return
+    with _lock:
+        if _registry is not None:
+            return
+        loaded = None
+        if os.path.exists(REGISTRY_FILE):
+            try:
+                with open(REGISTRY_FILE, "r") as f:
+                    loaded = json.load(f).get("sources", {})
+            except Exception as e:
+                print(f"⚠️ Could not read {REGISTRY_FILE}: {e}, rebuilding")
+        if loaded is None:
+            _registry = _bootstrap_registry()
+            _save_registry()
+        else:
+            _registry = loaded
+        _rebuild_indexes()
+
+def register_source(source_id: str, video_path: str, source_type: str, url: str = None, video_id: str = None,
+                    content_hash: str = None, update_status=default_logger):
+    """
+    Add or refresh a source (probes duration/fps/codec once) and persist the catalog. content_hash
+    is only matched by find_by_content_hash once update_source_stats(..., ingest_complete=True).
+    """
+    _ensure_loaded()
+    source_id = normalize_source_id(source_id)
+    entry = _new_entry(source_id, source_type, video_path, url=url, video_id=video_id, content_hash=content_hash)
+    with _lock:
+        _registry[source_id] = entry
+        if video_id:
+            _video_id_index[video_id] = source_id
+        _save_registry()
+    update_status(f"🗂️ Registered source {source_id}")
+    return entry
+
+def update_source_stats(source_id: str, frame_count: int = None, ingest_complete: bool = None, **stats):
+    """
+    Record frame count and ingest stats (captions, audio segments, timings) for a source.
+    ingest_complete=True marks frames, captions and audio as done, so re-uploads of the same
+    bytes are linked to this source from then on.
+    """
+    _ensure_loaded()
+    source_id = normalize_source_id(source_id)
+    with _lock:
+        entry = _registry.get(source_id)
+        if entry is None:
+            return None
+        if frame_count is not None:
+            entry["frame_count"] = frame_count
+        if ingest_complete is not None:
+            entry["ingest_complete"] = ingest_complete
+            if ingest_complete and entry.get("content_hash"):
+                _hash_index[entry["content_hash"]] = source_id
+        entry.setdefault("stats", {}).update(stats)
+        _save_registry()
+    return entry
+
+def find_by_video_id(video_id: str):
+    """Catalog entry for an already-ingested YouTube video id, or None."""
+    _ensure_loaded()
+    source_id = _video_id_index.get(video_id)
+    return _registry.get(source_id) if source_id else None
+
+def find_by_content_hash(content_hash: str):
+    """Fully ingested catalog entry whose file bytes hash to content_hash, or None."""
+    _ensure_loaded()
+    source_id = _hash_index.get(content_hash)
+    return _registry.get(source_id) if source_id else None
+
+def add_source_alias(source_id: str, alias: str):
+    """Remember another name/URL the same media arrived under (re-upload, different YouTube link)."""
+    _ensure_loaded()
+    with _lock:
+        entry = _registry.get(normalize_source_id(source_id))
+        if entry is None:
+            return None
+        aliases = entry.setdefault("aliases", [])
+        if alias and alias not in aliases:
+            aliases.append(alias)
+            _save_registry()
+    return entry
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """sha256 of a file, read in chunks (used for downloads; uploads are hashed while streaming)."""
+    import hashlib
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_source(source_id: str):
+    """Registry entry for a source id, or None."""
+    _ensure_loaded()
+    return _registry.get(normalize_source_id(source_id))
+
+def get_source_for_frame(frame: str):
+    """Registry entry for the source a frame belongs to, or None (legacy frame_NNNN.jpg or unknown source)."""
+    source_id = get_source_id_for_frame(frame)
+    return get_source(source_id) if source_id else None
+
+def find_source_on_disk(source_id: str):
+    """Slow path for sources missing from the registry (e.g. files copied in by hand): glob and register."""
+    source_id = normalize_source_id(source_id)
+    matches = glob.glob(os.path.join(SOURCE_CLIPS_DIR, f"{source_id}.*"))
+    if not matches:
+        # Fallback: try unpadded (e.g. clip_1)
+        m = re.match(r"^(clip|youtube)_0*(\d+)$", source_id)
+        if m:
+            matches = glob.glob(os.path.join(SOURCE_CLIPS_DIR, f"{m.group(1)}_{m.group(2)}.*"))
+    if not matches:
+        return None
+    return register_source(source_id, matches[0], source_id.split("_", 1)[0], update_status=lambda _msg: None)
+
+def list_sources():
+    """All registry entries, sorted by source id."""
+    _ensure_loaded()
+    return [_registry[k] for k in sorted(_registry)]
+
+def resolve_source_ids(sources=None, source_type: str = None):
+    """
+    Search scope from request params: sources (list or comma-separated ids, e.g. "youtube_1,clip_002")
+    and/or source_type ("youtube" | "clip"). Returns normalized ids, or None for "all sources".
+    """
+    if isinstance(sources, str):
+        sources = [s for s in sources.split(",") if s.strip()]
+    ids = [normalize_source_id(s.strip()) for s in sources] if sources else None
+    if source_type:
+        _ensure_loaded()
+        of_type = [k for k in sorted(_registry) if _registry[k].get("type") == source_type]
+        ids = of_type if ids is None else [s for s in ids if s in of_type]
+    return ids
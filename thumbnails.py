@@ -0,0 +1,161 @@
+"""
+Thumbnail and sprite sheet generation for extracted frames.
+Downscales frames/<prefix>_frame_NNNN.jpg into thumbnails/ and packs them into
+per-source sprite sheets (sprites/<prefix>_sprite_NNN.jpg) with a JSON index
+of frame -> tile offset, so result pages load a few sheets instead of one
+full-resolution image per hit.
+"""
+import os
+import json
+import re
+
+FRAMES_DIR = "frames"
+THUMBNAILS_DIR = "thumbnails"
+SPRITES_DIR = "sprites"
+THUMB_WIDTH = 160
+THUMB_HEIGHT = 90
+SPRITE_COLUMNS = 10
+SPRITE_ROWS = 10
+JPEG_QUALITY = 70
+BASE_URL = "http://localhost:8000"
+
+# source prefix -> (index mtime, index dict); reloaded only when the file changes
+_sprite_index_cache = {}
+
+def default_logger(msg):
+    print(msg)
+
+def get_source_prefix(frame: str):
+    """youtube_001_frame_0001.jpg -> youtube_001, clip_002_frame_0010.jpg -> clip_002, frame_0001.jpg -> None."""
+    m = re.match(r"^(.+)_frame_\d+\.jpg$", frame)
+    return m.group(1) if m else None
+
+def _sprite_index_path(source_prefix: str):
+    return os.path.join(SPRITES_DIR, f"{source_prefix}.json")
+
+def _list_source_frames(source_prefix: str):
+    """All extracted frames for one source, in frame order."""
+    if not os.path.exists(FRAMES_DIR):
+        return []
+    prefix = f"{source_prefix}_frame_"
+    return sorted(f for f in os.listdir(FRAMES_DIR) if f.startswith(prefix) and f.endswith(".jpg"))
+
+def generate_previews_for_source(source_prefix: str, update_status=default_logger):
+    """
+    Build thumbnails and sprite sheets for every frame of a source.
+    Each frame is decoded once: downscaled to a THUMB_WIDTH x THUMB_HEIGHT tile,
+    saved to thumbnails/ and pasted into the current sprite sheet.
+    Returns the sprite index dict (or None if Pillow is missing / no frames).
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        update_status("⚠️ Pillow not available, skipping thumbnails and sprite sheets")
+        return None
+
+    frames = _list_source_frames(source_prefix)
+    if not frames:
+        return None
+
+    os.makedirs(THUMBNAILS_DIR, exist_ok=True)
+    os.makedirs(SPRITES_DIR, exist_ok=True)
+    update_status(f"🖼️ Building thumbnails and sprite sheets for {len(frames)} frames of {source_prefix}...")
+
+    per_sheet = SPRITE_COLUMNS * SPRITE_ROWS
+    index = {
+        "source": source_prefix,
+        "tile_width": THUMB_WIDTH,
+        "tile_height": THUMB_HEIGHT,
+        "columns": SPRITE_COLUMNS,
+        "sheets": [],
+        "frames": {},  # frame -> [sheet_idx, x, y]
+    }
+
+    sheet = None
+    for i, frame in enumerate(frames):
+        sheet_idx, slot = divmod(i, per_sheet)
+        if slot == 0:
+            if sheet is not None:
+                _save_sheet(sheet, source_prefix, sheet_idx - 1, index)
+            rows = min(SPRITE_ROWS, -(-(len(frames) - i) // SPRITE_COLUMNS))
+            sheet = Image.new("RGB", (SPRITE_COLUMNS * THUMB_WIDTH, rows * THUMB_HEIGHT))
+
+        x = (slot % SPRITE_COLUMNS) * THUMB_WIDTH
+        y = (slot // SPRITE_COLUMNS) * THUMB_HEIGHT
+        try:
+            with Image.open(os.path.join(FRAMES_DIR, frame)) as img:
+                tile = _make_tile(img.convert("RGB"))
+        except Exception as e:
+            update_status(f"⚠️ Thumbnail error for {frame}: {e}")
+            continue
+        tile.save(os.path.join(THUMBNAILS_DIR, frame), "JPEG", quality=JPEG_QUALITY)
+        sheet.paste(tile, (x, y))
+        index["frames"][frame] = [sheet_idx, x, y]
+
+    if sheet is not None:
+        _save_sheet(sheet, source_prefix, (len(frames) - 1) // per_sheet, index)
+
+    tmp_path = _sprite_index_path(source_prefix) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp_path, _sprite_index_path(source_prefix))
+    _sprite_index_cache.pop(source_prefix, None)
+
+    update_status(f"✅ {len(index['sheets'])} sprite sheet(s) for {source_prefix}")
+    return index
+
+def _make_tile(img):
+    """Downscale keeping aspect ratio and letterbox onto a fixed-size tile so the sprite grid is uniform."""
+    from PIL import Image
+    img.thumbnail((THUMB_WIDTH, THUMB_HEIGHT))
+    tile = Image.new("RGB", (THUMB_WIDTH, THUMB_HEIGHT))
+    tile.paste(img, ((THUMB_WIDTH - img.width) // 2, (THUMB_HEIGHT - img.height) // 2))
+    return tile
+
+def _save_sheet(sheet, source_prefix, sheet_idx, index):
+    name = f"{source_prefix}_sprite_{sheet_idx:03d}.jpg"
+    sheet.save(os.path.join(SPRITES_DIR, name), "JPEG", quality=JPEG_QUALITY)
+    index["sheets"].append(name)
+
+def load_sprite_index(source_prefix: str):
+    """Return sprite index for a source (cached in memory, reloaded if the file changed)."""
+    path = _sprite_index_path(source_prefix)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _sprite_index_cache.get(source_prefix)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(path, "r") as f:
+            index = json.load(f)
+    except Exception as e:
+        print(f"⚠️ Could not read sprite index {path}: {e}")
+        return None
+    _sprite_index_cache[source_prefix] = (mtime, index)
+    return index
+
+def get_sprite_for_frame(frame: str):
+    """
+    Sprite coordinates for one frame:
+    {"sheet_url", "x", "y", "width", "height", "thumbnail_url"} or None if no sprite exists yet.
+    """
+    source_prefix = get_source_prefix(frame)
+    if not source_prefix:
+        return None
+    index = load_sprite_index(source_prefix)
+    if not index:
+        return None
+    entry = index["frames"].get(frame)
+    if not entry:
+        return None
+    sheet_idx, x, y = entry
+    return {
+        "sheet_url": f"{BASE_URL}/sprites/{index['sheets'][sheet_idx]}",
+        "x": x,
+        "y": y,
+        "width": index["tile_width"],
+        "height": index["tile_height"],
+        "thumbnail_url": f"{BASE_URL}/thumbnails/{frame}",
+    }
@@ -3,6 +3,12 @@ import chromadb
 from sentence_transformers import SentenceTransformer
 import os
 import re
+import json
+import math
+from dialog_index import get_segment_end, extract_quoted_phrase
+from lexical_index import bm25_search, reciprocal_rank_fusion, caption_row_id, split_frame_name
+from retrieval_backends import get_backend, ShardedBackend, matches_where
+from source_registry import get_source_id_for_frame
 
 # Path fixed to this package dir so chroma_db is always Intent_search_AI/chroma_db
 # regardless of where uvicorn is started (avoids empty DB when cwd differs)
@@ -10,6 +16,8 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CHROMA_PATH = os.path.join(BASE_DIR, "chroma_db")
 CAPTIONS_PATH = os.path.join(BASE_DIR, "captions.txt")
 TRANSCRIPTIONS_PATH = os.path.join(BASE_DIR, "audio_transcriptions.txt")
+# "hybrid": BM25 (lexical_index) fused with vector search; "dense": vector search only
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
 
 # Initialize embedding model (same as semantic_search.py)
 embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
@@ -18,10 +26,12 @@ embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
 client = chromadb.PersistentClient(path=CHROMA_PATH)
 
 # Use cosine distance so "1 - distance" = cosine similarity (matches sentence-transformers)
-collection = client.get_or_create_collection(
-    name="video_captions",
-    metadata={"hnsw:space": "cosine", "description": "Video frame captions and embeddings"}
-)
+# Captions are sharded: one collection per source (caption_shard_youtube_001, ...), each
+# holding one row per distinct caption with its frame spans (at 5 FPS the same caption
+# repeats for long runs of frames). Re-ingesting or deleting a source only touches its shard.
+CAPTION_SHARD_PREFIX = "caption_shard_"
+# Single-collection layouts from before sharding (dropped on migration)
+LEGACY_CAPTIONS_COLLECTIONS = ("video_captions", "video_caption_runs")
 
 # Audio transcriptions collection (separate from video captions)
 audio_collection = client.get_or_create_collection(
@@ -29,91 +39,178 @@ audio_collection = client.get_or_create_collection(
     metadata={"hnsw:space": "cosine", "description": "Audio transcriptions and embeddings"}
 )
 
-def load_captions_to_vector_db(append_only=False):
-    """
-    Load captions.txt into vector database.
-    append_only: If True, only add new captions (by frame name), don't clear existing.
-    """
-    if not os.path.exists(CAPTIONS_PATH):
-        print("⚠️ captions.txt not found.")
-        return
-
-    captions = []
-    frames = []
-    ids = []
+def caption_shard_for_prefix(frame_prefix: str) -> str:
+    """youtube_001_frame_ -> youtube_001, clip_1_frame_ -> clip_001, frame_ (legacy frames) -> legacy."""
+    return get_source_id_for_frame(f"{frame_prefix}0000") or "legacy"
+
+def caption_shard_for_row(row_id: str) -> str:
+    """Shard of a caption row id (youtube_001_frame_caption_<hash> -> youtube_001)."""
+    return caption_shard_for_prefix(row_id.rsplit("caption_", 1)[0])
+
+# Nearest-neighbour search (VECTOR_BACKEND=chroma|numpy|ivf, see retrieval_backends);
+# captions fan out over one backend per source shard
+video_backend = ShardedBackend(caption_shard_for_row)
+audio_backend = get_backend(audio_collection)
+_caption_shards = {}  # shard (source id) -> Chroma collection
+
+def _collection_names():
+    # list_collections returns names on newer Chroma, Collection objects on older
+    return [getattr(c, "name", c) for c in client.list_collections()]
+
+def _open_caption_shard(shard: str):
+    coll = client.get_or_create_collection(
+        name=f"{CAPTION_SHARD_PREFIX}{shard}",
+        metadata={"hnsw:space": "cosine", "description": f"Distinct video captions with frame spans for {shard}"}
+    )
+    _caption_shards[shard] = coll
+    video_backend.set_shard(shard, get_backend(coll))
+    return coll
+
+def remove_caption_shard(shard: str):
+    """Drop a source's caption shard (source deleted or about to be rebuilt)."""
+    _caption_shards.pop(shard, None)
+    video_backend.remove_shard(shard)
+    try:
+        client.delete_collection(f"{CAPTION_SHARD_PREFIX}{shard}")
+    except Exception as e:
+        print(f"⚠️ Could not delete caption shard {shard}: {e}")
 
-    with open(CAPTIONS_PATH, "r") as f:
-        for idx, line in enumerate(f):
-            if ": " in line:
-                frame, caption = line.strip().split(": ", 1)
-                frames.append(frame)
-                captions.append(caption)
-                ids.append(frame)  # Use frame filename as id for deduplication
+def get_caption_shard_collections():
+    """{shard (source id): Chroma collection} for every loaded caption shard."""
+    return dict(_caption_shards)
 
-    if not captions:
-        print("⚠️ No captions found.")
-        return
+# Reopen the shards persisted by earlier runs
+for _name in _collection_names():
+    if _name.startswith(CAPTION_SHARD_PREFIX):
+        _open_caption_shard(_name[len(CAPTION_SHARD_PREFIX):])
 
-    # If append_only, skip frames already in the DB
+def group_caption_runs(path=CAPTIONS_PATH):
+    """
+    Read captions.txt into one row per distinct (source, caption):
+    {row_id: {"caption", "prefix", "ext", "spans": [[first_frame_num, last_frame_num], ...], "frame_count"}}.
+    Consecutive frames of a source with the same caption extend the current span.
+    """
+    rows = {}
+    last_row_for_source = {}
+    with open(path, "r") as f:
+        for line in f:
+            if ": " not in line:
+                continue
+            frame, caption = line.strip().split(": ", 1)
+            prefix, num, ext = split_frame_name(frame)
+            row_id = caption_row_id(frame, caption)
+            row = rows.get(row_id)
+            if row is None:
+                row = rows[row_id] = {"caption": caption, "prefix": prefix, "ext": ext, "spans": [], "frame_count": 0}
+            if last_row_for_source.get(prefix) == row_id and row["spans"] and num >= row["spans"][-1][1]:
+                row["spans"][-1][1] = num
+            else:
+                row["spans"].append([num, num])
+            row["frame_count"] += 1
+            last_row_for_source[prefix] = row_id
+    return rows
+
+def _caption_row_metadata(row):
+    first, last = row["spans"][0][0], row["spans"][-1][1]
+    return {
+        "frame": f"{row['prefix']}{first:04d}{row['ext']}",
+        "timestamp": first / 5.0,
+        "end": last / 5.0,
+        "frame_prefix": row["prefix"],
+        "frame_ext": row["ext"],
+        "spans": json.dumps(row["spans"]),
+        "frame_count": row["frame_count"],
+    }
+
+def _load_caption_shard(shard, rows, append_only):
+    """Write one source's caption rows to its shard. Returns number of newly embedded rows."""
+    coll = _caption_shards.get(shard)
+    if not append_only and coll is not None:
+        remove_caption_shard(shard)  # rebuild only this source
+        coll = None
+    if coll is None:
+        coll = _open_caption_shard(shard)
+    backend = video_backend.get_shard(shard)
+
+    ids = list(rows)
     if append_only:
-        try:
-            existing = set(collection.get()["ids"])
-            to_add = [(f, c, i) for f, c, i in zip(frames, captions, ids) if i not in existing]
-            if not to_add:
-                print("✅ No new captions to add to vector DB")
-                return
-            frames, captions, ids = zip(*to_add)
-            frames, captions, ids = list(frames), list(captions), list(ids)
-            print(f"🔄 Adding {len(captions)} new captions (skipping {len(existing)} existing)...")
-        except Exception as e:
-            print(f"⚠️ Could not check existing: {e}, doing full reload")
-            append_only = False
-
-    if not append_only:
-        try:
-            all_ids = collection.get()["ids"]
-            if all_ids:
-                collection.delete(ids=all_ids)
-        except Exception as e:
-            print(f"⚠️ Could not clear existing data: {e}")
-
-    # Extract timestamps for metadata
-    timestamps = []
-    for frame in frames:
-        try:
-            nums = re.findall(r"\d+", frame)
-            frame_num = int(nums[-1]) if nums else 0
-            timestamp = frame_num / 5.0
-            timestamps.append(timestamp)
-        except:
-            timestamps.append(0.0)
-
-    print(f"🔄 Generating embeddings for {len(captions)} captions...")
+        existing = coll.get(include=["metadatas"])
+        existing_counts = {i: (m or {}).get("frame_count") for i, m in zip(existing["ids"], existing["metadatas"])}
+        # Rows whose caption text already has an embedding only need their spans refreshed
+        to_update = [i for i in rows if i in existing_counts and existing_counts[i] != rows[i]["frame_count"]]
+        for i in range(0, len(to_update), 100):
+            batch = to_update[i:i + 100]
+            coll.update(ids=batch, metadatas=[_caption_row_metadata(rows[r]) for r in batch])
+        if to_update:
+            print(f"🔄 [{shard}] Updated frame spans of {len(to_update)} existing caption rows")
+            backend.invalidate()
+        ids = [i for i in rows if i not in existing_counts]
+        if not ids:
+            return 0
+
+    captions = [rows[i]["caption"] for i in ids]
+    frames = sum(rows[i]["frame_count"] for i in ids)
+    print(f"🔄 [{shard}] Generating embeddings for {len(captions)} distinct captions ({frames} frames)...")
     embeddings = embedding_model.encode(captions).tolist()
 
     batch_size = 100
-    print(f"💾 Storing {len(captions)} captions in vector database...")
     for i in range(0, len(captions), batch_size):
         batch_end = min(i + batch_size, len(captions))
-        collection.add(
+        coll.add(
             embeddings=embeddings[i:batch_end],
             documents=captions[i:batch_end],
-            metadatas=[
-                {"frame": frame, "timestamp": ts}
-                for frame, ts in zip(frames[i:batch_end], timestamps[i:batch_end])
-            ],
+            metadatas=[_caption_row_metadata(rows[r]) for r in ids[i:batch_end]],
             ids=ids[i:batch_end]
         )
-        print(f"  Stored {batch_end}/{len(captions)} captions...")
-    print(f"✅ Stored {len(captions)} captions in vector database")
+    backend.invalidate()
+    print(f"  [{shard}] Stored {len(captions)} caption rows")
+    return len(captions)
+
+def load_captions_to_vector_db(append_only=False, source_ids=None):
+    """
+    Load captions.txt into the per-source caption shards (one embedding per distinct source/caption run).
+    append_only: If True, only embed new caption rows and refresh the spans of existing ones, don't clear existing.
+    source_ids: Only (re)load these sources' shards; other shards are left untouched.
+    """
+    if not os.path.exists(CAPTIONS_PATH):
+        print("⚠️ captions.txt not found.")
+        return
+
+    rows = group_caption_runs()
+    if not rows:
+        print("⚠️ No captions found.")
+        return
+
+    by_shard = {}
+    for row_id, row in rows.items():
+        by_shard.setdefault(caption_shard_for_prefix(row["prefix"]), {})[row_id] = row
+    shards = sorted(by_shard) if source_ids is None else [s for s in source_ids if s in by_shard]
+
+    if not append_only and source_ids is None:
+        # Full reload: shards whose source is gone from captions.txt are dropped
+        for shard in list(_caption_shards):
+            if shard not in by_shard:
+                remove_caption_shard(shard)
+
+    added = 0
+    for shard in shards:
+        try:
+            added += _load_caption_shard(shard, by_shard[shard], append_only)
+        except Exception as e:
+            print(f"⚠️ Could not load caption shard {shard}: {e}")
+    if added == 0 and append_only:
+        print("✅ No new captions to add to vector DB")
+    else:
+        print(f"✅ Stored {added} caption rows across {len(shards)} shard(s)")
 
 
 def ensure_vector_db_loaded():
     """If chroma_db is empty but captions.txt exists, load it. Keeps RAG ready on every startup."""
     try:
-        if collection.count() == 0 and os.path.exists(CAPTIONS_PATH):
+        if not _caption_shards and os.path.exists(CAPTIONS_PATH):
             print("🔄 Vector DB empty but captions.txt found — loading for RAG search...")
             load_captions_to_vector_db()
+            _drop_legacy_captions_collections()
         if audio_collection.count() == 0 and os.path.exists(TRANSCRIPTIONS_PATH):
             print("🔄 Audio Vector DB empty but audio_transcriptions.txt found — loading...")
             load_transcriptions_to_vector_db()
@@ -121,98 +218,210 @@ def ensure_vector_db_loaded():
         print(f"⚠️ ensure_vector_db_loaded: {e}")
 
 
-def search_vector_db(query, top_k=10, threshold=0.4):
-    """Search vector database for similar captions"""
+def _drop_legacy_captions_collections():
+    """Remove the old single-collection caption layouts once the shards are loaded."""
     try:
-        # Check if collection has data
-        count = collection.count()
-        if count == 0:
+        names = _collection_names()
+        for legacy in LEGACY_CAPTIONS_COLLECTIONS:
+            if legacy in names:
+                client.delete_collection(legacy)
+                print(f"🧹 Dropped legacy caption collection {legacy}")
+    except Exception as e:
+        print(f"⚠️ Could not drop legacy collection: {e}")
+
+
+def _frame_timestamp(frame: str) -> float:
+    nums = re.findall(r"\d+", frame)
+    return int(nums[-1]) / 5.0 if nums else 0.0
+
+
+def _clip_id_for_frame(frame: str) -> str:
+    # Support both clip_XXX and youtube_XXX prefixes
+    m = re.match(r"(clip|youtube)_(\d+)_frame", frame)
+    return f"{m.group(1)}_{m.group(2)}" if m else "0"
+
+
+def _clip_id_for_transcription(tid: str) -> str:
+    m = re.match(r"(clip|youtube)_(\d+)_audio", tid)
+    return f"{m.group(1)}_{m.group(2).zfill(3)}" if m else "0"
+
+
+def _transcription_timestamp(tid: str) -> float:
+    match = re.search(r"_audio_([\d.]+)$", tid)
+    return float(match.group(1)) if match else 0.0
+
+
+def embed_query(query: str):
+    """Query embedding shared by caption and transcription search (same model for both)."""
+    return embedding_model.encode(query)
+
+
+def _retrieve_candidates(backend, index_name, query, threshold, n_results=50, where=None, doc_filter=None, source_ids=None,
+                         query_embedding=None):
+    """
+    Candidate documents for a query: [(id, text, score, rank_score, metadata)].
+    score is cosine similarity (shown to users); rank_score orders results.
+    - Quoted query with exact lexical matches: BM25 only, no embedding or vector query.
+    - hybrid: dense top-n fused with BM25 top-n by reciprocal rank fusion; BM25 hits are
+      kept even below the cosine threshold (exact names / lines the embedding misses).
+    - dense: the original cosine-only path.
+    Filters are pre-filters: where (metadata) and source_ids (shards) restrict the vector
+    query itself, doc_filter restricts BM25 before its top-n is taken.
+    query_embedding: precomputed embed_query(query), so callers searching several indexes encode once,
+    or a zero-argument callable returning it (only called when the vector query actually runs).
+    """
+    query_kwargs = {"where": where}
+    if source_ids is not None:
+        query_kwargs["source_ids"] = source_ids
+    quoted = extract_quoted_phrase(query) if RETRIEVAL_MODE == "hybrid" else None
+    if quoted:
+        exact = bm25_search(index_name, quoted, top_k=n_results, require_all=True, doc_filter=doc_filter)
+        fetched = backend.fetch([doc_id for doc_id, _, _ in exact])
+        exact = [(doc_id, text, bm25) for doc_id, text, bm25 in exact
+                 if doc_id in fetched and matches_where(fetched[doc_id][0], where)]
+        if exact:
+            return [(doc_id, text, 1.0, bm25, fetched[doc_id][0]) for doc_id, text, bm25 in exact]
+
+    if query_embedding is None:
+        query_embedding = embed_query(query)
+    elif callable(query_embedding):
+        query_embedding = query_embedding()
+    dense = backend.query(query_embedding, n_results, **query_kwargs)
+    if RETRIEVAL_MODE != "hybrid":
+        return [(doc_id, doc, score, score, meta) for doc_id, doc, score, meta in dense if score >= threshold]
+
+    lexical = bm25_search(index_name, query, top_k=n_results, doc_filter=doc_filter)
+    # Cosine similarity for lexical hits the dense top-n missed
+    dense_ids = {d[0] for d in dense}
+    fetched = backend.fetch([doc_id for doc_id, _, _ in lexical if doc_id not in dense_ids], query_embedding)
+    lexical = [l for l in lexical if l[0] in dense_ids or (l[0] in fetched and matches_where(fetched[l[0]][0], where))]
+    fused = reciprocal_rank_fusion([d[0] for d in dense], [l[0] for l in lexical])
+    lexical_ids = {l[0] for l in lexical}
+    candidates = {
+        doc_id: (doc, score, meta)
+        for doc_id, doc, score, meta in dense if score >= threshold or doc_id in lexical_ids
+    }
+    for doc_id, text, _ in lexical:
+        if doc_id not in candidates:
+            meta, score = fetched[doc_id]
+            candidates[doc_id] = (text, score, meta)
+    return [(doc_id, doc, score, fused[doc_id], meta) for doc_id, (doc, score, meta) in candidates.items()]
+
+
+def caption_query_filters(filters):
+    """(where, doc_filter, source_ids) for caption search; filters = {"source_ids", "start", "end"}."""
+    filters = filters or {}
+    source_ids = filters.get("source_ids")
+    clauses = []
+    if filters.get("start") is not None:
+        clauses.append({"end": {"$gte": float(filters["start"])}})
+    if filters.get("end") is not None:
+        clauses.append({"timestamp": {"$lte": float(filters["end"])}})
+    where = {"$and": clauses} if len(clauses) > 1 else (clauses[0] if clauses else None)
+    doc_filter = None
+    if source_ids is not None:
+        allowed = set(source_ids)
+        doc_filter = lambda row_id: caption_shard_for_row(row_id) in allowed
+    return where, doc_filter, source_ids
+
+
+def audio_query_filters(filters):
+    """(where, doc_filter) for transcription search: sources via clip_id, time range on segment start."""
+    filters = filters or {}
+    clauses = []
+    source_ids = filters.get("source_ids")
+    if source_ids is not None:
+        clauses.append({"clip_id": {"$in": list(source_ids)}})
+    if filters.get("start") is not None:
+        clauses.append({"timestamp": {"$gte": float(filters["start"])}})
+    if filters.get("end") is not None:
+        clauses.append({"timestamp": {"$lte": float(filters["end"])}})
+    where = {"$and": clauses} if len(clauses) > 1 else (clauses[0] if clauses else None)
+    doc_filter = None
+    if source_ids is not None:
+        allowed = set(source_ids)
+        doc_filter = lambda tid: _clip_id_for_transcription(tid) in allowed
+    return where, doc_filter
+
+
+def _caption_run_hits(doc, score, rank_score, meta, start=None, end=None):
+    """
+    Expand one caption row into a hit per frame span (run of consecutive frames with that caption).
+    start/end (seconds): drop spans outside the range and trim the rest to it.
+    """
+    prefix = meta.get("frame_prefix", "")
+    ext = meta.get("frame_ext", ".jpg")
+    hits = []
+    for first, last in json.loads(meta.get("spans") or "[]"):
+        if start is not None:
+            first = max(first, math.ceil(start * 5))
+        if end is not None:
+            last = min(last, math.floor(end * 5))
+        if first > last:
+            continue
+        frame = f"{prefix}{(first + last) // 2:04d}{ext}"  # middle frame represents the run
+        hits.append({
+            "frame": frame,
+            "caption": doc,
+            "score": score,
+            "rank_score": rank_score,
+            "timestamp": first / 5.0,
+            "end": last / 5.0,
+            "frame_count": last - first + 1,
+            "clip_id": _clip_id_for_frame(frame)
+        })
+    return hits
+
+
+def search_vector_db(query, top_k=10, threshold=0.4, filters=None, query_embedding=None):
+    """
+    Search captions: BM25 + vector hybrid (RETRIEVAL_MODE=dense for vector only), clustered into clips.
+    filters: {"source_ids": [...], "start": seconds, "end": seconds}; sources select shards,
+    the time range is a metadata pre-filter.
+    query_embedding: optional precomputed embed_query(query) or a callable returning it.
+    """
+    try:
+        if not video_backend.shard_names():
             print("⚠️ Vector database is empty. Run load_captions_to_vector_db() first.")
             return []
-        
-        # Generate query embedding
-        query_embedding = embedding_model.encode(query).tolist()
-        
-        # Search
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=min(50, count),
-            include=["documents", "metadatas", "distances"]
-        )
-        
-        # Process results
-        hits = []
-        for i, (doc, metadata, distance) in enumerate(zip(
-            results["documents"][0],
-            results["metadatas"][0],
-            results["distances"][0]
-        )):
-            # Convert distance to similarity score (ChromaDB uses distance, lower is better)
-            score = 1 - distance  # Convert to similarity
-            
-            if score < threshold:
-                continue
 
-            frame = metadata.get("frame", "")
-            # Support both clip_XXX and youtube_XXX prefixes
-            m = re.match(r"clip_(\d+)_frame", frame)
-            if m:
-                clip_id = f"clip_{m.group(1)}"
-            else:
-                m = re.match(r"youtube_(\d+)_frame", frame)
-                if m:
-                    clip_id = f"youtube_{m.group(1)}"
-                else:
-                    clip_id = "0"
-            
-            hits.append({
-                "frame": frame,
-                "caption": doc,
-                "score": score,
-                "timestamp": metadata.get("timestamp", 0.0),
-                "clip_id": clip_id
-            })
+        where, doc_filter, source_ids = caption_query_filters(filters)
+        if source_ids is not None and not source_ids:
+            return []  # scoped to no sources
+        start, end = (filters or {}).get("start"), (filters or {}).get("end")
+        hits = []
+        candidates = _retrieve_candidates(video_backend, "captions", query, threshold, where=where,
+                                          doc_filter=doc_filter, source_ids=source_ids, query_embedding=query_embedding)
+        for _, doc, score, rank_score, meta in candidates:
+            hits.extend(_caption_run_hits(doc, score, rank_score, meta, start, end))
         
         # Sort by clip_id then timestamp for clustering (cluster within same clip)
         hits.sort(key=lambda x: (x["clip_id"], x["timestamp"]))
         
-        # Cluster hits (same logic as semantic_search.py)
+        # Cluster runs: a run joins the cluster if it starts within the gap of the cluster's end
         clips = []
         if not hits:
             return []
         
         current_clip = [hits[0]]
+        current_end = hits[0]["end"]
         GAP_THRESHOLD = 1.0
         
         for hit in hits[1:]:
             same_clip = hit["clip_id"] == current_clip[-1]["clip_id"]
-            time_gap_ok = hit["timestamp"] - current_clip[-1]["timestamp"] <= GAP_THRESHOLD
+            time_gap_ok = hit["timestamp"] - current_end <= GAP_THRESHOLD
             if same_clip and time_gap_ok:
                 current_clip.append(hit)
+                current_end = max(current_end, hit["end"])
             else:
-                best_hit = max(current_clip, key=lambda x: x["score"])
-                clips.append({
-                    "start": current_clip[0]["timestamp"],
-                    "end": current_clip[-1]["timestamp"],
-                    "score": best_hit["score"],
-                    "caption": best_hit["caption"],
-                    "best_frame": best_hit["frame"],
-                    "frame_count": len(current_clip)
-                })
+                clips.append(_consolidate_video_cluster(current_clip))
                 current_clip = [hit]
+                current_end = hit["end"]
         
         if current_clip:
-            best_hit = max(current_clip, key=lambda x: x["score"])
-            clips.append({
-                "start": current_clip[0]["timestamp"],
-                "end": current_clip[-1]["timestamp"],
-                "score": best_hit["score"],
-                "caption": best_hit["caption"],
-                "best_frame": best_hit["frame"],
-                "frame_count": len(current_clip)
-            })
+            clips.append(_consolidate_video_cluster(current_clip))
         
-        clips.sort(key=lambda x: x["score"], reverse=True)
+        clips.sort(key=lambda x: x.pop("rank_score"), reverse=True)
         return clips[:5]  # Return top 5 instead of 1
         
     except Exception as e:
@@ -220,6 +429,19 @@ def search_vector_db(query, top_k=10, threshold=0.4):
         return []
 
 
+def _consolidate_video_cluster(cluster):
+    best_hit = max(cluster, key=lambda x: x["rank_score"])
+    return {
+        "start": cluster[0]["timestamp"],
+        "end": max(h["end"] for h in cluster),
+        "score": max(h["score"] for h in cluster),
+        "rank_score": best_hit["rank_score"],
+        "caption": best_hit["caption"],
+        "best_frame": best_hit["frame"],
+        "frame_count": sum(h["frame_count"] for h in cluster)
+    }
+
+
 def get_sample_captions_for_suggestions(query: str, limit: int = 15):
     """
     Get caption samples from the DB for suggestion generation.
@@ -227,24 +449,12 @@ def get_sample_captions_for_suggestions(query: str, limit: int = 15):
     This ensures suggestions reflect ACTUAL video content (e.g. Spiderman) not hardcoded fallbacks.
     """
     try:
-        count = collection.count()
-        if count == 0:
-            return []
-        query_embedding = embedding_model.encode(query).tolist()
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=min(limit, count),
-            include=["documents", "metadatas", "distances"]
-        )
+        query_embedding = embedding_model.encode(query)
         out = []
-        for doc, metadata, distance in zip(
-            results["documents"][0],
-            results["metadatas"][0],
-            results["distances"][0]
-        ):
+        for _, doc, score, metadata in video_backend.query(query_embedding, limit):
             out.append({
                 "caption": doc,
-                "score": 1 - distance,
+                "score": score,
                 "timestamp": metadata.get("timestamp", 0.0),
                 "frame": metadata.get("frame", "")
             })
@@ -342,51 +552,36 @@ def load_transcriptions_to_vector_db(append_only=False):
             ids=trans_ids[i:batch_end]
         )
         print(f"  Stored {batch_end}/{len(transcriptions)} transcriptions...")
+    audio_backend.invalidate()
     print(f"✅ Stored {len(transcriptions)} transcriptions in vector database")
 
 
-def search_audio_vector_db(query, top_k=10, threshold=0.4):
-    """Search audio transcriptions vector database"""
+def search_audio_vector_db(query, top_k=10, threshold=0.4, filters=None, query_embedding=None):
+    """
+    Search audio transcriptions: BM25 + vector hybrid, clustered into dialog moments.
+    filters: {"source_ids": [...], "start": seconds, "end": seconds}, applied as metadata pre-filters.
+    query_embedding: optional precomputed embed_query(query) or a callable returning it.
+    """
     try:
-        count = audio_collection.count()
-        if count == 0:
+        if audio_backend.count() == 0:
             return []
-        
-        query_embedding = embedding_model.encode(query).tolist()
-        
-        results = audio_collection.query(
-            query_embeddings=[query_embedding],
-            n_results=min(50, count),
-            include=["documents", "metadatas", "distances"]
-        )
-        
+        if (filters or {}).get("source_ids") is not None and not filters["source_ids"]:
+            return []  # scoped to no sources (Chroma rejects an empty $in)
+
+        where, doc_filter = audio_query_filters(filters)
+        candidates = _retrieve_candidates(audio_backend, "audio", query, threshold, where=where, doc_filter=doc_filter,
+                                          query_embedding=query_embedding)
         hits = []
-        for doc, metadata, distance in zip(
-            results["documents"][0],
-            results["metadatas"][0],
-            results["distances"][0]
-        ):
-            score = 1 - distance
-            
-            if score < threshold:
-                continue
-            
-            cid = metadata.get("clip_id", "0")
-            if cid == "0":
-                tid = metadata.get("transcription_id", "")
-                m = re.match(r"clip_(\d+)_audio", tid)
-                if m:
-                    cid = f"clip_{m.group(1).zfill(3)}"
-                else:
-                    m = re.match(r"youtube_(\d+)_audio", tid)
-                    if m:
-                        cid = f"youtube_{m.group(1).zfill(3)}"
+        for tid, doc, score, rank_score, _ in candidates:
+            ts = _transcription_timestamp(tid)
             hits.append({
-                "transcription_id": metadata.get("transcription_id", ""),
+                "transcription_id": tid,
                 "text": doc,
                 "score": score,
-                "timestamp": metadata.get("timestamp", 0.0),
-                "clip_id": cid
+                "rank_score": rank_score,
+                "timestamp": ts,
+                "end": get_segment_end(tid) or ts,  # real segment end when the word index has it
+                "clip_id": _clip_id_for_transcription(tid)
             })
         
         # Sort and cluster similar to video search
@@ -405,36 +600,30 @@ def search_audio_vector_db(query, top_k=10, threshold=0.4):
             if same_clip and time_gap_ok:
                 current_clip.append(hit)
             else:
-                best_hit = max(current_clip, key=lambda x: x["score"])
-                clips.append({
-                    "start": current_clip[0]["timestamp"],
-                    "end": current_clip[-1]["timestamp"],
-                    "score": best_hit["score"],
-                    "caption": best_hit["text"],
-                    "best_frame": "",
-                    "frame_count": len(current_clip),
-                    "source": "audio",
-                    "clip_id": best_hit["clip_id"]  # Needed for clip generation (youtube_002, clip_001)
-                })
+                clips.append(_consolidate_audio_cluster(current_clip))
                 current_clip = [hit]
         
         if current_clip:
-            best_hit = max(current_clip, key=lambda x: x["score"])
-            clips.append({
-                "start": current_clip[0]["timestamp"],
-                "end": current_clip[-1]["timestamp"],
-                "score": best_hit["score"],
-                "caption": best_hit["text"],
-                "best_frame": "",
-                "frame_count": len(current_clip),
-                "source": "audio",
-                "clip_id": best_hit["clip_id"]
-            })
+            clips.append(_consolidate_audio_cluster(current_clip))
         
-        clips.sort(key=lambda x: x["score"], reverse=True)
+        clips.sort(key=lambda x: x.pop("rank_score"), reverse=True)
         return clips[:5]
         
     except Exception as e:
         print(f"⚠️ Error searching audio vector database: {e}")
         return []
 
+
+def _consolidate_audio_cluster(cluster):
+    best_hit = max(cluster, key=lambda x: x["rank_score"])
+    return {
+        "start": cluster[0]["timestamp"],
+        "end": max(h["end"] for h in cluster),
+        "score": max(h["score"] for h in cluster),
+        "rank_score": best_hit["rank_score"],
+        "caption": best_hit["text"],
+        "best_frame": "",
+        "frame_count": len(cluster),
+        "source": "audio",
+        "clip_id": best_hit["clip_id"]  # Needed for clip generation (youtube_002, clip_001)
+    }
@@ -1,9 +1,9 @@
 import os
 import subprocess
-import re
-import glob
+from source_registry import get_source, get_source_for_frame, get_source_id_for_frame, find_source_on_disk
 
 VIDEO_PATH = "video.mp4"
+LEGACY_YOUTUBE_URL = "https://www.youtube.com/watch?v=zhEWqfP6V_w"
 CLIPS_DIR = "clips"
 SOURCE_CLIPS_DIR = "source_clips"
 
@@ -17,41 +17,53 @@ def _get_source_video_for_frame(best_frame: str):
     - frame_0001.jpg -> video.mp4 (legacy YouTube mode)
     - youtube_001_frame_0001.jpg -> source_clips/youtube_001.mp4
     - clip_001_frame_0001.jpg -> source_clips/clip_001.*
+    Looked up in the in-memory source registry; only unknown sources hit the disk.
     Returns (video_path, source_id_or_none).
     """
-    # Check for uploaded clip format
-    m = re.match(r"clip_(\d+)_frame_\d+", best_frame)
-    if m:
-        clip_num = m.group(1).zfill(3)  # Normalize to 3 digits
-        pattern = os.path.join(SOURCE_CLIPS_DIR, f"clip_{clip_num}.*")
-        matches = glob.glob(pattern)
-        if matches:
-            return matches[0], f"clip_{clip_num}"
-        # Fallback: try unpadded (e.g. clip_1)
-        pattern2 = os.path.join(SOURCE_CLIPS_DIR, f"clip_{m.group(1)}.*")
-        matches2 = glob.glob(pattern2)
-        if matches2:
-            return matches2[0], f"clip_{m.group(1)}"
-    
-    # Check for YouTube format with prefix - now stored in source_clips/
-    m = re.match(r"youtube_(\d+)_frame_\d+", best_frame)
-    if m:
-        youtube_num = m.group(1).zfill(3)  # Normalize to 3 digits
-        youtube_path = os.path.join(SOURCE_CLIPS_DIR, f"youtube_{youtube_num}.mp4")
-        if os.path.exists(youtube_path):
-            return youtube_path, f"youtube_{youtube_num}"
-        # Fallback to video.mp4 for legacy
-        return VIDEO_PATH, f"youtube_{youtube_num}"
-    
-    return VIDEO_PATH, None
+    source_id = get_source_id_for_frame(best_frame)
+    if not source_id:
+        return VIDEO_PATH, None
 
+    source = get_source(source_id) or find_source_on_disk(source_id)
+    if source:
+        return source["path"], source_id
+
+    # Fallback to video.mp4 for legacy YouTube frames
+    return VIDEO_PATH, source_id
+
+
+def get_full_video_url(best_frame: str, start: float):
+    """Return URL for 'full video' - YouTube link (with timestamp) or the source clip itself."""
+    source = get_source_for_frame(best_frame)
+    if source:
+        if source.get("url"):
+            return f"{source['url']}&t={int(start)}s"
+        return f"http://localhost:8000/source_clips/{os.path.basename(source['path'])}"
+    # Legacy single-video mode
+    return f"{LEGACY_YOUTUBE_URL}&t={int(start)}s"
+
+
+def is_youtube_source(best_frame: str) -> bool:
+    """True if the frame's source came from YouTube (legacy frames are YouTube)."""
+    source = get_source_for_frame(best_frame)
+    return source is None or source.get("type") == "youtube"
+
+
+def _run_ffmpeg(cmd: list, output_path: str):
+    """Runs in the ffmpeg process pool. Encodes to a temp file and renames, so a clip is never served half-written."""
+    tmp_path = f"{output_path}.{os.getpid()}.part.mp4"
+    result = subprocess.run(cmd + [tmp_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if result.returncode == 0 and os.path.exists(tmp_path):
+        os.replace(tmp_path, output_path)
+    elif os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    return result.returncode
+
+
+def _submit_clip(start: float, end: float, best_frame: str = None):
+    """Returns (filename, future or None if the clip already exists)."""
+    from executors import ffmpeg_pool
 
-def ensure_clip(start: float, end: float, best_frame: str = None) -> str:
-    """
-    Ensures a clip exists for the given start/end times.
-    If best_frame is provided (e.g. clip_001_frame_0001.jpg), uses that clip's source video.
-    Returns the filename of the generated clip.
-    """
     # Round to reasonable precision to avoid duplicate clips for micro-diffs
     start = round(start, 2)
     end = round(end, 2)
@@ -67,7 +79,7 @@ def ensure_clip(start: float, end: float, best_frame: str = None) -> str:
     output_path = os.path.join(CLIPS_DIR, filename)
 
     if os.path.exists(output_path):
-        return filename
+        return filename, None
 
     cmd_precise = [
         "ffmpeg",
@@ -78,10 +90,28 @@ def ensure_clip(start: float, end: float, best_frame: str = None) -> str:
         "-c:v", "libx264",
         "-c:a", "aac",
         "-strict", "experimental",
-        output_path
     ]
 
     print(f"Generating clip: {filename}...")
-    subprocess.run(cmd_precise, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return filename, ffmpeg_pool.submit(_run_ffmpeg, cmd_precise, output_path)
 
+
+def ensure_clip(start: float, end: float, best_frame: str = None) -> str:
+    """
+    Ensures a clip exists for the given start/end times.
+    If best_frame is provided (e.g. clip_001_frame_0001.jpg), uses that clip's source video.
+    Returns the filename of the generated clip.
+    """
+    filename, future = _submit_clip(start, end, best_frame)
+    if future is not None:
+        future.result()
     return filename
+
+
+def ensure_clips(specs) -> list:
+    """ensure_clip for many (start, end, best_frame) at once: all cuts run in parallel on the ffmpeg pool."""
+    jobs = [_submit_clip(start, end, best_frame) for start, end, best_frame in specs]
+    for _, future in jobs:
+        if future is not None:
+            future.result()
+    return [filename for filename, _ in jobs]